@@ -29,6 +29,37 @@ function getAuthHeaders() {
     };
 }
 
+/**
+ * Tamaño de página al recorrer un listado completo (PAGE_SIZE_MAX del backend)
+ */
+const PAGE_SIZE = 1000;
+
+/**
+ * Obtiene todas las filas de un listado paginado por cursor,
+ * siguiendo la cabecera X-Next-Cursor hasta la última página
+ */
+async function getAllPages(path, errorMessage) {
+    const filas = [];
+    let cursor = null;
+    do {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`${API_BASE_URL}${path}?${params}`, {
+            headers: getAuthHeaders()
+        });
+
+        if (!response.ok) {
+            throw new Error(errorMessage);
+        }
+
+        filas.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return filas;
+}
+
 /**
  * API de Autenticación
  */
@@ -74,15 +105,7 @@ const UsuariosAPI = {
      * Obtener todos los usuarios
      */
     async getAll() {
-        const response = await fetch(`${API_BASE_URL}/usuarios`, {
-            headers: getAuthHeaders()
-        });
-
-        if (!response.ok) {
-            throw new Error('Error al obtener usuarios');
-        }
-
-        return await response.json();
+        return await getAllPages('/usuarios/', 'Error al obtener usuarios');
     },
 
     /**
@@ -109,15 +132,7 @@ const ServiciosAPI = {
      * Obtener todos los servicios
      */
     async getAll() {
-        const response = await fetch(`${API_BASE_URL}/servicios`, {
-            headers: getAuthHeaders()
-        });
-
-        if (!response.ok) {
-            throw new Error('Error al obtener servicios');
-        }
-
-        return await response.json();
+        return await getAllPages('/servicios/', 'Error al obtener servicios');
     },
 
     /**
@@ -146,15 +161,7 @@ const ReservasAPI = {
      * Obtener todas las reservas
      */
     async getAll() {
-        const response = await fetch(`${API_BASE_URL}/reservas`, {
-            headers: getAuthHeaders()
-        });
-
-        if (!response.ok) {
-            throw new Error('Error al obtener reservas');
-        }
-
-        return await response.json();
+        return await getAllPages('/reservas/', 'Error al obtener reservas');
     },
 
     /**
@@ -0,0 +1,351 @@
+# app/api/listados.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Sequence, Type
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from typing_extensions import NotRequired, TypedDict
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+
+# ==============================
+# 🧾 Proyección de columnas y serialización directa
+# ==============================
+class Proyeccion:
+    """
+    Columnas de un esquema de salida y su serializador JSON precompilado.
+
+    Los listados seleccionan solo las columnas del esquema como filas planas y las
+    serializan a bytes con un `TypeAdapter` sobre un TypedDict equivalente: no se
+    crean entidades ORM (ni identity map) ni modelos pydantic por fila. La salida
+    es idéntica a la de `response_model`, que se conserva en la ruta para OpenAPI.
+
+    Los campos de `anidadas` no son columnas: son filas de otra proyección que
+    `expandir` añade a cada diccionario, y solo se serializan si están presentes.
+
+    Atributos:
+        nombres (list[str]): Campos del esquema que son columnas, en su orden.
+        columnas (list): Columnas del modelo ORM con esos nombres.
+        tipo (type): TypedDict de una fila, para anidarla en otra proyección.
+    """
+
+    def __init__(self, modelo: Type, esquema: Type[BaseModel], anidadas: Optional[dict[str, "Proyeccion"]] = None):
+        anidadas = anidadas or {}
+        self.nombres = [nombre for nombre in esquema.model_fields if nombre not in anidadas]
+        self.columnas = [getattr(modelo, nombre) for nombre in self.nombres]
+        fila = TypedDict(
+            f"{esquema.__name__}Fila",
+            {
+                nombre: NotRequired[Optional[anidadas[nombre].tipo]] if nombre in anidadas else campo.annotation
+                for nombre, campo in esquema.model_fields.items()
+            },
+        )
+        self.tipo = fila
+        self._fila = TypeAdapter(fila)
+        self._lista = TypeAdapter(list[fila])
+
+    def select(self) -> Select:
+        """Consulta base con las columnas de la proyección."""
+        return select(*self.columnas)
+
+    def filas(self, tuplas: Sequence[Sequence[Any]]) -> list[dict]:
+        """Convierte filas del resultado (tuplas en el orden de `nombres`) en diccionarios."""
+        nombres = self.nombres
+        return [dict(zip(nombres, tupla)) for tupla in tuplas]
+
+    def json(self, filas: list[dict]) -> bytes:
+        """Serializa una lista de filas a un array JSON."""
+        return self._lista.dump_json(filas)
+
+    def ndjson(self, filas: list[dict]) -> bytes:
+        """Serializa filas como NDJSON, una línea por fila."""
+        return b"".join(self._fila.dump_json(fila) + b"\n" for fila in filas)
+
+    def respuesta(self, filas: list[dict], headers: Optional[dict[str, str]] = None) -> Response:
+        """Respuesta JSON con las filas ya serializadas."""
+        return Response(self.json(filas), media_type="application/json", headers=headers)
+
+
+# ==============================
+# 🔗 Expansión de relaciones (?expand=)
+# ==============================
+class Relacion:
+    """
+    Relación ORM de un listado que se puede anidar en la salida con `?expand=`.
+
+    Se carga como `selectinload`, pero sobre filas proyectadas: una consulta
+    `IN` por relación y por página, con las claves distintas de la página, en
+    lugar de una petición por fila. El número de sentencias no depende del
+    tamaño de la página.
+
+    Atributos:
+        nombre (str): Nombre de la relación y del campo anidado (p. ej. "servicio").
+        clave (str): Campo de la fila con la clave foránea (p. ej. "servicio_id").
+        destino: Columna referenciada en la tabla relacionada.
+        proyeccion (Proyeccion): Columnas y serializador de la fila relacionada.
+    """
+
+    def __init__(self, atributo: InstrumentedAttribute, proyeccion: Proyeccion):
+        (local, remota), = atributo.property.local_remote_pairs
+        self.nombre = atributo.key
+        self.clave = local.key
+        self.destino = remota
+        self.proyeccion = proyeccion
+
+
+def relaciones_pedidas(expand: Optional[str], disponibles: Sequence[Relacion]) -> list[Relacion]:
+    """
+    Interpreta el parámetro `expand` (nombres separados por comas).
+
+    Args:
+        expand (Optional[str]): Valor de la query string, p. ej. "servicio,usuario".
+        disponibles (Sequence[Relacion]): Relaciones que admite el listado.
+
+    Returns:
+        list[Relacion]: Relaciones pedidas, sin repetir y en el orden de `disponibles`.
+
+    Raises:
+        HTTPException: 400 si se pide una relación que no existe.
+    """
+    if not expand:
+        return []
+    pedidas = {nombre.strip() for nombre in expand.split(",") if nombre.strip()}
+    por_nombre = {relacion.nombre: relacion for relacion in disponibles}
+    desconocidas = pedidas - por_nombre.keys()
+    if desconocidas:
+        logger.warning(f"Expansión no válida: {sorted(desconocidas)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Valores de expand no válidos: {', '.join(sorted(desconocidas))}. "
+                   f"Disponibles: {', '.join(por_nombre)}",
+        )
+    return [relacion for relacion in disponibles if relacion.nombre in pedidas]
+
+
+async def expandir(db: AsyncSession, filas: list[dict], relaciones: Sequence[Relacion]) -> None:
+    """
+    Añade a cada fila las filas relacionadas, con una consulta por relación.
+
+    Args:
+        db (AsyncSession): Sesión de base de datos.
+        filas (list[dict]): Filas de la página; se modifican en el sitio.
+        relaciones (Sequence[Relacion]): Relaciones a anidar.
+    """
+    for relacion in relaciones:
+        claves = {fila[relacion.clave] for fila in filas} - {None}
+        relacionadas: dict[Any, dict] = {}
+        if claves:
+            result = await db.execute(relacion.proyeccion.select().where(relacion.destino.in_(claves)))
+            relacionadas = {fila[relacion.destino.key]: fila for fila in relacion.proyeccion.filas(result.all())}
+        for fila in filas:
+            fila[relacion.nombre] = relacionadas.get(fila[relacion.clave])
+
+
+# ==============================
+# 📄 Paginación por cursor (keyset)
+# ==============================
+# Tipo de contenido que activa el modo streaming
+NDJSON = "application/x-ndjson"
+# Cabecera con el cursor de la página siguiente
+CABECERA_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """
+    Codifica los valores de la última fila de una página en un cursor opaco.
+
+    Args:
+        valores (Sequence[Any]): Valores de las columnas de orden (int o datetime).
+
+    Returns:
+        str: Cursor en base64 url-safe.
+    """
+    crudo = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in valores])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, columnas: Sequence) -> list:
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Args:
+        cursor (str): Cursor recibido en la query string.
+        columnas (Sequence): Columnas de orden, usadas para restaurar los tipos.
+
+    Returns:
+        list: Valores de las columnas de orden.
+
+    Raises:
+        HTTPException: 400 si el cursor no es válido.
+    """
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(crudo)
+        if len(valores) != len(columnas):
+            raise ValueError("número de valores incorrecto")
+        return [
+            datetime.fromisoformat(v) if col.type.python_type is datetime else col.type.python_type(v)
+            for col, v in zip(columnas, valores)
+        ]
+    except Exception as e:
+        logger.warning(f"Cursor inválido '{cursor}': {e}")
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def aplicar_cursor(stmt: Select, columnas: Sequence, valores: Optional[Sequence]) -> Select:
+    """
+    Ordena la consulta por las columnas indicadas y la posiciona tras el cursor.
+
+    La condición `(a, b) > (x, y)` se expande como `a >= x AND (a > x OR b > y)`
+    para que el optimizador pueda hacer un rango sobre el índice de `a`.
+
+    Args:
+        stmt (Select): Consulta base.
+        columnas (Sequence): Columnas de orden; la última debe ser única (normalmente `id`).
+        valores (Optional[Sequence]): Valores decodificados del cursor, o None para la primera página.
+
+    Returns:
+        Select: Consulta ordenada y filtrada.
+    """
+    stmt = stmt.order_by(*columnas)
+    if valores is None:
+        return stmt
+    if len(columnas) == 1:
+        return stmt.where(columnas[0] > valores[0])
+    desempates = [
+        and_(*[columnas[j] == valores[j] for j in range(1, i)], columnas[i] > valores[i])
+        for i in range(1, len(columnas))
+    ]
+    return stmt.where(columnas[0] >= valores[0], or_(columnas[0] > valores[0], *desempates))
+
+
+async def paginar(
+    db: AsyncSession,
+    stmt: Select,
+    proyeccion: Proyeccion,
+    columnas: Sequence,
+    cursor: Optional[str],
+    limit: Optional[int],
+    request: Request,
+    relaciones: Sequence[Relacion] = (),
+) -> tuple[list[dict], dict[str, str]]:
+    """
+    Ejecuta una consulta paginada por cursor y calcula las cabeceras de la página siguiente.
+
+    Se pide una fila de más para saber si existe otra página sin un COUNT.
+    Las relaciones pedidas se cargan después, solo para las filas de la página.
+
+    Args:
+        db (AsyncSession): Sesión de base de datos.
+        stmt (Select): Consulta sobre las columnas de `proyeccion` (ver `Proyeccion.select`).
+        proyeccion (Proyeccion): Proyección que convierte las filas en diccionarios.
+        columnas (Sequence): Columnas de orden (keyset); deben formar parte de la proyección.
+        cursor (Optional[str]): Cursor de la página pedida.
+        limit (Optional[int]): Tamaño de página; por defecto `PAGE_SIZE_DEFAULT`.
+        request (Request): Petición, para construir el enlace `Link: rel="next"`.
+        relaciones (Sequence[Relacion]): Relaciones a anidar en cada fila (ver `expandir`).
+
+    Returns:
+        tuple[list[dict], dict[str, str]]: Filas de la página y cabeceras de paginación
+        (vacías si es la última página).
+    """
+    limit = limit or settings.PAGE_SIZE_DEFAULT
+    valores = decodificar_cursor(cursor, columnas) if cursor else None
+    result = await db.execute(aplicar_cursor(stmt, columnas, valores).limit(limit + 1))
+    filas = proyeccion.filas(result.all())
+    cabeceras: dict[str, str] = {}
+    if len(filas) > limit:
+        filas = filas[:limit]
+        ultimo = filas[-1]
+        cabeceras = cabeceras_siguiente(request, [ultimo[col.key] for col in columnas], limit)
+    await expandir(db, filas, relaciones)
+    return filas, cabeceras
+
+
+def cabeceras_siguiente(request: Request, valores: Sequence[Any], limit: int) -> dict[str, str]:
+    """
+    Construye las cabeceras `X-Next-Cursor` y `Link: rel="next"` de una página.
+
+    Args:
+        request (Request): Petición actual.
+        valores (Sequence[Any]): Valores de orden de la última fila devuelta.
+        limit (int): Tamaño de página a conservar en el enlace.
+
+    Returns:
+        dict[str, str]: Cabeceras a añadir a la respuesta.
+    """
+    siguiente = codificar_cursor(valores)
+    url = request.url.include_query_params(cursor=siguiente, limit=limit)
+    return {CABECERA_CURSOR: siguiente, "Link": f'<{url}>; rel="next"'}
+
+
+# ==============================
+# 🌊 Streaming NDJSON
+# ==============================
+def quiere_ndjson(request: Request) -> bool:
+    """Indica si el cliente pidió el modo streaming mediante `Accept: application/x-ndjson`."""
+    return NDJSON in request.headers.get("accept", "")
+
+
+def _sesion(bind: Optional[AsyncEngine]) -> AsyncSession:
+    return AsyncSession(bind=bind, expire_on_commit=False) if bind else AsyncSessionLocal()
+
+
+async def _generar_ndjson(
+    stmt: Select, proyeccion: Proyeccion, lote: int, bind: Optional[AsyncEngine], relaciones: Sequence[Relacion]
+) -> AsyncIterator[bytes]:
+    # Sesión propia: el streaming sigue vivo después de que termine el handler
+    async with _sesion(bind) as session:
+        result = await session.stream(stmt.execution_options(yield_per=lote))
+        async for tuplas in result.partitions():
+            filas = proyeccion.filas(tuplas)
+            if relaciones:
+                # Otra conexión: la del cursor de servidor no admite consultas hasta terminar de leerlo
+                async with _sesion(bind) as relacionadas:
+                    await expandir(relacionadas, filas, relaciones)
+            yield proyeccion.ndjson(filas)
+
+
+def respuesta_ndjson(
+    stmt: Select,
+    proyeccion: Proyeccion,
+    columnas: Sequence,
+    cursor: Optional[str],
+    limit: Optional[int],
+    bind: Optional[AsyncEngine] = None,
+    relaciones: Sequence[Relacion] = (),
+) -> StreamingResponse:
+    """
+    Construye una respuesta NDJSON que lee la consulta por lotes con un cursor de servidor.
+
+    La memoria del worker queda acotada por `STREAM_BATCH_SIZE` filas, sin importar
+    el tamaño de la tabla. Sin `limit` se transmiten todas las filas tras el cursor.
+
+    Args:
+        stmt (Select): Consulta sobre las columnas de `proyeccion`.
+        proyeccion (Proyeccion): Proyección que serializa cada línea.
+        columnas (Sequence): Columnas de orden (keyset).
+        cursor (Optional[str]): Cursor desde el que empezar.
+        limit (Optional[int]): Número máximo de filas a transmitir.
+        bind (Optional[AsyncEngine]): Motor sobre el que leer (p. ej. el de la réplica de la
+            sesión del handler). Por defecto, el primario.
+        relaciones (Sequence[Relacion]): Relaciones a anidar, con una consulta por relación y lote.
+
+    Returns:
+        StreamingResponse: Respuesta con `Content-Type: application/x-ndjson`.
+    """
+    valores = decodificar_cursor(cursor, columnas) if cursor else None
+    stmt = aplicar_cursor(stmt, columnas, valores)
+    if limit:
+        stmt = stmt.limit(limit)
+    return StreamingResponse(
+        _generar_ndjson(stmt, proyeccion, settings.STREAM_BATCH_SIZE, bind, relaciones), media_type=NDJSON
+    )
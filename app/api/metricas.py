@@ -0,0 +1,212 @@
+# app/api/metricas.py
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from loguru import logger
+
+from app.core.arranque import informe_arranque
+from app.core.config import settings
+from app.core.security import pool_hashing
+from app.db.monitor_pool import monitor_pool
+from app.tasks.reminders import programador_recordatorios
+from app.utils.email import bandeja_salida
+from app.services.salud import contador_filas
+from app.core.metrics import (
+    LIMITES_CONSULTAS,
+    FamiliaContadores,
+    FamiliaHistogramas,
+    FamiliaMedidores,
+    formatear_etiquetas,
+    lineas_histograma,
+)
+
+# Etiqueta de las peticiones que no casan con ninguna ruta (evita una serie por URL inventada)
+RUTA_DESCONOCIDA = "sin_ruta"
+TIPO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ==============================
+# 📊 Métricas HTTP y de BD
+# ==============================
+latencia_peticiones = FamiliaHistogramas(
+    "http_request_duration_seconds", "Latencia de las peticiones por ruta.", ("method", "route"),
+)
+respuestas = FamiliaContadores(
+    "http_responses_total", "Respuestas por ruta y código de estado.", ("method", "route", "status"),
+)
+en_curso = FamiliaMedidores(
+    "http_requests_in_flight", "Peticiones en curso por método.", ("method",),
+)
+consultas_por_peticion = FamiliaHistogramas(
+    "db_statements_per_request", "Sentencias SQL ejecutadas por petición.", ("method", "route"),
+    limites=LIMITES_CONSULTAS,
+)
+tiempo_bd_por_peticion = FamiliaHistogramas(
+    "db_time_per_request_seconds", "Tiempo en la BD por petición.", ("method", "route"),
+)
+consultas_totales = FamiliaContadores(
+    "db_statements_total", "Sentencias SQL ejecutadas, dentro o fuera de una petición.", ("context",),
+)
+
+
+class ConsultasPeticion:
+    """Acumulador de sentencias SQL y tiempo de BD de la petición en curso."""
+
+    __slots__ = ("total", "tiempo")
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+
+
+# El acumulador es mutable: las tareas hijas que copian el contexto siguen sumando al mismo
+_consultas_actuales: ContextVar[Optional[ConsultasPeticion]] = ContextVar("consultas_actuales", default=None)
+
+
+def instrumentar_consultas(engine: AsyncEngine) -> None:
+    """
+    Registra listeners de cursor que atribuyen cada sentencia SQL a la petición en curso.
+
+    El motor asíncrono ejecuta los eventos en un greenlet que comparte el contexto de la
+    corrutina que hace el `await`, así que la ContextVar identifica la petición.
+
+    Args:
+        engine (AsyncEngine): Motor asíncrono a instrumentar.
+    """
+    motor = engine.sync_engine
+
+    @event.listens_for(motor, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        _registrar_consulta(conn)
+
+    @event.listens_for(motor, "handle_error")
+    def _error(contexto_error):
+        if contexto_error.connection is not None:
+            _registrar_consulta(contexto_error.connection)
+
+
+def _registrar_consulta(conn) -> None:
+    pila = conn.info.get("inicio_consultas")
+    if not pila:
+        return
+    duracion = time.perf_counter() - pila.pop()
+    acumulador = _consultas_actuales.get()
+    if acumulador is None:
+        consultas_totales.incrementar("background")
+        return
+    consultas_totales.incrementar("request")
+    acumulador.total += 1
+    acumulador.tiempo += duracion
+
+
+# ==============================
+# 🧩 Middleware ASGI
+# ==============================
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro que mide cada petición HTTP.
+
+    No usa BaseHTTPMiddleware para no envolver el cuerpo de la respuesta ni romper
+    el streaming NDJSON. La ruta se toma de la plantilla que resolvió FastAPI
+    (`/reservas/{reserva_id}`), no de la URL, para que el número de series esté acotado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        estado = 500
+        acumulador = ConsultasPeticion()
+        token = _consultas_actuales.set(acumulador)
+        en_curso.incrementar(metodo)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            en_curso.incrementar(metodo, n=-1)
+            _consultas_actuales.reset(token)
+            ruta = scope.get("route")
+            ruta = getattr(ruta, "path", RUTA_DESCONOCIDA)
+            latencia_peticiones.serie(metodo, ruta).observar(duracion)
+            respuestas.incrementar(metodo, ruta, str(estado))
+            consultas_por_peticion.serie(metodo, ruta).observar(acumulador.total)
+            tiempo_bd_por_peticion.serie(metodo, ruta).observar(acumulador.tiempo)
+            if acumulador.total > settings.SQL_STATEMENTS_WARN_THRESHOLD:
+                logger.warning(
+                    f"{metodo} {ruta} ejecutó {acumulador.total} sentencias SQL "
+                    f"({acumulador.tiempo * 1000:.1f} ms en BD): posible N+1"
+                )
+
+
+# ==============================
+# 📤 Exposición Prometheus
+# ==============================
+def exportar_prometheus(engine: AsyncEngine) -> str:
+    """
+    Genera el texto de /metrics con las métricas HTTP, de BD y de los componentes del worker.
+
+    Args:
+        engine (AsyncEngine): Motor cuyo pool se reporta.
+
+    Returns:
+        str: Métricas en formato de exposición de Prometheus 0.0.4.
+    """
+    lineas: list[str] = []
+    for familia in (latencia_peticiones, respuestas, en_curso, consultas_por_peticion,
+                    tiempo_bd_por_peticion, consultas_totales):
+        lineas.extend(familia.exportar())
+
+    pool = monitor_pool.estado(engine)["pool"]
+    for clave, nombre, ayuda in (
+        ("en_uso", "db_pool_checked_out", "Conexiones del pool en uso."),
+        ("libres", "db_pool_checked_in", "Conexiones libres en el pool."),
+        ("overflow", "db_pool_overflow", "Conexiones abiertas por encima de pool_size."),
+    ):
+        if clave in pool:
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge", f"{nombre} {pool[clave]}"]
+    lineas += ["# HELP db_pool_checkout_wait_seconds Espera por una conexión libre.",
+               "# TYPE db_pool_checkout_wait_seconds histogram"]
+    lineas += lineas_histograma("db_pool_checkout_wait_seconds", (), (), monitor_pool.espera_checkout)
+
+    medidores = (
+        ("password_hash_in_flight", "Hashes de contraseña en curso o en cola.", pool_hashing.en_curso),
+        ("email_outbox_queued", "Correos pendientes en la bandeja de salida.", bandeja_salida.estadisticas()["en_cola"]),
+        ("email_dead_letter", "Correos fallidos conservados en memoria.", len(bandeja_salida.muertos)),
+        ("reminders_pending", "Recordatorios cargados pendientes de envío.", programador_recordatorios.estadisticas()["pendientes"]),
+    )
+    contadores = (
+        ("password_hash_rejected_total", "Hashes rechazados por pool saturado (503).", pool_hashing.rechazadas),
+        ("email_sent_total", "Correos enviados por la bandeja de salida.", bandeja_salida.enviados),
+        ("reminders_sent_total", "Recordatorios enviados por este worker.", programador_recordatorios.enviados),
+    )
+    for nombre, ayuda, valor in medidores:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge", f"{nombre} {valor}"]
+    for nombre, ayuda, valor in contadores:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter", f"{nombre} {valor}"]
+    if contador_filas.conteos:
+        lineas += ["# HELP table_rows Filas por tabla según el último conteo en caché.", "# TYPE table_rows gauge"]
+        lineas += [f"table_rows{formatear_etiquetas(('tabla',), (tabla,))} {n}" for tabla, n in contador_filas.conteos.items()]
+    lineas += ["# HELP startup_phase_seconds Duración de cada fase del arranque del worker.", "# TYPE startup_phase_seconds gauge"]
+    lineas += [f"startup_phase_seconds{formatear_etiquetas(('fase',), (fase,))} {segundos:.6f}"
+               for fase, segundos in informe_arranque.fases.items()]
+    return "\n".join(lineas) + "\n"
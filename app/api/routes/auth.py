@@ -1,17 +1,25 @@
 # app/api/routes/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select  # Corregido para SQLAlchemy 2.x
 from app.db.session import get_session
 from app.db import models
-from app.core.security import verify_password, create_access_token
+from app.core.config import settings
+from app.core.rate_limit import Limite, huella, ip_cliente, limitador
+from app.core.security import verify_password_async, create_access_token
 from fastapi.security import OAuth2PasswordRequestForm
 from loguru import logger  # Para logging de errores y seguimiento
+from app.core.logging_config import logger_muestreado
 
 router = APIRouter(tags=["Autenticación"])
 
+# Límites de intentos de login: por IP (ráfagas de un mismo origen) y por cuenta (ataques distribuidos)
+LIMITE_LOGIN_IP = Limite.desde_texto(settings.LOGIN_RATE_LIMIT_IP)
+LIMITE_LOGIN_USUARIO = Limite.desde_texto(settings.LOGIN_RATE_LIMIT_USERNAME)
+
 @router.post("/login")
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: AsyncSession = Depends(get_session)
 ):
@@ -19,21 +27,30 @@ async def login(
     Endpoint para iniciar sesión de un usuario.
 
     Parámetros:
+    - request: Petición, para identificar la IP del cliente.
     - form_data: OAuth2PasswordRequestForm (usuario y contraseña)
     - db: AsyncSession (sesión de la base de datos)
 
     Retorna:
     - Diccionario con access_token, token_type y nombre de usuario.
     - Lanza HTTPException 401 si las credenciales son inválidas.
+    - Lanza HTTPException 429 (con Retry-After) si se supera el límite de intentos por IP o por usuario.
+    - Lanza HTTPException 503 (con Retry-After) si el pool de hashing está saturado.
     """
     try:
+        # Límites antes de cualquier consulta o verificación bcrypt
+        await limitador.comprobar("login", [
+            (f"ip:{ip_cliente(request)}", LIMITE_LOGIN_IP),
+            (f"usuario:{huella(form_data.username)}", LIMITE_LOGIN_USUARIO),
+        ])
+
         # Consultar el usuario por email
         query = select(models.Usuario).where(models.Usuario.email == form_data.username)
         result = await db.execute(query)
         usuario = result.scalars().first()
 
-        # Validar existencia de usuario y contraseña
-        if not usuario or not verify_password(form_data.password, usuario.hashed_password):
+        # Validar existencia de usuario y contraseña (bcrypt corre fuera del event loop)
+        if not usuario or not await verify_password_async(form_data.password, usuario.hashed_password):
             logger.warning(f"Login fallido para email: {form_data.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,7 +59,7 @@ async def login(
 
         # Crear token de acceso
         access_token = create_access_token(data={"sub": usuario.email})
-        logger.info(f"Usuario {usuario.email} autenticado correctamente.")
+        logger.info("Usuario {} autenticado correctamente.", usuario.email)
         return {"access_token": access_token, "token_type": "bearer", "usuario": usuario.nombre}
 
     except HTTPException:
@@ -58,7 +75,7 @@ async def login(
     finally:
         # Para AsyncSession de FastAPI, no necesitamos cerrar la sesión explícitamente
         # Pero podemos usar esto para debug si queremos
-        logger.debug("Intento de login completado.")
+        logger_muestreado.debug("Intento de login completado.")
 
 # Función de ping para probar autenticación (opcional)
 @router.get("/ping")
@@ -0,0 +1,81 @@
+# app/api/routes/interno.py
+from fastapi import APIRouter, HTTPException, status
+from app.db.monitor_pool import monitor_pool
+from app.db.session import engine
+from app.db.replicas import enrutador_lecturas
+from app.tasks.reminders import programador_recordatorios
+from app.utils.email import bandeja_salida
+from loguru import logger
+
+# Endpoints de diagnóstico; no se publican en la documentación OpenAPI
+router = APIRouter(tags=["Interno"], include_in_schema=False)
+
+@router.get("/pool")
+async def estado_pool():
+    """
+    Estado del pool de conexiones a la base de datos.
+
+    Retorna:
+    - Diccionario con ocupación (en uso, libres, overflow), contadores de conexiones,
+      histograma de espera por checkout e histograma de vida de las conexiones.
+    """
+    try:
+        return monitor_pool.estado(engine)
+    except Exception as e:
+        logger.error(f"Error al obtener el estado del pool: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.get("/recordatorios")
+async def estado_recordatorios():
+    """
+    Estado del programador de recordatorios de este worker.
+
+    Retorna:
+    - Diccionario con profundidad del heap, próximo vencimiento, atraso actual,
+      contadores de envíos e histograma de retraso.
+    """
+    try:
+        return programador_recordatorios.estadisticas()
+    except Exception as e:
+        logger.error(f"Error al obtener el estado de los recordatorios: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.get("/email")
+async def estado_email():
+    """
+    Estado de la bandeja de salida de correo de este worker.
+
+    Retorna:
+    - Diccionario con profundidad de la cola, contadores y últimos correos fallidos.
+    """
+    try:
+        return bandeja_salida.estadisticas()
+    except Exception as e:
+        logger.error(f"Error al obtener el estado de la bandeja de salida: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.get("/replicas")
+async def estado_replicas():
+    """
+    Salud y uso de las réplicas de lectura de este worker.
+
+    Retorna:
+    - Diccionario con el estado de cada réplica y las lecturas servidas por el primario.
+    """
+    try:
+        return enrutador_lecturas.estado()
+    except Exception as e:
+        logger.error(f"Error al obtener el estado de las réplicas: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
@@ -1,14 +1,53 @@
 # app/api/routes/reservas.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy import Select, func, insert, select, update
+from app.api.listados import (
+    Proyeccion, Relacion, paginar, quiere_ndjson, relaciones_pedidas, respuesta_ndjson
+)
+from app.core.config import settings
 from app.db import models
-from app.db.deps import get_db, get_current_user
+from app.db.deps import get_db, get_db_lectura, get_current_user
 from app.schemas import reserva as schemas
+from app.schemas.servicio import ServicioOut
+from app.schemas.usuario import UsuarioOut
+from app.tasks.reminders import programador_recordatorios
+from app.utils.email import notificar_reserva
+from app.utils.exceptions import (
+    ClaveIdempotenteEnUsoError, ConflictoVersionError, clasificar_integridad, es_bloqueo
+)
+from app.services.disponibilidad import (
+    ESTADO_CANCELADO, IndiceServicio, motor_disponibilidad, normalizar_fecha, ahora_utc
+)
+from app.services.estados import ACCIONES, puede_pasar, puede_reprogramar
+from app.services.idempotencia import PeticionIdempotente, es_clave_duplicada, huella_peticion, idempotencia
+from app.services.resumen import acumular, clave_resumen, registrar_alta, registrar_cambio
 from loguru import logger
+from app.core.logging_config import logger_muestreado
 
 router = APIRouter(tags=["Reservas"])
 
+# ID provisional con el que se aparta un hueco en el índice mientras se confirma la reserva
+HUECO_APARTADO = 0
+
+# Columnas de los esquemas de salida de los listados, serializadas sin entidades ORM
+proyeccion_reservas = Proyeccion(models.Reserva, schemas.ReservaOut)
+
+# Relaciones que el listado puede anidar con ?expand= (una consulta IN por relación y página)
+relaciones_reserva = [
+    Relacion(models.Reserva.servicio, Proyeccion(models.Servicio, ServicioOut)),
+    Relacion(models.Reserva.usuario, Proyeccion(models.Usuario, UsuarioOut)),
+]
+proyeccion_reservas_expandidas = Proyeccion(
+    models.Reserva,
+    schemas.ReservaExpandidaOut,
+    anidadas={relacion.nombre: relacion.proyeccion for relacion in relaciones_reserva},
+)
+proyeccion_resumen = Proyeccion(models.ResumenReserva, schemas.ResumenDiaOut)
+
 @router.get("/ping")
 async def ping_reservas():
     """
@@ -31,33 +70,137 @@ async def ping_reservas():
 async def crear_reserva(
     reserva: schemas.ReservaCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: models.Usuario = Depends(get_current_user)
+    current_user: models.Usuario = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
 ):
     """
     Crea una nueva reserva para un servicio específico.
 
+    Con la cabecera `Idempotency-Key`, los reintentos con la misma clave (y el mismo
+    cuerpo) devuelven la respuesta original con `Idempotent-Replayed: true` sin crear
+    otra reserva, durante IDEMPOTENCY_TTL_SECONDS. Las claves son de cada usuario.
+
     Parámetros:
     - reserva: Objeto ReservaCreate con los datos de la reserva.
     - db: AsyncSession de la base de datos.
     - current_user: Usuario autenticado que realiza la reserva.
+    - idempotency_key: Clave única del intento de reserva generada por el cliente (opcional).
 
     Retorna:
     - Objeto ReservaOut con la reserva creada.
-    - Lanza HTTPException 404 si el servicio no existe.
+    - Lanza HTTPException 404 si el servicio o el usuario no existen.
+    - Lanza HTTPException 409 si el horario se solapa con otra reserva del servicio.
+    - Lanza HTTPException 422 si la Idempotency-Key ya se usó con otro cuerpo.
+    """
+    if idempotency_key is None:
+        return await _crear_reserva(reserva, db, current_user)
+    peticion = PeticionIdempotente(f"reservas:{current_user.id}", idempotency_key, huella_peticion(reserva))
+    return await idempotencia.ejecutar(db, peticion, lambda: _crear_reserva(reserva, db, current_user, peticion))
+
+async def _datos_titular(
+    db: AsyncSession, usuario_id: int, current_user: models.Usuario
+) -> Optional[tuple[str, str]]:
+    """
+    Email y nombre del titular de una reserva, a quien se envía la confirmación.
+
+    Se lee antes del commit, en la misma transacción que el INSERT: sin clave foránea
+    aplicada (SQLite) o con un borrado concurrente el usuario puede no existir, y tras
+    el commit la reserva ya no se podría deshacer.
+
+    Parámetros:
+    - db: AsyncSession de la base de datos.
+    - usuario_id: Usuario de la reserva (puede no ser quien la crea, p. ej. un administrador).
+    - current_user: Usuario autenticado; si es el titular, no se consulta la BD.
+
+    Retorna:
+    - Tupla (email, nombre), o None si el usuario no existe.
     """
+    if usuario_id == current_user.id:
+        return current_user.email, current_user.nombre
+    result = await db.execute(
+        select(models.Usuario.email, models.Usuario.nombre).where(models.Usuario.id == usuario_id)
+    )
+    fila = result.one_or_none()
+    return tuple(fila) if fila is not None else None
+
+async def _crear_reserva(
+    reserva: schemas.ReservaCreate,
+    db: AsyncSession,
+    current_user: models.Usuario,
+    peticion: Optional[PeticionIdempotente] = None
+) -> models.Reserva:
+    """
+    Cuerpo de `crear_reserva`. Si hay `peticion`, guarda la respuesta en la misma transacción.
+    """
+    indice = None
+    apartado = False
+    inicio = normalizar_fecha(reserva.fecha_hora)
     try:
-        # Verificar que el servicio existe
-        servicio_result = await db.execute(select(models.Servicio).where(models.Servicio.id == reserva.servicio_id))
-        if not servicio_result.scalar_one_or_none():
+        # Verificar que el servicio existe (el índice de disponibilidad carga su duración)
+        indice = await motor_disponibilidad.obtener_indice(db, reserva.servicio_id)
+        if indice is None:
             logger.warning(f"Servicio no encontrado: ID {reserva.servicio_id}")
             raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
-        # Crear y guardar la nueva reserva
-        nueva_reserva = models.Reserva(**reserva.dict())
-        db.add(nueva_reserva)
-        await db.commit()
-        await db.refresh(nueva_reserva)
-        logger.info(f"Reserva creada correctamente: ID {nueva_reserva.id} por usuario {current_user.email}")
+        # Comprobación en memoria O(log n)
+        if indice.solapa(inicio):
+            logger.warning(f"Horario no disponible: servicio {reserva.servicio_id} a las {inicio}")
+            raise HTTPException(status_code=409, detail="El horario no está disponible")
+
+        # Apartar el hueco antes de cualquier await para que otra petición del worker no lo tome
+        indice.agregar(inicio, HUECO_APARTADO)
+        apartado = True
+
+        # Comprobación en BD (reservas de otros workers) e inserción en una sola sentencia.
+        # Los valores por defecto se fijan aquí para construir la respuesta sin refresh.
+        valores = {
+            **reserva.dict(exclude={"fecha_hora"}),
+            "fecha_hora": inicio,
+            "recordatorio_enviado": False,
+            "created_at": ahora_utc(),
+            "version": 1,
+        }
+        try:
+            reserva_id = await motor_disponibilidad.insertar_si_libre(db, indice, valores)
+            if reserva_id is not None:
+                titular = await _datos_titular(db, reserva.usuario_id, current_user)
+                if titular is None:
+                    await db.rollback()
+                    logger.warning(f"Usuario inexistente al crear reserva: ID {reserva.usuario_id}")
+                    raise HTTPException(status_code=404, detail="Usuario no encontrado")
+                await registrar_alta(db, reserva.servicio_id, inicio, valores["estado"])
+                if peticion is not None:
+                    respuesta = schemas.ReservaOut.model_validate(models.Reserva(id=reserva_id, **valores))
+                    peticion.anotar(db, status.HTTP_201_CREATED, respuesta)
+                await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if peticion is not None and es_clave_duplicada(e):
+                logger.warning(f"Idempotency-Key guardada a la vez por otra petición: {peticion.clave}")
+                raise ClaveIdempotenteEnUsoError()
+            violacion = clasificar_integridad(e)
+            if violacion.tipo == "clave_foranea":
+                # El servicio ya lo validó el índice: salvo que MySQL nombre servicio_id, falta el usuario
+                entidad = "Servicio" if violacion.menciona("servicio_id") else "Usuario"
+                logger.warning(f"{entidad} inexistente al crear reserva: {violacion.detalle}")
+                if entidad == "Servicio":
+                    motor_disponibilidad.invalidar(reserva.servicio_id)
+                raise HTTPException(status_code=404, detail=f"{entidad} no encontrado")
+            raise
+        if reserva_id is None:
+            await db.rollback()
+            logger.warning(f"Horario ocupado en BD: servicio {reserva.servicio_id} a las {inicio}")
+            motor_disponibilidad.invalidar(reserva.servicio_id)
+            raise HTTPException(status_code=409, detail="El horario no está disponible")
+
+        nueva_reserva = models.Reserva(id=reserva_id, **valores)
+        indice.quitar(inicio, HUECO_APARTADO)
+        indice.agregar(inicio, nueva_reserva.id)
+        apartado = False
+        programador_recordatorios.programar(nueva_reserva.id, inicio)
+        email, nombre = titular
+        notificar_reserva(email, nombre, nueva_reserva.id, inicio)
+        logger.info("Reserva creada correctamente: ID {} por usuario {}", nueva_reserva.id, current_user.email)
         return nueva_reserva
 
     except HTTPException:
@@ -71,24 +214,105 @@ async def crear_reserva(
             detail="Error interno al crear reserva"
         )
     finally:
-        logger.debug("Intento de creación de reserva completado.")
+        if apartado:
+            indice.quitar(inicio, HUECO_APARTADO)
+        logger_muestreado.debug("Intento de creación de reserva completado.")
+
+def filtrar_reservas(
+    consulta: Select,
+    usuario_id: Optional[int] = None,
+    servicio_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+) -> Select:
+    """
+    Añade a una consulta de reservas los filtros del listado.
+
+    Parámetros:
+    - consulta: Consulta sobre la tabla de reservas.
+    - usuario_id, servicio_id, estado: Filtros de igualdad; se ignoran si son None.
+    - desde, hasta: Rango [desde, hasta) sobre fecha_hora, en cualquier zona horaria.
+
+    Retorna:
+    - La consulta filtrada.
+    - Lanza HTTPException 400 si `hasta` no es posterior a `desde`.
+    """
+    reserva = models.Reserva
+    if usuario_id is not None:
+        consulta = consulta.where(reserva.usuario_id == usuario_id)
+    if servicio_id is not None:
+        consulta = consulta.where(reserva.servicio_id == servicio_id)
+    if estado is not None:
+        consulta = consulta.where(reserva.estado == estado)
+    if desde is not None:
+        desde = normalizar_fecha(desde)
+        consulta = consulta.where(reserva.fecha_hora >= desde)
+    if hasta is not None:
+        hasta = normalizar_fecha(hasta)
+        if desde is not None and hasta <= desde:
+            raise HTTPException(status_code=400, detail="El rango de fechas no es válido")
+        consulta = consulta.where(reserva.fecha_hora < hasta)
+    return consulta
 
-@router.get("/", response_model=list[schemas.ReservaOut])
-async def listar_reservas(db: AsyncSession = Depends(get_db)):
+@router.get("/", response_model=list[schemas.ReservaExpandidaOut])
+async def listar_reservas(
+    request: Request,
+    usuario_id: Optional[int] = None,
+    servicio_id: Optional[int] = None,
+    estado: Optional[str] = Query(None, max_length=50),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    expand: Optional[str] = Query(None, description="Relaciones a anidar, separadas por comas: servicio, usuario"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_lectura)
+):
     """
-    Lista todas las reservas registradas en la base de datos.
+    Lista las reservas registradas en la base de datos, paginadas por cursor (fecha_hora, id).
+
+    Cada filtro de igualdad tiene un índice compuesto que empieza por su columna y sigue
+    por fecha_hora (ver `models.Reserva`): la consulta recorre solo el tramo del índice
+    que cumple el filtro y el rango de fechas, ya en el orden de la paginación.
 
     Parámetros:
+    - usuario_id: Solo reservas de este usuario.
+    - servicio_id: Solo reservas de este servicio.
+    - estado: Solo reservas en este estado (pendiente, confirmado, cancelado).
+    - desde: Solo citas en esta fecha y hora o posteriores.
+    - hasta: Solo citas anteriores a esta fecha y hora (excluida).
+    - expand: Relaciones a incluir en cada reserva ("servicio", "usuario" o ambas separadas
+      por comas). Se cargan con una consulta por relación para toda la página.
+    - limit: Tamaño de página (keyset). Por defecto PAGE_SIZE_DEFAULT.
+    - cursor: Cursor opaco devuelto en la cabecera X-Next-Cursor de la página anterior.
     - db: AsyncSession de la base de datos.
 
+    Con `Accept: application/x-ndjson` la respuesta se transmite por lotes, una línea JSON por fila.
+
     Retorna:
-    - Lista de objetos ReservaOut.
+    - Lista de objetos ReservaOut, con `servicio` y `usuario` si se pidieron (o NDJSON en modo streaming).
+    - Lanza HTTPException 400 si el cursor, el rango de fechas o `expand` no son válidos.
     """
     try:
-        result = await db.execute(select(models.Reserva))
-        reservas = result.scalars().all()
-        logger.info(f"{len(reservas)} reservas listadas correctamente.")
-        return reservas
+        relaciones = relaciones_pedidas(expand, relaciones_reserva)
+        proyeccion = proyeccion_reservas_expandidas if relaciones else proyeccion_reservas
+        consulta = filtrar_reservas(
+            proyeccion_reservas.select(),
+            usuario_id=usuario_id,
+            servicio_id=servicio_id,
+            estado=estado,
+            desde=desde,
+            hasta=hasta,
+        )
+        orden = (models.Reserva.fecha_hora, models.Reserva.id)
+        if quiere_ndjson(request):
+            logger.info("Listado de reservas en modo streaming.")
+            return respuesta_ndjson(consulta, proyeccion, orden, cursor, limit, db.bind, relaciones)
+        reservas, cabeceras = await paginar(db, consulta, proyeccion, orden, cursor, limit, request, relaciones)
+        logger_muestreado.info("{} reservas listadas correctamente.", len(reservas))
+        return proyeccion.respuesta(reservas, cabeceras)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al listar reservas: {e}")
         raise HTTPException(
@@ -96,4 +320,622 @@ async def listar_reservas(db: AsyncSession = Depends(get_db)):
             detail="Error interno al listar reservas"
         )
     finally:
-        logger.debug("Listado de reservas completado.")
\ No newline at end of file
+        logger_muestreado.debug("Listado de reservas completado.")
+
+@router.get("/disponibilidad", response_model=schemas.DisponibilidadOut)
+async def consultar_disponibilidad(
+    servicio_id: int,
+    desde: datetime,
+    hasta: datetime,
+    paso_minutos: Optional[int] = Query(None, ge=5, le=240),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Calcula los huecos libres de un servicio entre dos fechas.
+
+    Parámetros:
+    - servicio_id: ID del servicio a consultar.
+    - desde: Inicio del rango. Las fechas pasadas se recortan a la hora actual.
+    - hasta: Fin del rango.
+    - paso_minutos: Separación entre inicios candidatos. Por defecto, la duración del servicio.
+    - db: AsyncSession de la base de datos.
+
+    Retorna:
+    - Objeto DisponibilidadOut con los huecos disponibles.
+    - Lanza HTTPException 400 si el rango no es válido.
+    - Lanza HTTPException 404 si el servicio no existe.
+    """
+    try:
+        desde = max(normalizar_fecha(desde), ahora_utc())
+        hasta = normalizar_fecha(hasta)
+        if hasta <= desde:
+            raise HTTPException(status_code=400, detail="El rango de fechas no es válido")
+        if hasta - desde > timedelta(days=settings.AVAILABILITY_MAX_RANGE_DAYS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"El rango no puede superar {settings.AVAILABILITY_MAX_RANGE_DAYS} días"
+            )
+
+        indice = await motor_disponibilidad.obtener_indice(db, servicio_id)
+        if indice is None:
+            logger.warning(f"Servicio no encontrado: ID {servicio_id}")
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+        duracion_minutos = int(indice.duracion.total_seconds() // 60)
+        paso = timedelta(minutes=paso_minutos or max(duracion_minutos, 5))
+        huecos = indice.huecos(desde, hasta, paso)
+        logger_muestreado.info("Disponibilidad calculada: servicio {}, {} huecos", servicio_id, len(huecos))
+        return schemas.DisponibilidadOut(
+            servicio_id=servicio_id,
+            duracion_minutos=duracion_minutos,
+            desde=desde,
+            hasta=hasta,
+            huecos=[schemas.HuecoOut(inicio=inicio, fin=fin) for inicio, fin in huecos],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al consultar disponibilidad: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al consultar disponibilidad"
+        )
+    finally:
+        logger_muestreado.debug("Consulta de disponibilidad completada.")
+
+def _validar_rango_resumen(desde: date, hasta: date) -> None:
+    """
+    Valida el rango de días de un informe de resumen.
+
+    Parámetros:
+    - desde: Primer día incluido.
+    - hasta: Último día incluido.
+
+    Retorna:
+    - None. Lanza HTTPException 400 si el rango no es válido o supera SUMMARY_MAX_RANGE_DAYS.
+    """
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="El rango de fechas no es válido")
+    if (hasta - desde).days + 1 > settings.SUMMARY_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango no puede superar {settings.SUMMARY_MAX_RANGE_DAYS} días"
+        )
+
+@router.get("/resumen", response_model=list[schemas.ResumenDiaOut])
+async def resumen_por_dia(
+    desde: date,
+    hasta: date,
+    servicio_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Reservas e ingresos por servicio, día y estado, leídos de la tabla de resumen.
+
+    El coste depende del número de días y servicios del rango, no del histórico de reservas.
+
+    Parámetros:
+    - desde: Primer día incluido (UTC).
+    - hasta: Último día incluido (UTC).
+    - servicio_id: Limitar a un servicio.
+    - estado: Limitar a un estado (pendiente, confirmado, cancelado).
+    - db: AsyncSession de la base de datos.
+
+    Retorna:
+    - Lista de objetos ResumenDiaOut ordenada por fecha, servicio y estado.
+    - Lanza HTTPException 400 si el rango no es válido.
+    """
+    try:
+        _validar_rango_resumen(desde, hasta)
+        resumen = models.ResumenReserva
+        consulta = (
+            proyeccion_resumen.select()
+            .where(resumen.fecha >= desde, resumen.fecha <= hasta, resumen.reservas != 0)
+            .order_by(resumen.fecha, resumen.servicio_id, resumen.estado)
+        )
+        if servicio_id is not None:
+            consulta = consulta.where(resumen.servicio_id == servicio_id)
+        if estado is not None:
+            consulta = consulta.where(resumen.estado == estado)
+        filas = proyeccion_resumen.filas((await db.execute(consulta)).all())
+        logger_muestreado.info("Resumen diario de reservas: {} filas entre {} y {}", len(filas), desde, hasta)
+        return proyeccion_resumen.respuesta(filas)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener el resumen diario de reservas: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al obtener el resumen de reservas"
+        )
+    finally:
+        logger_muestreado.debug("Consulta de resumen diario completada.")
+
+@router.get("/resumen/servicios", response_model=list[schemas.ResumenServicioOut])
+async def resumen_por_servicio(
+    desde: date,
+    hasta: date,
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Totales de reservas e ingresos por servicio y estado en un rango de días.
+
+    Agrega las filas diarias de la tabla de resumen; no lee la tabla de reservas.
+
+    Parámetros:
+    - desde: Primer día incluido (UTC).
+    - hasta: Último día incluido (UTC).
+    - db: AsyncSession de la base de datos.
+
+    Retorna:
+    - Lista de objetos ResumenServicioOut ordenada por servicio y estado.
+    - Lanza HTTPException 400 si el rango no es válido.
+    """
+    try:
+        _validar_rango_resumen(desde, hasta)
+        resumen = models.ResumenReserva
+        result = await db.execute(
+            select(
+                resumen.servicio_id,
+                resumen.estado,
+                func.sum(resumen.reservas).label("reservas"),
+                func.sum(resumen.ingresos).label("ingresos"),
+            )
+            .where(resumen.fecha >= desde, resumen.fecha <= hasta)
+            .group_by(resumen.servicio_id, resumen.estado)
+            .having(func.sum(resumen.reservas) != 0)
+            .order_by(resumen.servicio_id, resumen.estado)
+        )
+        totales = [schemas.ResumenServicioOut(**fila) for fila in result.mappings()]
+        logger_muestreado.info("Resumen por servicio: {} filas entre {} y {}", len(totales), desde, hasta)
+        return totales
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener el resumen de reservas por servicio: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al obtener el resumen de reservas"
+        )
+    finally:
+        logger_muestreado.debug("Consulta de resumen por servicio completada.")
+
+async def _insertar_lote(
+    db: AsyncSession,
+    filas: List[dict],
+    indices: dict[int, IndiceServicio],
+    ocupadas: Select,
+    conocidas: set[tuple[int, int, datetime]]
+) -> List[Optional[int]]:
+    """
+    Inserta un lote de reservas en la transacción actual, cada una solo si su horario sigue libre.
+
+    El lote ya se comprobó en memoria contra `conocidas`, las reservas activas que devolvió
+    `ocupadas` antes del INSERT. Las filas se insertan con un único executemany y `ocupadas`
+    se repite con bloqueo de lectura (LOCK IN SHARE MODE en MySQL; en SQLite el INSERT ya
+    tiene el bloqueo de escritura). Si en el rango solo aparecen las filas del lote, la
+    comprobación sigue valiendo y sus IDs salen de esa lectura por (servicio_id, fecha_hora),
+    único dentro del lote porque sus filas no se solapan. Si otra petición escribió en el
+    rango entre tanto, el lote se deshace y cada fila se inserta con el INSERT ... SELECT ...
+    WHERE NOT EXISTS de la creación individual (ID por lastrowid; MySQL no soporta RETURNING).
+
+    Parámetros:
+    - db: AsyncSession de la base de datos.
+    - filas: Valores de cada reserva (incluido created_at, para no releer defaults).
+    - indices: Índice de disponibilidad de cada servicio del lote (aporta la duración).
+    - ocupadas: Consulta (id, servicio_id, fecha_hora) de las reservas activas en el rango del lote.
+    - conocidas: Filas de `ocupadas` leídas antes del INSERT, con fecha_hora normalizada.
+
+    Retorna:
+    - Lista con el ID de cada reserva, o None si su horario se ocupó entre tanto; en el orden de `filas`.
+    """
+    await db.execute(insert(models.Reserva), filas)
+    nuevas = [
+        (reserva_id, servicio_id, normalizar_fecha(fecha_hora))
+        for reserva_id, servicio_id, fecha_hora in await db.execute(ocupadas.with_for_update(read=True))
+    ]
+    nuevas = [fila for fila in nuevas if fila not in conocidas]
+    por_clave = {(servicio_id, fecha_hora): reserva_id for reserva_id, servicio_id, fecha_hora in nuevas}
+    ids = [por_clave.get((fila["servicio_id"], fila["fecha_hora"])) for fila in filas]
+    if len(nuevas) == len(filas) and None not in ids:
+        return ids
+
+    # Otra petición creó o movió una reserva en el rango del lote: repetir fila a fila con la guarda
+    await db.rollback()
+    logger.warning(f"Reservas concurrentes en el rango de un lote de {len(filas)}: inserción fila a fila")
+    return [await motor_disponibilidad.insertar_si_libre(db, indices[fila["servicio_id"]], fila) for fila in filas]
+
+@router.post("/bulk", response_model=schemas.ReservaBulkOut)
+async def crear_reservas_bulk(
+    reservas: List[schemas.ReservaCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Crea varias reservas en una sola transacción, con resultado por elemento.
+
+    Los servicios y usuarios se validan con una consulta IN cada uno y los solapamientos
+    (con reservas existentes y dentro del propio lote) con una sola consulta por rango.
+    Los elementos válidos se insertan con un executemany y un único COMMIT; los
+    inválidos, o los que otra petición ocupó entre tanto, se informan sin impedir la
+    creación del resto.
+
+    Parámetros:
+    - reservas: Lista de objetos ReservaCreate (máximo BULK_MAX_ITEMS).
+    - db: AsyncSession de la base de datos.
+    - current_user: Usuario autenticado que realiza la carga.
+
+    Retorna:
+    - Objeto ReservaBulkOut con el resultado de cada elemento (201, 404 o 409).
+    - Lanza HTTPException 400 si la lista está vacía o supera el máximo permitido.
+    """
+    try:
+        if not reservas:
+            raise HTTPException(status_code=400, detail="La lista de reservas está vacía")
+        if len(reservas) > settings.BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No se pueden crear más de {settings.BULK_MAX_ITEMS} reservas por petición"
+            )
+
+        inicios = [normalizar_fecha(r.fecha_hora) for r in reservas]
+        servicio_ids = {r.servicio_id for r in reservas}
+        usuario_ids = {r.usuario_id for r in reservas}
+
+        # Validar servicios y usuarios con una consulta IN cada uno
+        duraciones = dict((await db.execute(
+            select(models.Servicio.id, models.Servicio.duracion_minutos).where(models.Servicio.id.in_(servicio_ids))
+        )).all())
+        usuarios_existentes = set((await db.execute(
+            select(models.Usuario.id).where(models.Usuario.id.in_(usuario_ids))
+        )).scalars())
+
+        # Reservas activas que pueden chocar con el lote: un único rango sobre (servicio_id, fecha_hora)
+        indices = {sid: IndiceServicio(sid, duracion, ahora_utc()) for sid, duracion in duraciones.items()}
+        ocupadas = None
+        conocidas: set[tuple[int, int, datetime]] = set()
+        if indices:
+            margen = timedelta(minutes=max(duraciones.values()))
+            ocupadas = select(models.Reserva.id, models.Reserva.servicio_id, models.Reserva.fecha_hora).where(
+                models.Reserva.servicio_id.in_(indices.keys()),
+                models.Reserva.fecha_hora > min(inicios) - margen,
+                models.Reserva.fecha_hora < max(inicios) + margen,
+                models.Reserva.estado != ESTADO_CANCELADO,
+            )
+            for reserva_id, servicio_id, fecha_hora in await db.execute(ocupadas):
+                fecha_hora = normalizar_fecha(fecha_hora)
+                indices[servicio_id].agregar(fecha_hora, reserva_id)
+                conocidas.add((reserva_id, servicio_id, fecha_hora))
+
+        resultados: List[Optional[schemas.ReservaBulkResultado]] = [None] * len(reservas)
+        aceptadas: List[tuple[int, dict]] = []
+        creada_en = ahora_utc()
+        for i, (reserva, inicio) in enumerate(zip(reservas, inicios)):
+            if reserva.servicio_id not in indices:
+                resultados[i] = schemas.ReservaBulkResultado(indice=i, status_code=404, error="Servicio no encontrado")
+            elif reserva.usuario_id not in usuarios_existentes:
+                resultados[i] = schemas.ReservaBulkResultado(indice=i, status_code=404, error="Usuario no encontrado")
+            elif indices[reserva.servicio_id].solapa(inicio):
+                resultados[i] = schemas.ReservaBulkResultado(indice=i, status_code=409, error="El horario no está disponible")
+            else:
+                # Apartar el hueco para detectar choques entre elementos del mismo lote
+                indices[reserva.servicio_id].agregar(inicio, HUECO_APARTADO)
+                fila = {**reserva.dict(exclude={"fecha_hora"}), "fecha_hora": inicio, "created_at": creada_en, "version": 1}
+                aceptadas.append((i, fila))
+
+        creadas: List[tuple[int, dict, int]] = []
+        if aceptadas:
+            ids = await _insertar_lote(db, [fila for _, fila in aceptadas], indices, ocupadas, conocidas)
+            for (i, fila), reserva_id in zip(aceptadas, ids):
+                if reserva_id is None:
+                    logger.warning(f"Horario ocupado en BD: servicio {fila['servicio_id']} a las {fila['fecha_hora']}")
+                    motor_disponibilidad.invalidar(fila["servicio_id"])
+                    resultados[i] = schemas.ReservaBulkResultado(indice=i, status_code=409, error="El horario no está disponible")
+                else:
+                    creadas.append((i, fila, reserva_id))
+            await acumular(db, [
+                (clave_resumen(fila["servicio_id"], fila["fecha_hora"], fila["estado"]), 1) for _, fila, _ in creadas
+            ])
+            await db.commit()
+            for i, fila, reserva_id in creadas:
+                motor_disponibilidad.registrar(fila["servicio_id"], fila["fecha_hora"], reserva_id)
+                programador_recordatorios.programar(reserva_id, fila["fecha_hora"])
+                resultados[i] = schemas.ReservaBulkResultado(
+                    indice=i, status_code=201, reserva=schemas.ReservaOut(id=reserva_id, **fila)
+                )
+
+        logger.info(
+            f"Carga masiva de reservas por {current_user.email}: "
+            f"{len(creadas)} creadas, {len(reservas) - len(creadas)} rechazadas"
+        )
+        return schemas.ReservaBulkOut(
+            creadas=len(creadas),
+            fallidas=len(reservas) - len(creadas),
+            resultados=resultados,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en la creación masiva de reservas: {e}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al crear reservas"
+        )
+    finally:
+        logger_muestreado.debug("Intento de creación masiva de reservas completado.")
+
+# ==============================
+# 🔀 Cambios de estado y de fecha
+# ==============================
+async def _leer_para_cambio(
+    db: AsyncSession, reserva_id: int, version: int, current_user: models.Usuario
+) -> dict:
+    """
+    Lee la reserva a modificar y comprueba permisos y versión, sin bloquear la fila.
+
+    La lectura solo sirve para validar y para conocer los valores anteriores; la
+    protección frente a cambios concurrentes la da el UPDATE condicional por versión.
+
+    Parámetros:
+    - db: AsyncSession de la base de datos.
+    - reserva_id: ID de la reserva.
+    - version: Versión que el cliente leyó por última vez.
+    - current_user: Usuario autenticado (dueño de la reserva o administrador).
+
+    Retorna:
+    - Diccionario con los campos de ReservaOut.
+    - Lanza HTTPException 404 si no existe, 403 si no es del usuario y 409 si la versión no coincide.
+    """
+    filas = proyeccion_reservas.filas(
+        (await db.execute(proyeccion_reservas.select().where(models.Reserva.id == reserva_id))).all()
+    )
+    if not filas:
+        logger.warning(f"Reserva no encontrada: ID {reserva_id}")
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+    actual = filas[0]
+    if actual["usuario_id"] != current_user.id and not current_user.is_admin:
+        logger.warning(f"Usuario {current_user.email} sin permiso sobre la reserva {reserva_id}")
+        raise HTTPException(status_code=403, detail="No tienes permiso para modificar esta reserva")
+    if actual["version"] != version:
+        logger.warning(f"Versión obsoleta de la reserva {reserva_id}: {version} (actual {actual['version']})")
+        raise ConflictoVersionError("La reserva")
+    actual["fecha_hora"] = normalizar_fecha(actual["fecha_hora"])
+    return actual
+
+async def _actualizar_version(db: AsyncSession, actual: dict, valores: dict, *condiciones) -> bool:
+    """
+    Aplica un cambio con `UPDATE ... WHERE id = ? AND version = ?` e incrementa la versión.
+
+    Parámetros:
+    - db: AsyncSession de la base de datos (no hace commit).
+    - actual: Reserva leída por `_leer_para_cambio`.
+    - valores: Columnas a modificar.
+    - condiciones: Condiciones adicionales del WHERE.
+
+    Retorna:
+    - True si se modificó la fila; False si otra petición la cambió antes (o no se cumplen las condiciones).
+    """
+    result = await db.execute(
+        update(models.Reserva)
+        .where(models.Reserva.id == actual["id"], models.Reserva.version == actual["version"], *condiciones)
+        .values(**valores, version=models.Reserva.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def _cambiar_estado(
+    accion: str, reserva_id: int, cambio: schemas.ReservaCambioEstado, db: AsyncSession, current_user: models.Usuario
+) -> schemas.ReservaOut:
+    """
+    Aplica una transición de estado (confirmar o cancelar) con control optimista por versión.
+
+    Valida la transición con la máquina de estados, la aplica con un UPDATE condicional
+    sobre la versión leída, mueve la reserva de estado en el resumen diario y hace commit.
+    Al cancelar, libera el horario en el índice de disponibilidad y descarta el recordatorio.
+
+    Parámetros:
+    - accion: Acción de ACCIONES ("confirmar" o "cancelar").
+    - reserva_id: ID de la reserva.
+    - cambio: Objeto ReservaCambioEstado con la versión leída por el cliente.
+    - db: AsyncSession de la base de datos.
+    - current_user: Usuario autenticado (dueño de la reserva o administrador).
+
+    Retorna:
+    - Objeto ReservaOut con el nuevo estado y la versión incrementada.
+    - Lanza HTTPException 404 si la reserva no existe y 403 si no es del usuario.
+    - Lanza HTTPException 409 si la transición no es válida, la versión no coincide o la
+      BD detecta un bloqueo con otra petición (ConflictoVersionError).
+    - Lanza HTTPException 500 ante cualquier otro error.
+    """
+    nuevo = ACCIONES[accion]
+    try:
+        actual = await _leer_para_cambio(db, reserva_id, cambio.version, current_user)
+        if not puede_pasar(actual["estado"], nuevo):
+            logger.warning(f"Transición no válida en la reserva {reserva_id}: {actual['estado']} -> {nuevo}")
+            raise HTTPException(
+                status_code=409, detail=f"No se puede {accion} una reserva en estado {actual['estado']}"
+            )
+        if not await _actualizar_version(db, actual, {"estado": nuevo}):
+            await db.rollback()
+            logger.warning(f"Conflicto de versión al {accion} la reserva {reserva_id}")
+            raise ConflictoVersionError("La reserva")
+        await registrar_cambio(
+            db,
+            clave_resumen(actual["servicio_id"], actual["fecha_hora"], actual["estado"]),
+            clave_resumen(actual["servicio_id"], actual["fecha_hora"], nuevo),
+        )
+        await db.commit()
+
+        if nuevo == ESTADO_CANCELADO:
+            # Libera el horario y descarta el recordatorio
+            motor_disponibilidad.retirar(actual["servicio_id"], actual["fecha_hora"], reserva_id)
+            programador_recordatorios.cancelar(reserva_id)
+        logger.info("Reserva {} {}: {} -> {} por {}", reserva_id, accion, actual["estado"], nuevo, current_user.email)
+        return schemas.ReservaOut(**{**actual, "estado": nuevo, "version": actual["version"] + 1})
+    except HTTPException:
+        raise
+    except OperationalError as e:
+        await db.rollback()
+        if es_bloqueo(e):
+            # SQLite "database is locked" o interbloqueo de MySQL: la otra petición sigue adelante
+            logger.warning(f"Bloqueo en la BD al {accion} la reserva {reserva_id}: {e}")
+            raise ConflictoVersionError("La reserva")
+        logger.error(f"Error al {accion} la reserva {reserva_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno al {accion} la reserva"
+        )
+    except Exception as e:
+        logger.error(f"Error al {accion} la reserva {reserva_id}: {e}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno al {accion} la reserva"
+        )
+
+@router.patch("/{reserva_id}/confirmar", response_model=schemas.ReservaOut)
+async def confirmar_reserva(
+    reserva_id: int,
+    cambio: schemas.ReservaCambioEstado,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Confirma una reserva pendiente.
+
+    Parámetros:
+    - reserva_id: ID de la reserva.
+    - cambio: Objeto ReservaCambioEstado con la versión leída por el cliente.
+    - db: AsyncSession de la base de datos.
+    - current_user: Usuario autenticado (dueño de la reserva o administrador).
+
+    Retorna:
+    - Objeto ReservaOut con la reserva confirmada y su nueva versión.
+    - Lanza HTTPException 403, 404, o 409 si la versión no coincide o la reserva no está pendiente.
+    """
+    return await _cambiar_estado("confirmar", reserva_id, cambio, db, current_user)
+
+@router.patch("/{reserva_id}/cancelar", response_model=schemas.ReservaOut)
+async def cancelar_reserva(
+    reserva_id: int,
+    cambio: schemas.ReservaCambioEstado,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Cancela una reserva pendiente o confirmada y libera su horario.
+
+    Parámetros:
+    - reserva_id: ID de la reserva.
+    - cambio: Objeto ReservaCambioEstado con la versión leída por el cliente.
+    - db: AsyncSession de la base de datos.
+    - current_user: Usuario autenticado (dueño de la reserva o administrador).
+
+    Retorna:
+    - Objeto ReservaOut con la reserva cancelada y su nueva versión.
+    - Lanza HTTPException 403, 404, o 409 si la versión no coincide o la reserva ya estaba cancelada.
+    """
+    return await _cambiar_estado("cancelar", reserva_id, cambio, db, current_user)
+
+@router.patch("/{reserva_id}/reprogramar", response_model=schemas.ReservaOut)
+async def reprogramar_reserva(
+    reserva_id: int,
+    cambio: schemas.ReservaReprogramar,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Mueve una reserva pendiente o confirmada a otra fecha y hora del mismo servicio.
+
+    La versión y la disponibilidad del nuevo horario se comprueban en el mismo UPDATE
+    condicional, así que dos cambios concurrentes no pueden pisarse ni ocupar el mismo hueco.
+    El recordatorio se vuelve a programar para la nueva fecha.
+
+    Parámetros:
+    - reserva_id: ID de la reserva.
+    - cambio: Objeto ReservaReprogramar con la versión leída y la nueva fecha_hora.
+    - db: AsyncSession de la base de datos.
+    - current_user: Usuario autenticado (dueño de la reserva o administrador).
+
+    Retorna:
+    - Objeto ReservaOut con la reserva reprogramada y su nueva versión.
+    - Lanza HTTPException 403 o 404, o 409 si la versión no coincide, la reserva está
+      cancelada, el nuevo horario no está disponible o la BD detecta un bloqueo con otra petición.
+    """
+    indice = None
+    apartado = False
+    inicio = normalizar_fecha(cambio.fecha_hora)
+    try:
+        actual = await _leer_para_cambio(db, reserva_id, cambio.version, current_user)
+        if not puede_reprogramar(actual["estado"]):
+            logger.warning(f"Reprogramación no válida: reserva {reserva_id} en estado {actual['estado']}")
+            raise HTTPException(
+                status_code=409, detail=f"No se puede reprogramar una reserva en estado {actual['estado']}"
+            )
+        indice = await motor_disponibilidad.obtener_indice(db, actual["servicio_id"])
+        if indice is None:
+            logger.warning(f"Servicio no encontrado: ID {actual['servicio_id']}")
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+        if indice.solapa(inicio, excluir=reserva_id):
+            logger.warning(f"Horario no disponible: servicio {actual['servicio_id']} a las {inicio}")
+            raise HTTPException(status_code=409, detail="El horario no está disponible")
+
+        # Apartar el nuevo hueco antes de cualquier await, como al crear
+        indice.agregar(inicio, HUECO_APARTADO)
+        apartado = True
+        movida = await _actualizar_version(
+            db,
+            actual,
+            {"fecha_hora": inicio, "recordatorio_enviado": False},
+            motor_disponibilidad.condicion_libre(indice, inicio, excluir=reserva_id),
+        )
+        if not movida:
+            await db.rollback()
+            version = (await db.execute(
+                select(models.Reserva.version).where(models.Reserva.id == reserva_id)
+            )).scalar_one_or_none()
+            if version != actual["version"]:
+                logger.warning(f"Conflicto de versión al reprogramar la reserva {reserva_id}")
+                raise ConflictoVersionError("La reserva")
+            logger.warning(f"Horario ocupado en BD: servicio {actual['servicio_id']} a las {inicio}")
+            motor_disponibilidad.invalidar(actual["servicio_id"])
+            raise HTTPException(status_code=409, detail="El horario no está disponible")
+        await registrar_cambio(
+            db,
+            clave_resumen(actual["servicio_id"], actual["fecha_hora"], actual["estado"]),
+            clave_resumen(actual["servicio_id"], inicio, actual["estado"]),
+        )
+        await db.commit()
+
+        indice.quitar(inicio, HUECO_APARTADO)
+        indice.quitar(actual["fecha_hora"], reserva_id)
+        indice.agregar(inicio, reserva_id)
+        apartado = False
+        programador_recordatorios.programar(reserva_id, inicio)
+        logger.info("Reserva {} reprogramada: {} -> {} por {}", reserva_id, actual["fecha_hora"], inicio, current_user.email)
+        return schemas.ReservaOut(**{**actual, "fecha_hora": inicio, "version": actual["version"] + 1})
+    except HTTPException:
+        raise
+    except OperationalError as e:
+        await db.rollback()
+        if es_bloqueo(e):
+            logger.warning(f"Bloqueo en la BD al reprogramar la reserva {reserva_id}: {e}")
+            raise ConflictoVersionError("La reserva")
+        logger.error(f"Error al reprogramar la reserva {reserva_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al reprogramar la reserva"
+        )
+    except Exception as e:
+        logger.error(f"Error al reprogramar la reserva {reserva_id}: {e}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al reprogramar la reserva"
+        )
+    finally:
+        if apartado:
+            indice.quitar(inicio, HUECO_APARTADO)
+        logger_muestreado.debug("Intento de reprogramación de reserva completado.")
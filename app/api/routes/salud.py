@@ -0,0 +1,50 @@
+# app/api/routes/salud.py
+import time
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import JSONResponse
+from app.services.salud import comprobador_salud
+from loguru import logger
+
+router = APIRouter(tags=["Health"])
+
+# Instante de arranque del worker, para informar del tiempo en marcha
+INICIO_WORKER = time.monotonic()
+
+@router.get("/live")
+async def vivo():
+    """
+    Sonda de vida (liveness): el proceso y su event loop responden.
+
+    No toca la base de datos ni dependencias externas, así que un fallo de la BD no
+    provoca reinicios del worker.
+
+    Retorna:
+    - Diccionario con el estado y los segundos que lleva el worker en marcha.
+    """
+    return {"estado": "vivo", "en_marcha_segundos": round(time.monotonic() - INICIO_WORKER, 1)}
+
+@router.get("/ready")
+async def listo():
+    """
+    Sonda de disponibilidad (readiness): el worker puede atender tráfico.
+
+    Comprueba la saturación del pool, un `SELECT 1` con timeout y las tareas en segundo
+    plano. El resultado se cachea HEALTH_CACHE_SECONDS y las sondas concurrentes
+    comparten la misma comprobación.
+
+    Retorna:
+    - 200 con el detalle de cada comprobación si el worker está listo.
+    - 503 con el mismo detalle si alguna comprobación falla.
+    """
+    try:
+        ok, detalle = await comprobador_salud.listo()
+        return JSONResponse(
+            status_code=status.HTTP_200_OK if ok else status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"estado": "listo" if ok else "no_listo", "comprobaciones": detalle},
+        )
+    except Exception as e:
+        logger.error(f"Error en la sonda de disponibilidad: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
@@ -1,14 +1,38 @@
 # app/api/routes/servicios.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.api.listados import NDJSON, cabeceras_siguiente, decodificar_cursor, quiere_ndjson
+from app.core.config import settings
 from app.db import models
-from app.db.deps import get_db
+from app.db.deps import get_db, get_db_lectura
 from app.schemas import servicio as schemas
+from app.services.catalogo import catalogo_cache, calcular_etag, etag_coincide
 from loguru import logger
+from app.core.logging_config import logger_muestreado
 
 router = APIRouter(tags=["Servicios"])
 
+def _respuesta_cacheada(request: Request, cuerpo: bytes, media_type: str = "application/json", headers: Optional[dict] = None) -> Response:
+    """
+    Devuelve bytes ya serializados con ETag fuerte, o 304 si el cliente ya tiene esa versión.
+
+    Parámetros:
+    - request: Petición, para leer If-None-Match.
+    - cuerpo: JSON serializado del catálogo.
+    - media_type: Tipo de contenido de la respuesta.
+    - headers: Cabeceras adicionales (paginación).
+
+    Retorna:
+    - Response 200 con el cuerpo o 304 sin cuerpo.
+    """
+    etag = calcular_etag(cuerpo)
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+    return Response(content=cuerpo, media_type=media_type, headers=cabeceras)
+
 @router.get("/ping")
 async def ping_servicios():
     """
@@ -44,8 +68,10 @@ async def crear_servicio(servicio: schemas.ServicioCreate, db: AsyncSession = De
         db.add(nuevo_servicio)
         await db.commit()
         await db.refresh(nuevo_servicio)
-        logger.info(f"Servicio creado correctamente: ID {nuevo_servicio.id}")
-        return nuevo_servicio
+        servicio_out = schemas.ServicioOut.model_validate(nuevo_servicio)
+        catalogo_cache.registrar(servicio_out)
+        logger.info("Servicio creado correctamente: ID {}", nuevo_servicio.id)
+        return servicio_out
     except Exception as e:
         logger.error(f"Error al crear servicio: {e}")
         await db.rollback()
@@ -54,24 +80,46 @@ async def crear_servicio(servicio: schemas.ServicioCreate, db: AsyncSession = De
             detail="Error interno al crear servicio"
         )
     finally:
-        logger.debug("Intento de creación de servicio completado.")
+        logger_muestreado.debug("Intento de creación de servicio completado.")
 
 @router.get("/", response_model=list[schemas.ServicioOut])
-async def listar_servicios(db: AsyncSession = Depends(get_db)):
+async def listar_servicios(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_lectura)
+):
     """
-    Lista todos los servicios registrados en la base de datos.
+    Lista los servicios del catálogo, paginados por cursor.
+
+    Las páginas se sirven desde la caché del catálogo (JSON ya serializado) con un
+    ETag fuerte; si coincide con If-None-Match se responde 304 sin consultar la BD.
 
     Parámetros:
-    - db: AsyncSession de la base de datos.
+    - limit: Tamaño de página (keyset). Por defecto PAGE_SIZE_DEFAULT.
+    - cursor: Cursor opaco devuelto en la cabecera X-Next-Cursor de la página anterior.
+    - db: AsyncSession de la base de datos (solo se usa al recargar la caché).
+
+    Con `Accept: application/x-ndjson` se devuelve una línea JSON por servicio.
 
     Retorna:
-    - Lista de objetos ServicioOut.
+    - Lista de objetos ServicioOut (o NDJSON), o 304 si el cliente tiene la versión actual.
+    - Lanza HTTPException 400 si el cursor no es válido.
     """
     try:
-        result = await db.execute(select(models.Servicio))
-        servicios = result.scalars().all()
-        logger.info(f"{len(servicios)} servicios listados correctamente.")
-        return servicios
+        orden = (models.Servicio.id,)
+        despues_de = decodificar_cursor(cursor, orden)[0] if cursor else None
+        await catalogo_cache.asegurar(db)
+        if quiere_ndjson(request):
+            return _respuesta_cacheada(request, catalogo_cache.lineas(despues_de, limit), media_type=NDJSON)
+
+        limit = limit or settings.PAGE_SIZE_DEFAULT
+        cuerpo, ultimo_id = catalogo_cache.pagina(despues_de, limit)
+        cabeceras = cabeceras_siguiente(request, [ultimo_id], limit) if ultimo_id is not None else None
+        logger_muestreado.info("Página del catálogo servida desde caché (versión {}).", catalogo_cache.version)
+        return _respuesta_cacheada(request, cuerpo, headers=cabeceras)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al listar servicios: {e}")
         raise HTTPException(
@@ -79,29 +127,73 @@ async def listar_servicios(db: AsyncSession = Depends(get_db)):
             detail="Error interno al listar servicios"
         )
     finally:
-        logger.debug("Listado de servicios completado.")
+        logger_muestreado.debug("Listado de servicios completado.")
+
+@router.get("/buscar", response_model=list[schemas.ServicioOut])
+async def buscar_servicios(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Busca servicios activos por nombre y descripción.
+
+    La búsqueda no distingue mayúsculas ni tildes ("unas" encuentra "Uñas"), admite
+    prefijos ("mani" encuentra "Manicura") y exige todas las palabras de la consulta.
+    Se resuelve con el índice en memoria de la caché del catálogo, sin consultar la BD.
+    Los resultados se ordenan por relevancia: pesan más las coincidencias en el nombre.
+
+    Parámetros:
+    - q: Texto de búsqueda.
+    - limit: Número máximo de resultados. Por defecto PAGE_SIZE_DEFAULT.
+    - db: AsyncSession de la base de datos (solo se usa al recargar la caché).
+
+    Retorna:
+    - Lista de objetos ServicioOut (vacía si no hay coincidencias), o 304 si el cliente tiene la versión actual.
+    """
+    try:
+        await catalogo_cache.asegurar(db)
+        cuerpo = catalogo_cache.buscar(q, limit)
+        logger_muestreado.info("Búsqueda de servicios servida desde caché (versión {}).", catalogo_cache.version)
+        return _respuesta_cacheada(request, cuerpo)
+    except Exception as e:
+        logger.error(f"Error al buscar servicios: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno al buscar servicios"
+        )
+    finally:
+        logger_muestreado.debug("Búsqueda de servicios completada.")
 
 @router.get("/{servicio_id}", response_model=schemas.ServicioOut)
-async def obtener_servicio(servicio_id: int, db: AsyncSession = Depends(get_db)):
+async def obtener_servicio(servicio_id: int, request: Request, db: AsyncSession = Depends(get_db_lectura)):
     """
-    Obtiene un servicio específico por su ID.
+    Obtiene un servicio específico por su ID desde la caché del catálogo.
 
     Parámetros:
     - servicio_id: ID del servicio a consultar.
+    - request: Petición, para la validación condicional con If-None-Match.
     - db: AsyncSession de la base de datos.
 
     Retorna:
-    - Objeto ServicioOut con los datos del servicio.
+    - Objeto ServicioOut con los datos del servicio, o 304 si el cliente tiene la versión actual.
     - Lanza HTTPException 404 si el servicio no existe.
     """
     try:
-        result = await db.execute(select(models.Servicio).where(models.Servicio.id == servicio_id))
-        servicio = result.scalar_one_or_none()
-        if not servicio:
-            logger.warning(f"Servicio no encontrado: ID {servicio_id}")
-            raise HTTPException(status_code=404, detail="Servicio no encontrado")
-        logger.info(f"Servicio obtenido correctamente: ID {servicio_id}")
-        return servicio
+        await catalogo_cache.asegurar(db)
+        cuerpo = catalogo_cache.obtener(servicio_id)
+        if cuerpo is None:
+            # Puede haberse creado en otro worker después de la última carga de la caché
+            result = await db.execute(select(models.Servicio).where(models.Servicio.id == servicio_id))
+            servicio = result.scalar_one_or_none()
+            if not servicio:
+                logger.warning(f"Servicio no encontrado: ID {servicio_id}")
+                raise HTTPException(status_code=404, detail="Servicio no encontrado")
+            catalogo_cache.registrar(schemas.ServicioOut.model_validate(servicio))
+            cuerpo = catalogo_cache.obtener(servicio_id)
+        logger_muestreado.info("Servicio obtenido correctamente: ID {}", servicio_id)
+        return _respuesta_cacheada(request, cuerpo)
     except HTTPException:
         raise
     except Exception as e:
@@ -111,4 +203,4 @@ async def obtener_servicio(servicio_id: int, db: AsyncSession = Depends(get_db))
             detail="Error interno al obtener servicio"
         )
     finally:
-        logger.debug(f"Intento de obtención de servicio ID {servicio_id} completado.")
+        logger_muestreado.debug("Intento de obtención de servicio ID {} completado.", servicio_id)
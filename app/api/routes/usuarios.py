@@ -1,15 +1,32 @@
 # app/api/routes/usuarios.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.api.listados import Proyeccion, paginar, quiere_ndjson, respuesta_ndjson
+from app.core.config import settings
 from app.db import models
-from app.db.deps import get_db
+from app.db.deps import get_db, get_db_lectura
 from app.schemas import usuario as schemas
-from app.core.security import hash_password
+from app.core.rate_limit import Limite, huella, ip_cliente, limitador
+from app.core.security import hash_password_async
+from app.services.disponibilidad import ahora_utc
+from app.services.idempotencia import PeticionIdempotente, es_clave_duplicada, huella_peticion, idempotencia
+from app.utils.email import notificar_registro
+from app.utils.exceptions import ClaveIdempotenteEnUsoError, clasificar_integridad
 from loguru import logger
+from app.core.logging_config import logger_muestreado
 
 router = APIRouter(tags=["Usuarios"])
 
+# Columnas de UsuarioOut serializadas sin entidades ORM (nunca se lee hashed_password)
+proyeccion_usuarios = Proyeccion(models.Usuario, schemas.UsuarioOut)
+
+# Límites de registro: por IP (altas masivas) y por email (reintentos sobre la misma cuenta)
+LIMITE_REGISTRO_IP = Limite.desde_texto(settings.SIGNUP_RATE_LIMIT_IP)
+LIMITE_REGISTRO_EMAIL = Limite.desde_texto(settings.SIGNUP_RATE_LIMIT_EMAIL)
+
 @router.get("/ping")
 async def ping_usuarios():
     """
@@ -29,35 +46,80 @@ async def ping_usuarios():
         )
 
 @router.post("/", response_model=schemas.UsuarioOut, status_code=201)
-async def crear_usuario(user: schemas.UsuarioCreate, db: AsyncSession = Depends(get_db)):
+async def crear_usuario(
+    user: schemas.UsuarioCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
+):
     """
     Crea un nuevo usuario en la base de datos.
 
+    Con la cabecera `Idempotency-Key`, los reintentos con la misma clave (y el mismo
+    cuerpo) devuelven la respuesta original con `Idempotent-Replayed: true` en lugar
+    de un 400 por email duplicado, sin volver a hashear la contraseña ni a contar
+    contra los límites de registro.
+
     Parámetros:
     - user: Objeto UsuarioCreate con los datos del usuario.
+    - request: Petición, para identificar la IP del cliente.
     - db: AsyncSession de la base de datos.
+    - idempotency_key: Clave única del intento de registro generada por el cliente (opcional).
 
     Retorna:
     - Objeto UsuarioOut con el usuario creado.
     - Lanza HTTPException 400 si el email ya está registrado.
+    - Lanza HTTPException 422 si la Idempotency-Key ya se usó con otro cuerpo.
+    - Lanza HTTPException 429 (con Retry-After) si se supera el límite de registros por IP o por email.
+    - Lanza HTTPException 503 (con Retry-After) si el pool de hashing está saturado.
+    """
+    if idempotency_key is None:
+        return await _crear_usuario(user, request, db)
+    peticion = PeticionIdempotente("usuarios", idempotency_key, huella_peticion(user))
+    return await idempotencia.ejecutar(db, peticion, lambda: _crear_usuario(user, request, db, peticion))
+
+async def _crear_usuario(
+    user: schemas.UsuarioCreate,
+    request: Request,
+    db: AsyncSession,
+    peticion: Optional[PeticionIdempotente] = None
+) -> models.Usuario:
+    """
+    Cuerpo de `crear_usuario`. Si hay `peticion`, guarda la respuesta en la misma transacción.
     """
     try:
-        # Verificar si el email ya existe
-        existe = await db.execute(select(models.Usuario).where(models.Usuario.email == user.email))
-        if existe.scalar_one_or_none():
-            logger.warning(f"Intento de registro fallido: email ya registrado {user.email}")
-            raise HTTPException(status_code=400, detail="El email ya está registrado")
+        # Límites antes del hash de la contraseña y del INSERT
+        await limitador.comprobar("registro", [
+            (f"ip:{ip_cliente(request)}", LIMITE_REGISTRO_IP),
+            (f"email:{huella(user.email)}", LIMITE_REGISTRO_EMAIL),
+        ])
 
-        # Crear y guardar el nuevo usuario
+        # Sin SELECT previo: la restricción UNIQUE de usuarios.email detecta el duplicado.
+        # created_at se asigna aquí para no necesitar un refresh tras el commit.
         nuevo_usuario = models.Usuario(
             nombre=user.nombre,
             email=user.email,
-            hashed_password=hash_password(user.password)
+            hashed_password=await hash_password_async(user.password),
+            created_at=ahora_utc(),
         )
         db.add(nuevo_usuario)
-        await db.commit()
-        await db.refresh(nuevo_usuario)
-        logger.info(f"Usuario creado correctamente: {nuevo_usuario.email}")
+        try:
+            if peticion is not None:
+                # El flush asigna el id que va en la respuesta guardada
+                await db.flush()
+                peticion.anotar(db, status.HTTP_201_CREATED, schemas.UsuarioOut.model_validate(nuevo_usuario))
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if peticion is not None and es_clave_duplicada(e):
+                logger.warning(f"Idempotency-Key guardada a la vez por otra petición: {peticion.clave}")
+                raise ClaveIdempotenteEnUsoError()
+            if clasificar_integridad(e).tipo == "unico":
+                logger.warning(f"Intento de registro fallido: email ya registrado {user.email}")
+                raise HTTPException(status_code=400, detail="El email ya está registrado")
+            raise
+        notificar_registro(nuevo_usuario.email, nuevo_usuario.nombre)
+        logger.info("Usuario creado correctamente: {}", nuevo_usuario.email)
         return nuevo_usuario
 
     except HTTPException:
@@ -71,24 +133,39 @@ async def crear_usuario(user: schemas.UsuarioCreate, db: AsyncSession = Depends(
             detail="Error interno al crear usuario"
         )
     finally:
-        logger.debug("Intento de creación de usuario completado.")
+        logger_muestreado.debug("Intento de creación de usuario completado.")
 
 @router.get("/", response_model=list[schemas.UsuarioOut])
-async def listar_usuarios(db: AsyncSession = Depends(get_db)):
+async def listar_usuarios(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_lectura)
+):
     """
-    Lista todos los usuarios registrados en la base de datos.
+    Lista los usuarios registrados en la base de datos, paginados por cursor.
 
     Parámetros:
+    - limit: Tamaño de página (keyset). Por defecto PAGE_SIZE_DEFAULT.
+    - cursor: Cursor opaco devuelto en la cabecera X-Next-Cursor de la página anterior.
     - db: AsyncSession de la base de datos.
 
+    Con `Accept: application/x-ndjson` la respuesta se transmite por lotes, una línea JSON por fila.
+
     Retorna:
-    - Lista de objetos UsuarioOut.
+    - Lista de objetos UsuarioOut (o NDJSON en modo streaming).
+    - Lanza HTTPException 400 si el cursor no es válido.
     """
     try:
-        result = await db.execute(select(models.Usuario))
-        usuarios = result.scalars().all()
-        logger.info(f"{len(usuarios)} usuarios listados correctamente.")
-        return usuarios
+        orden = (models.Usuario.id,)
+        if quiere_ndjson(request):
+            logger.info("Listado de usuarios en modo streaming.")
+            return respuesta_ndjson(proyeccion_usuarios.select(), proyeccion_usuarios, orden, cursor, limit, db.bind)
+        usuarios, cabeceras = await paginar(db, proyeccion_usuarios.select(), proyeccion_usuarios, orden, cursor, limit, request)
+        logger_muestreado.info("{} usuarios listados correctamente.", len(usuarios))
+        return proyeccion_usuarios.respuesta(usuarios, cabeceras)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al listar usuarios: {e}")
         raise HTTPException(
@@ -96,10 +173,10 @@ async def listar_usuarios(db: AsyncSession = Depends(get_db)):
             detail="Error interno al listar usuarios"
         )
     finally:
-        logger.debug("Listado de usuarios completado.")
+        logger_muestreado.debug("Listado de usuarios completado.")
 
 @router.get("/{usuario_id}", response_model=schemas.UsuarioOut)
-async def obtener_usuario(usuario_id: int, db: AsyncSession = Depends(get_db)):
+async def obtener_usuario(usuario_id: int, db: AsyncSession = Depends(get_db_lectura)):
     """
     Obtiene un usuario específico por su ID.
 
@@ -117,7 +194,7 @@ async def obtener_usuario(usuario_id: int, db: AsyncSession = Depends(get_db)):
         if not usuario:
             logger.warning(f"Usuario no encontrado: ID {usuario_id}")
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        logger.info(f"Usuario obtenido correctamente: ID {usuario_id}")
+        logger_muestreado.info("Usuario obtenido correctamente: ID {}", usuario_id)
         return usuario
     except HTTPException:
         raise
@@ -128,4 +205,4 @@ async def obtener_usuario(usuario_id: int, db: AsyncSession = Depends(get_db)):
             detail="Error interno al obtener usuario"
         )
     finally:
-        logger.debug(f"Intento de obtención de usuario ID {usuario_id} completado.")
\ No newline at end of file
+        logger_muestreado.debug("Intento de obtención de usuario ID {} completado.", usuario_id)
\ No newline at end of file
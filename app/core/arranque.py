@@ -0,0 +1,42 @@
+# app/core/arranque.py
+import time
+
+from loguru import logger
+
+
+class InformeArranque:
+    """
+    Tiempos de las fases del arranque de un worker, desde que se empieza a importar la app.
+
+    El módulo se importa lo primero en app.main, así que la primera marca incluye la
+    importación de FastAPI, SQLAlchemy, los modelos y los routers. El informe se
+    escribe en el log al terminar el lifespan de arranque y se exporta en /metrics.
+
+    Atributos:
+        inicio (float): Instante (perf_counter) en que se cargó este módulo.
+        fases (dict[str, float]): Duración en segundos de cada fase, en orden.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases: dict[str, float] = {}
+        self._ultima = self.inicio
+
+    def marcar(self, fase: str) -> None:
+        """Cierra la fase `fase` en el instante actual."""
+        ahora = time.perf_counter()
+        self.fases[fase] = ahora - self._ultima
+        self._ultima = ahora
+
+    @property
+    def total(self) -> float:
+        """Segundos desde el inicio hasta la última marca."""
+        return self._ultima - self.inicio
+
+    def registrar(self) -> None:
+        """Escribe el informe en el log."""
+        detalle = ", ".join(f"{fase} {segundos * 1000:.0f} ms" for fase, segundos in self.fases.items())
+        logger.info("⏱️ Arranque del worker en {:.0f} ms ({})", self.total * 1000, detalle)
+
+
+informe_arranque = InformeArranque()
@@ -0,0 +1,105 @@
+# app/core/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Valor centinela para distinguir "no está" de un valor None guardado
+_AUSENTE = object()
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por entrada y desalojo LRU.
+
+    No es segura entre hilos: está pensada para usarse desde el event loop del worker.
+
+    Atributos:
+        max_entradas (int): Número máximo de entradas antes de desalojar la menos usada.
+        ttl_segundos (float): Vida por defecto de cada entrada.
+        aciertos (int): Lecturas servidas desde la caché.
+        fallos (int): Lecturas que no encontraron una entrada vigente.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        """
+        Retorna el valor vigente de una clave y la marca como usada recientemente.
+
+        Args:
+            clave (Hashable): Clave buscada.
+            default (Any): Valor a retornar si no hay entrada vigente.
+
+        Returns:
+            Any: Valor guardado o `default`.
+        """
+        entrada = self._datos.get(clave, _AUSENTE)
+        if entrada is _AUSENTE:
+            self.fallos += 1
+            return default
+        expira, valor = entrada
+        if expira <= time.monotonic():
+            del self._datos[clave]
+            self.fallos += 1
+            return default
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> None:
+        """
+        Guarda un valor. Si se supera `max_entradas`, desaloja la entrada menos usada.
+
+        Args:
+            clave (Hashable): Clave.
+            valor (Any): Valor a guardar.
+            ttl (Optional[float]): Vida de la entrada en segundos; por defecto `ttl_segundos`.
+        """
+        vida = self.ttl_segundos if ttl is None else min(ttl, self.ttl_segundos)
+        if vida <= 0:
+            return
+        self._datos[clave] = (time.monotonic() + vida, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def pop(self, clave: Hashable) -> None:
+        """Elimina una clave si existe."""
+        self._datos.pop(clave, None)
+
+    def eliminar_si(self, predicado: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Elimina las entradas para las que `predicado(clave, valor)` es verdadero.
+
+        Recorre toda la caché: pensado para invalidaciones poco frecuentes.
+
+        Returns:
+            int: Número de entradas eliminadas.
+        """
+        claves = [c for c, (_, v) in self._datos.items() if predicado(c, v)]
+        for clave in claves:
+            del self._datos[clave]
+        return len(claves)
+
+    def limpiar(self) -> None:
+        """Vacía la caché sin reiniciar los contadores."""
+        self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        """Retorna tamaño, aciertos, fallos y tasa de acierto."""
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_acierto": round(self.aciertos / total, 4) if total else 0.0,
+        }
@@ -1,4 +1,5 @@
 # app/core/config.py
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,11 +11,149 @@ class Settings(BaseSettings):
         DATABASE_URL (str): URL de conexión a la base de datos.
         SECRET_KEY (str): Clave secreta para generación de tokens JWT.
         ACCESS_TOKEN_EXPIRE_HOURS (int): Tiempo de expiración de los tokens en horas. Por defecto 8 horas.
+        AVAILABILITY_INDEX_TTL_SECONDS (int): Segundos que un índice de disponibilidad en memoria se considera vigente antes de recargarse.
+        AVAILABILITY_MAX_RANGE_DAYS (int): Rango máximo (en días) permitido en una consulta de disponibilidad.
+        PAGE_SIZE_DEFAULT (int): Tamaño de página por defecto en los listados.
+        PAGE_SIZE_MAX (int): Tamaño de página máximo permitido en los listados.
+        STREAM_BATCH_SIZE (int): Filas leídas por lote en los listados en modo streaming (NDJSON).
+        CATALOG_CACHE_TTL_SECONDS (int): Segundos que la caché del catálogo de servicios es válida antes de recargarse.
+        PASSWORD_HASH_POOL (str): Tipo de pool para bcrypt fuera del event loop: "thread" o "process".
+        PASSWORD_HASH_WORKERS (int): Hilos/procesos de hashing del contenedor, repartidos entre WEB_WORKERS.
+        PASSWORD_HASH_MAX_QUEUE (int): Operaciones de hashing que pueden esperar en cola antes de responder 503.
+        PASSWORD_HASH_RETRY_AFTER_SECONDS (int): Valor de la cabecera Retry-After cuando el pool está saturado.
+        TOKEN_CACHE_MAX_ENTRIES (int): Tokens JWT decodificados que se guardan en memoria.
+        TOKEN_CACHE_TTL_SECONDS (int): Vida máxima de un token en la caché (nunca supera su `exp`).
+        USER_CACHE_MAX_ENTRIES (int): Usuarios autenticados que se guardan en memoria.
+        USER_CACHE_TTL_SECONDS (int): Vida de un usuario en la caché; acota cuánto tarda en notarse una desactivación hecha en otro worker.
+        DB_POOL_SIZE (int): Conexiones persistentes del contenedor, repartidas entre WEB_WORKERS.
+        DB_MAX_OVERFLOW (int): Conexiones extra que el contenedor puede abrir en picos, repartidas entre WEB_WORKERS.
+        DB_POOL_TIMEOUT (int): Segundos que una petición espera una conexión libre antes de fallar.
+        DB_POOL_RECYCLE (int): Segundos tras los que una conexión se recicla (por debajo de wait_timeout de MySQL).
+        DB_POOL_PRE_PING (bool): Comprobar la conexión antes de entregarla.
+        BULK_MAX_ITEMS (int): Número máximo de reservas aceptadas en una petición a /reservas/bulk.
+        REMINDERS_ENABLED (bool): Arrancar el programador de recordatorios con la aplicación.
+        REMINDER_LEAD_MINUTES (int): Minutos de antelación con que se envía el recordatorio de una cita.
+        REMINDER_WINDOW_MINUTES (int): Tamaño de cada ventana de reservas que carga el programador.
+        EMAIL_ENABLED (bool): Enviar correos por SMTP; si es False la bandeja de salida solo los registra en el log.
+        EMAIL_FROM (str): Remitente de los correos.
+        SMTP_HOST (str): Servidor SMTP.
+        SMTP_PORT (int): Puerto del servidor SMTP.
+        SMTP_USER (Optional[str]): Usuario SMTP (sin autenticación si es None).
+        SMTP_PASSWORD (Optional[str]): Contraseña SMTP.
+        SMTP_STARTTLS (bool): Negociar STARTTLS tras conectar.
+        SMTP_TIMEOUT_SECONDS (float): Timeout de conexión y de cada comando SMTP.
+        SMTP_IDLE_SECONDS (float): Segundos sin correos tras los que se cierra la conexión reutilizada.
+        EMAIL_QUEUE_MAX (int): Capacidad de la cola de salida; al llenarse se descartan correos nuevos.
+        EMAIL_BATCH_SIZE (int): Correos enviados por lote sobre la misma conexión.
+        EMAIL_RATE_PER_SECOND (float): Límite de correos por segundo hacia el servidor SMTP.
+        EMAIL_MAX_ATTEMPTS (int): Intentos de envío antes de pasar un correo a la lista de fallidos.
+        EMAIL_RETRY_BASE_SECONDS (float): Espera base del backoff exponencial entre reintentos.
+        EMAIL_DEAD_LETTER_MAX (int): Correos fallidos conservados en memoria para inspección.
+        SQL_STATEMENTS_WARN_THRESHOLD (int): Sentencias SQL por petición a partir de las que se avisa de un posible N+1.
+        LOG_LEVEL (str): Nivel mínimo de log; los mensajes por debajo no se formatean.
+        LOG_JSON (bool): Emitir una línea JSON por registro en lugar de texto.
+        LOG_ENQUEUE (bool): Escribir los logs desde un hilo aparte (sink no bloqueante).
+        LOG_SAMPLING (dict[str, int]): Por nivel, emitir 1 de cada N mensajes de camino caliente.
+        DATABASE_REPLICA_URLS (list[str]): URLs de réplicas de solo lectura (lista JSON en el entorno). Vacía: todo al primario.
+        REPLICA_RETRY_SECONDS (float): Segundos que una réplica caída queda fuera de la rotación.
+        READ_YOUR_WRITES_SECONDS (int): Segundos tras una escritura en los que las lecturas del cliente van al primario.
+        SUMMARY_MAX_RANGE_DAYS (int): Días máximos que abarca una consulta a /reservas/resumen.
+        HEALTH_CACHE_SECONDS (float): Segundos que se reutiliza el resultado de /health/ready.
+        HEALTH_DB_TIMEOUT_SECONDS (float): Tiempo máximo del `SELECT 1` de /health/ready.
+        HEALTH_POOL_SATURATION (float): Fracción del pool en uso a partir de la cual el worker no está listo.
+        ROW_COUNT_REFRESH_SECONDS (float): Segundos entre refrescos del conteo de filas en caché (/check_db).
+        RATE_LIMIT_ENABLED (bool): Aplicar los límites de peticiones en login y registro.
+        RATE_LIMIT_BACKEND (str): "memory" (por worker) o "redis" (compartido; requiere el paquete `redis`).
+        RATE_LIMIT_REDIS_URL (Optional[str]): URL de Redis para el almacén compartido.
+        RATE_LIMIT_MAX_KEYS (int): Claves de límites en memoria por worker antes de desalojar las menos usadas.
+        LOGIN_RATE_LIMIT_IP (str): Intentos de login por IP ("N/second|minute|hour|day").
+        LOGIN_RATE_LIMIT_USERNAME (str): Intentos de login por usuario (email), desde cualquier IP.
+        SIGNUP_RATE_LIMIT_IP (str): Registros de usuario por IP.
+        SIGNUP_RATE_LIMIT_EMAIL (str): Intentos de registro por email.
+        WEB_WORKERS (int): Procesos de uvicorn que arranca `python -m app.serve` (0 = uno por CPU).
+        WEB_HOST (str): Dirección en la que escucha `python -m app.serve`.
+        WEB_PORT (int): Puerto en el que escucha `python -m app.serve`.
+        WEB_MAX_REQUESTS (int): Peticiones tras las que un worker se recicla, más hasta un 10% aleatorio (0 = nunca); solo con más de un worker.
+        WEB_GRACEFUL_TIMEOUT_SECONDS (int): Segundos que un worker que se detiene espera a las peticiones en curso.
+        WEB_KEEPALIVE_SECONDS (int): Segundos que se mantiene abierta una conexión HTTP inactiva.
+        FORWARDED_ALLOW_IPS (str): IPs de proxies de confianza para X-Forwarded-For (separadas por comas, "*" = todas).
+        WEB_ACCESS_LOG (bool): Access log de uvicorn (una línea síncrona por petición; las métricas ya cubren latencias y códigos).
+        IDEMPOTENCY_TTL_SECONDS (int): Segundos durante los que un reintento con la misma Idempotency-Key repite la respuesta guardada.
+        IDEMPOTENCY_CACHE_MAX_ENTRIES (int): Respuestas idempotentes que se guardan en memoria por worker (el resto se lee de la BD).
     """
     APP_NAME: str = "Centro de Belleza API"
     DATABASE_URL: str
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_HOURS: int = 8
+    AVAILABILITY_INDEX_TTL_SECONDS: int = 30
+    AVAILABILITY_MAX_RANGE_DAYS: int = 31
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 1000
+    STREAM_BATCH_SIZE: int = 500
+    CATALOG_CACHE_TTL_SECONDS: int = 60
+    PASSWORD_HASH_POOL: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 5000
+    USER_CACHE_TTL_SECONDS: int = 30
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    BULK_MAX_ITEMS: int = 1000
+    REMINDERS_ENABLED: bool = True
+    REMINDER_LEAD_MINUTES: int = 1440
+    REMINDER_WINDOW_MINUTES: int = 15
+    EMAIL_ENABLED: bool = False
+    EMAIL_FROM: str = "no-reply@centrobelleza.local"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USER: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = False
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    SMTP_IDLE_SECONDS: float = 30.0
+    EMAIL_QUEUE_MAX: int = 10000
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_RATE_PER_SECOND: float = 10.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 2.0
+    EMAIL_DEAD_LETTER_MAX: int = 1000
+    SQL_STATEMENTS_WARN_THRESHOLD: int = 25
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    LOG_ENQUEUE: bool = True
+    LOG_SAMPLING: dict[str, int] = {"DEBUG": 100, "INFO": 10}
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_RETRY_SECONDS: float = 15.0
+    READ_YOUR_WRITES_SECONDS: int = 5
+    SUMMARY_MAX_RANGE_DAYS: int = 366
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_DB_TIMEOUT_SECONDS: float = 1.0
+    HEALTH_POOL_SATURATION: float = 0.9
+    ROW_COUNT_REFRESH_SECONDS: float = 300.0
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    LOGIN_RATE_LIMIT_IP: str = "20/minute"
+    LOGIN_RATE_LIMIT_USERNAME: str = "5/minute"
+    SIGNUP_RATE_LIMIT_IP: str = "20/hour"
+    SIGNUP_RATE_LIMIT_EMAIL: str = "3/hour"
+    WEB_WORKERS: int = 1
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_MAX_REQUESTS: int = 10000
+    WEB_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    WEB_KEEPALIVE_SECONDS: int = 5
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    WEB_ACCESS_LOG: bool = False
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = 10000
 
     class Config:
         """
@@ -26,4 +165,18 @@ class Settings(BaseSettings):
         extra = "ignore"  
 
 # Instancia global para acceder a la configuración desde cualquier parte del proyecto
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+
+def por_worker(total: int, minimo: int = 1) -> int:
+    """
+    Parte de un recurso del contenedor (conexiones, hilos) que corresponde a cada worker.
+
+    Args:
+        total (int): Cantidad configurada para todo el contenedor.
+        minimo (int): Valor mínimo por worker.
+
+    Returns:
+        int: `total // WEB_WORKERS`, nunca por debajo de `minimo`.
+    """
+    return max(minimo, total // max(settings.WEB_WORKERS, 1))
\ No newline at end of file
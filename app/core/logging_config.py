@@ -1 +1,92 @@
+# app/core/logging_config.py
+import itertools
+import json
+import sys
+from typing import Optional, TextIO
 
+from loguru import logger
+
+from app.core.config import settings
+
+# Logger para mensajes de camino caliente (uno o varios por petición): pasan por el muestreo.
+# Se crea una sola vez; `bind` en cada llamada costaría una copia del logger.
+logger_muestreado = logger.bind(muestreo=True)
+
+FORMATO_TEXTO = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+
+class FiltroMuestreo:
+    """
+    Deja pasar 1 de cada N registros marcados con `muestreo`, con N por nivel.
+
+    Los registros sin la marca (errores, avisos, eventos puntuales) pasan siempre.
+    El muestreo es determinista (contador por nivel), así que el primer mensaje de
+    cada nivel siempre se emite.
+
+    Args:
+        cada (dict[str, int]): Nivel -> N. Los niveles ausentes o con N <= 1 no se muestrean.
+    """
+
+    def __init__(self, cada: dict[str, int]):
+        self.cada = {nivel.upper(): n for nivel, n in cada.items() if n > 1}
+        self._contadores = {nivel: itertools.count() for nivel in self.cada}
+
+    def __call__(self, record) -> bool:
+        if "muestreo" not in record["extra"]:
+            return True
+        n = self.cada.get(record["level"].name)
+        if n is None:
+            return True
+        return next(self._contadores[record["level"].name]) % n == 0
+
+
+def _formato_json(record) -> str:
+    """Serializa el registro a una línea JSON compacta (menos campos que `serialize=True`)."""
+    datos = {
+        "ts": record["time"].isoformat(),
+        "level": record["level"].name,
+        "msg": record["message"],
+        "logger": record["name"],
+        "func": record["function"],
+        "line": record["line"],
+    }
+    extra = {k: v for k, v in record["extra"].items() if k not in ("muestreo", "_json")}
+    if extra:
+        datos["extra"] = extra
+    if record["exception"] is not None:
+        tipo, valor, _ = record["exception"]
+        datos["exc"] = f"{tipo.__name__ if tipo else ''}: {valor}"
+    record["extra"]["_json"] = json.dumps(datos, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+def configurar_logging(destino: Optional[TextIO] = None) -> int:
+    """
+    Sustituye el sink por defecto de loguru (stderr síncrono, nivel DEBUG) por el del worker.
+
+    - `LOG_LEVEL`: los registros por debajo se descartan antes de formatear el mensaje
+      (si se usan argumentos `logger.info("... {}", x)` en lugar de f-strings).
+    - `LOG_ENQUEUE`: la escritura se hace en un hilo aparte; el handler no se bloquea en E/S.
+    - `LOG_SAMPLING`: muestreo por nivel de los mensajes de `logger_muestreado`.
+    - `LOG_JSON`: una línea JSON por registro, para el agregador de logs.
+
+    Args:
+        destino (Optional[TextIO]): Flujo de salida; por defecto sys.stderr.
+
+    Returns:
+        int: ID del handler añadido.
+    """
+    logger.remove()
+    return logger.add(
+        destino or sys.stderr,
+        level=settings.LOG_LEVEL.upper(),
+        format=_formato_json if settings.LOG_JSON else FORMATO_TEXTO,
+        filter=FiltroMuestreo(settings.LOG_SAMPLING),
+        enqueue=settings.LOG_ENQUEUE,
+        colorize=False if settings.LOG_JSON else None,
+        backtrace=False,
+        diagnose=False,
+    )
@@ -0,0 +1,188 @@
+# app/core/metrics.py
+from bisect import bisect_left
+from typing import Hashable, Sequence
+
+# ==============================
+# 📈 Primitivas de métricas
+# ==============================
+# Límites por defecto (segundos) para latencias: de 1 ms a 10 s
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Sentencias SQL por petición: detecta N+1 (una petición que crece con el tamaño de la página)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 200)
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos, compatible con el modelo de Prometheus.
+
+    Cada observación cuesta una búsqueda binaria y tres sumas, sin reservar memoria.
+
+    Atributos:
+        limites (tuple[float, ...]): Límites superiores de los buckets (sin +Inf).
+        total (int): Número de observaciones.
+        suma (float): Suma de los valores observados.
+    """
+
+    def __init__(self, limites: Sequence[float] = LIMITES_LATENCIA):
+        self.limites = tuple(sorted(limites))
+        self.cuentas = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.suma = 0.0
+
+    def observar(self, valor: float) -> None:
+        """Registra un valor en el bucket correspondiente."""
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.suma += valor
+
+    def acumulados(self) -> list[tuple[float, int]]:
+        """Retorna pares (límite, cuenta acumulada), terminando en +Inf."""
+        pares = []
+        acumulado = 0
+        for limite, cuenta in zip((*self.limites, float("inf")), self.cuentas):
+            acumulado += cuenta
+            pares.append((limite, acumulado))
+        return pares
+
+    def cuantil(self, q: float) -> float:
+        """
+        Estima un cuantil como el límite superior del bucket que lo contiene.
+
+        Args:
+            q (float): Cuantil entre 0 y 1.
+
+        Returns:
+            float: Límite del bucket (o el último límite finito si cae en +Inf); 0 si no hay datos.
+        """
+        if not self.total:
+            return 0.0
+        objetivo = q * self.total
+        for limite, acumulado in self.acumulados():
+            if acumulado >= objetivo:
+                return limite if limite != float("inf") else self.limites[-1]
+        return self.limites[-1]
+
+    def instantanea(self) -> dict:
+        """Resumen serializable a JSON del histograma."""
+        return {
+            "total": self.total,
+            "suma": round(self.suma, 6),
+            "media": round(self.suma / self.total, 6) if self.total else 0.0,
+            "p50": self.cuantil(0.50),
+            "p95": self.cuantil(0.95),
+            "p99": self.cuantil(0.99),
+            "buckets": {("+Inf" if l == float("inf") else str(l)): c for l, c in self.acumulados()},
+        }
+
+
+# ==============================
+# 📤 Familias con etiquetas y exposición Prometheus
+# ==============================
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formatear_etiquetas(nombres: Sequence[str], valores: Sequence, extra: str = "") -> str:
+    """
+    Formatea etiquetas al estilo Prometheus: `{a="x",b="y"}`.
+
+    Args:
+        nombres (Sequence[str]): Nombres de las etiquetas.
+        valores (Sequence): Valores en el mismo orden.
+        extra (str): Etiqueta ya formateada que se añade al final (p. ej. `le="0.5"`).
+
+    Returns:
+        str: Etiquetas entre llaves, o cadena vacía si no hay ninguna.
+    """
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Familia:
+    """Base de las familias de métricas: un valor por combinación de etiquetas."""
+
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: dict[tuple[Hashable, ...], object] = {}
+
+    def cabecera(self) -> list[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class FamiliaContadores(_Familia):
+    """Contadores monótonos etiquetados (p. ej. respuestas por ruta y código)."""
+
+    tipo = "counter"
+
+    def incrementar(self, *valores: Hashable, n: float = 1) -> None:
+        """Suma `n` a la serie con esas etiquetas."""
+        self._series[valores] = self._series.get(valores, 0) + n
+
+    def valor(self, *valores: Hashable) -> float:
+        """Valor actual de una serie (0 si no existe)."""
+        return self._series.get(valores, 0)
+
+    def exportar(self) -> list[str]:
+        """Líneas en formato de exposición de Prometheus."""
+        lineas = self.cabecera()
+        for valores, total in sorted(self._series.items()):
+            lineas.append(f"{self.nombre}{formatear_etiquetas(self.etiquetas, valores)} {_formatear_numero(total)}")
+        return lineas
+
+
+class FamiliaMedidores(FamiliaContadores):
+    """Medidores (gauges) etiquetados: pueden subir y bajar."""
+
+    tipo = "gauge"
+
+    def fijar(self, *valores: Hashable, valor: float) -> None:
+        """Asigna el valor de una serie."""
+        self._series[valores] = valor
+
+
+class FamiliaHistogramas(_Familia):
+    """Histogramas etiquetados que comparten límites."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+
+    def serie(self, *valores: Hashable) -> Histograma:
+        """Histograma de esa combinación de etiquetas (se crea la primera vez)."""
+        histograma = self._series.get(valores)
+        if histograma is None:
+            histograma = self._series[valores] = Histograma(self.limites)
+        return histograma
+
+    def exportar(self) -> list[str]:
+        """Líneas en formato de exposición de Prometheus (_bucket, _sum, _count)."""
+        lineas = self.cabecera()
+        for valores, histograma in sorted(self._series.items()):
+            lineas.extend(lineas_histograma(self.nombre, self.etiquetas, valores, histograma))
+        return lineas
+
+
+def lineas_histograma(nombre: str, etiquetas: Sequence[str], valores: Sequence, histograma: Histograma) -> list[str]:
+    """Series _bucket, _sum y _count de un histograma en formato Prometheus."""
+    lineas = []
+    for limite, acumulado in histograma.acumulados():
+        le = 'le="' + _formatear_numero(limite) + '"'
+        lineas.append(f"{nombre}_bucket{formatear_etiquetas(etiquetas, valores, le)} {acumulado}")
+    sufijo = formatear_etiquetas(etiquetas, valores)
+    lineas.append(f"{nombre}_sum{sufijo} {histograma.suma!r}")
+    lineas.append(f"{nombre}_count{sufijo} {histograma.total}")
+    return lineas
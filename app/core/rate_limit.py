@@ -0,0 +1,268 @@
+# app/core/rate_limit.py
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Protocol, Sequence
+
+from fastapi import Request
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.exceptions import LimiteExcedidoError
+
+# Segundos de cada unidad admitida en los límites ("10/minute")
+UNIDADES = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Limite:
+    """
+    Límite de `peticiones` por `periodo` segundos, con ráfagas de hasta `peticiones`.
+
+    Atributos:
+        peticiones (int): Peticiones permitidas por periodo.
+        periodo (float): Duración del periodo en segundos.
+    """
+    peticiones: int
+    periodo: float
+
+    @classmethod
+    def desde_texto(cls, texto: str) -> "Limite":
+        """
+        Crea un límite a partir de un texto "N/unidad" (p. ej. "5/minute").
+
+        Args:
+            texto (str): Límite con unidad second, minute, hour o day.
+
+        Returns:
+            Limite: Límite equivalente.
+
+        Raises:
+            ValueError: Si el texto no tiene el formato esperado.
+        """
+        peticiones, _, unidad = texto.strip().partition("/")
+        if unidad not in UNIDADES or int(peticiones) <= 0:
+            raise ValueError(f"Límite no válido: {texto!r} (formato N/second|minute|hour|day)")
+        return cls(int(peticiones), float(UNIDADES[unidad]))
+
+    @property
+    def intervalo(self) -> float:
+        """Separación media entre peticiones permitidas."""
+        return self.periodo / self.peticiones
+
+
+def huella(valor: str) -> str:
+    """
+    Resume un valor del cliente (email, usuario) a un tamaño fijo para usarlo como clave.
+
+    Así la memoria por clave está acotada aunque el cliente envíe valores enormes.
+    """
+    return hashlib.blake2b(valor.strip().lower().encode(), digest_size=12).hexdigest()
+
+
+class AlmacenLimites(Protocol):
+    """Almacén de contadores de límites (local o compartido entre workers)."""
+
+    async def consumir(self, clave: str, limite: Limite) -> float:
+        """Registra una petición; retorna 0 si se permite o los segundos a esperar si no."""
+        ...
+
+    async def cerrar(self) -> None:
+        ...
+
+
+# ==============================
+# 🧮 Almacén en memoria (GCRA)
+# ==============================
+class AlmacenMemoria:
+    """
+    Contadores en memoria con el algoritmo GCRA (equivalente a un token bucket).
+
+    Por cada clave se guarda un único float, el "instante teórico de llegada" (TAT):
+    cada petición lo adelanta `intervalo` segundos y se rechaza si quedaría más de
+    `periodo` segundos por delante del reloj. Las claves se guardan en orden LRU y,
+    superado `max_claves`, se desalojan las menos usadas; una clave cuyo TAT ya pasó
+    equivale a una ausente, así que desalojarla no cambia ninguna decisión.
+
+    Sirve de almacén único con un solo worker, en pruebas y como respaldo si el
+    almacén compartido no responde. No es seguro entre hilos: se usa desde el event loop.
+
+    Atributos:
+        max_claves (int): Claves máximas en memoria.
+        desalojadas (int): Claves desalojadas aún activas (el límite se reinicia para ellas).
+    """
+
+    def __init__(self, max_claves: int):
+        self.max_claves = max_claves
+        self.desalojadas = 0
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    async def consumir(self, clave: str, limite: Limite) -> float:
+        ahora = time.monotonic()
+        tat = max(self._tat.get(clave, ahora), ahora)
+        nuevo = tat + limite.intervalo
+        espera = nuevo - ahora - limite.periodo
+        if espera > 0:
+            return espera
+        self._tat[clave] = nuevo
+        self._tat.move_to_end(clave)
+        while len(self._tat) > self.max_claves:
+            _, tat_desalojado = self._tat.popitem(last=False)
+            if tat_desalojado > ahora:
+                self.desalojadas += 1
+        return 0.0
+
+    async def cerrar(self) -> None:
+        self._tat.clear()
+
+
+# ==============================
+# 🌐 Almacén compartido en Redis
+# ==============================
+# GCRA atómico en Redis con el reloj del servidor (común a todos los workers), en ms
+_SCRIPT_GCRA = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local intervalo = tonumber(ARGV[1])
+local periodo = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or ahora
+if tat < ahora then tat = ahora end
+local nuevo = tat + intervalo
+local espera = nuevo - ahora - periodo
+if espera > 0 then return espera end
+redis.call('SET', KEYS[1], nuevo, 'PX', math.ceil(nuevo - ahora))
+return 0
+"""
+
+
+class AlmacenRedis:
+    """
+    Contadores compartidos por todos los workers en Redis, con el mismo GCRA en un script Lua.
+
+    Cada clave caduca sola cuando su TAT pasa, así que la memoria de Redis queda acotada
+    por las claves activas. Requiere el paquete opcional `redis` (redis.asyncio).
+
+    Atributos:
+        prefijo (str): Prefijo de las claves en Redis.
+    """
+
+    def __init__(self, url: str, prefijo: str = "limite:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requiere el paquete 'redis' (pip install redis)") from e
+        self.prefijo = prefijo
+        self._cliente = redis_asyncio.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._cliente.register_script(_SCRIPT_GCRA)
+
+    async def consumir(self, clave: str, limite: Limite) -> float:
+        espera_ms = await self._script(
+            keys=[self.prefijo + clave],
+            args=[int(limite.intervalo * 1000), int(limite.periodo * 1000)],
+        )
+        return int(espera_ms) / 1000
+
+    async def cerrar(self) -> None:
+        await self._cliente.aclose()
+
+
+# ==============================
+# 🚦 Limitador
+# ==============================
+class LimitadorPeticiones:
+    """
+    Aplica límites por clave (IP, usuario...) y rechaza con 429 antes de cualquier trabajo.
+
+    Si el almacén compartido falla, la petición se evalúa con el almacén local del
+    worker: el límite efectivo se multiplica por el número de workers pero no desaparece.
+
+    Atributos:
+        habilitado (bool): Si es False, `comprobar` no limita nada.
+        almacen (AlmacenLimites): Almacén principal.
+        respaldo (AlmacenMemoria): Almacén local si el principal falla (puede ser el mismo).
+        rechazadas (Counter): Peticiones rechazadas por regla.
+        errores_almacen (int): Fallos del almacén principal.
+    """
+
+    def __init__(self, almacen: AlmacenLimites, respaldo: AlmacenMemoria, habilitado: bool = True):
+        self.habilitado = habilitado
+        self.almacen = almacen
+        self.respaldo = respaldo
+        self.rechazadas: Counter = Counter()
+        self.errores_almacen = 0
+
+    async def _consumir(self, clave: str, limite: Limite) -> float:
+        if self.almacen is self.respaldo:
+            return await self.respaldo.consumir(clave, limite)
+        try:
+            return await self.almacen.consumir(clave, limite)
+        except Exception as e:
+            self.errores_almacen += 1
+            logger.warning(f"Almacén de límites no disponible, se usa el local: {e}")
+            return await self.respaldo.consumir(clave, limite)
+
+    async def comprobar(self, regla: str, claves: Sequence[tuple[str, Limite]]) -> None:
+        """
+        Registra una petición contra cada clave y rechaza si alguna supera su límite.
+
+        Args:
+            regla (str): Nombre de la regla (prefijo de las claves y etiqueta de métricas).
+            claves (Sequence[tuple[str, Limite]]): Pares (clave, límite) a comprobar.
+
+        Raises:
+            LimiteExcedidoError: 429 con Retry-After si alguna clave está por encima del límite.
+        """
+        if not self.habilitado:
+            return
+        espera = 0.0
+        for clave, limite in claves:
+            espera = max(espera, await self._consumir(f"{regla}:{clave}", limite))
+        if espera > 0:
+            self.rechazadas[regla] += 1
+            logger.warning(f"Límite de peticiones superado en {regla}: {[c for c, _ in claves]}")
+            raise LimiteExcedidoError(retry_after=espera)
+
+    def estadisticas(self) -> dict:
+        """Rechazos por regla y estado de los almacenes."""
+        return {
+            "habilitado": self.habilitado,
+            "almacen": type(self.almacen).__name__,
+            "rechazadas": dict(self.rechazadas),
+            "errores_almacen": self.errores_almacen,
+            "claves_locales": len(self.respaldo),
+            "desalojadas": self.respaldo.desalojadas,
+        }
+
+    async def cerrar(self) -> None:
+        """Cierra la conexión del almacén compartido, si la hay."""
+        await self.almacen.cerrar()
+
+
+def crear_limitador() -> LimitadorPeticiones:
+    """Construye el limitador según RATE_LIMIT_BACKEND."""
+    local = AlmacenMemoria(settings.RATE_LIMIT_MAX_KEYS)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        if not settings.RATE_LIMIT_REDIS_URL:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requiere RATE_LIMIT_REDIS_URL")
+        return LimitadorPeticiones(AlmacenRedis(settings.RATE_LIMIT_REDIS_URL), local, settings.RATE_LIMIT_ENABLED)
+    if settings.RATE_LIMIT_BACKEND != "memory":
+        raise RuntimeError(f"RATE_LIMIT_BACKEND no válido: {settings.RATE_LIMIT_BACKEND}")
+    return LimitadorPeticiones(local, local, settings.RATE_LIMIT_ENABLED)
+
+
+limitador = crear_limitador()
+
+
+def ip_cliente(request: Request) -> str:
+    """
+    IP del cliente para las claves de los límites.
+
+    Detrás de un proxy, uvicorn debe arrancarse con --proxy-headers y
+    --forwarded-allow-ips para que `request.client` sea la IP real (sin confiar
+    en cabeceras X-Forwarded-For enviadas por cualquiera).
+    """
+    return request.client.host if request.client else "desconocida"
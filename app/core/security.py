@@ -1,17 +1,31 @@
 # app/core/security.py
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from app.core.config import settings
-from typing import Optional
+from functools import lru_cache
+from app.core.cache import TTLCache
+from app.core.config import settings, por_worker
+from app.utils.exceptions import ServicioSaturadoError
+from typing import TYPE_CHECKING, Callable, Optional
 from loguru import logger
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
 # ==============================
 # 🔐 Configuración general
 # ==============================
 ALGORITHM = "HS256"
-# Contexto para encriptar contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# passlib y jose (con el backend de cryptography) se importan al primer uso y no al
+# cargar la aplicación: suman ~50 ms al arranque de cada worker y no los necesitan
+# ni init_db ni las sondas de salud.
+@lru_cache(maxsize=1)
+def contexto_hash() -> "CryptContext":
+    """Contexto de passlib para encriptar contraseñas, creado la primera vez que se usa."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # ==============================
 # 🔑 Funciones para contraseñas
@@ -39,7 +53,7 @@ def hash_password(password: str) -> str:
             password_bytes = password_bytes[:72]
             password = password_bytes.decode("utf-8", errors="ignore")
 
-        hashed = pwd_context.hash(password)
+        hashed = contexto_hash().hash(password)
         logger.debug("Contraseña hasheada correctamente.")
         return hashed
     except Exception as e:
@@ -58,13 +72,114 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         bool: True si coinciden, False si no.
     """
     try:
-        result = pwd_context.verify(plain_password, hashed_password)
-        logger.debug(f"Verificación de contraseña: {result}")
+        result = contexto_hash().verify(plain_password, hashed_password)
+        logger.debug("Verificación de contraseña: {}", result)
         return result
     except Exception as e:
         logger.error(f"Error al verificar contraseña: {e}")
         return False
 
+# ==============================
+# 🧵 Hashing fuera del event loop
+# ==============================
+class PoolHashing:
+    """
+    Pool acotado para ejecutar bcrypt sin bloquear el event loop de uvicorn.
+
+    bcrypt libera el GIL, así que un pool de hilos basta en la mayoría de casos;
+    con "process" se usa un pool de procesos. Como máximo `workers + max_cola`
+    operaciones pueden estar en curso o esperando: por encima de ese límite se
+    rechaza la petición con 503 y Retry-After en lugar de acumular latencia.
+
+    Atributos:
+        tipo (str): "thread" o "process".
+        workers (int): Número de hilos/procesos.
+        capacidad (int): Operaciones admitidas a la vez (en ejecución + en cola).
+        en_curso (int): Operaciones admitidas actualmente.
+        rechazadas (int): Operaciones rechazadas por saturación.
+    """
+
+    def __init__(self, tipo: str, workers: int, max_cola: int, retry_after: int):
+        self.tipo = tipo
+        self.workers = workers
+        self.capacidad = workers + max_cola
+        self.retry_after = retry_after
+        self.en_curso = 0
+        self.rechazadas = 0
+        self._executor: Optional[Executor] = None
+
+    def _obtener_executor(self) -> Executor:
+        # Creación perezosa: los procesos del pool no deben arrancar al importar el módulo
+        if self._executor is None:
+            if self.tipo == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def ejecutar(self, fn: Callable, *args):
+        """
+        Ejecuta `fn(*args)` en el pool y espera su resultado sin bloquear el loop.
+
+        Raises:
+            ServicioSaturadoError: Si el pool y su cola están llenos.
+        """
+        if self.en_curso >= self.capacidad:
+            self.rechazadas += 1
+            logger.warning(f"Pool de hashing saturado ({self.en_curso}/{self.capacidad})")
+            raise ServicioSaturadoError("Servicio ocupado, inténtelo de nuevo en unos segundos", self.retry_after)
+        self.en_curso += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtener_executor(), fn, *args)
+        finally:
+            self.en_curso -= 1
+
+    def cerrar(self) -> None:
+        """Cierra el pool, esperando a las operaciones en curso."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+pool_hashing = PoolHashing(
+    settings.PASSWORD_HASH_POOL,
+    por_worker(settings.PASSWORD_HASH_WORKERS),
+    settings.PASSWORD_HASH_MAX_QUEUE,
+    settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+
+async def hash_password_async(password: str) -> str:
+    """
+    Versión asíncrona de `hash_password` que se ejecuta en el pool de hashing.
+
+    Args:
+        password (str): Contraseña en texto plano.
+
+    Returns:
+        str: Hash seguro de la contraseña.
+
+    Raises:
+        ServicioSaturadoError: Si el pool de hashing está saturado.
+    """
+    return await pool_hashing.ejecutar(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Versión asíncrona de `verify_password` que se ejecuta en el pool de hashing.
+
+    Args:
+        plain_password (str): Contraseña en texto plano.
+        hashed_password (str): Hash de la contraseña.
+
+    Returns:
+        bool: True si coinciden, False si no.
+
+    Raises:
+        ServicioSaturadoError: Si el pool de hashing está saturado.
+    """
+    return await pool_hashing.ejecutar(verify_password, plain_password, hashed_password)
+
 # ==============================
 # 🎫 Funciones para tokens JWT
 # ==============================
@@ -79,6 +194,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         str: Token JWT codificado.
     """
+    from jose import jwt
+
     try:
         to_encode = data.copy()
         expire = datetime.utcnow() + (
@@ -102,10 +219,48 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         Optional[dict]: Payload decodificado si el token es válido, None si no.
     """
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         logger.debug("Token JWT verificado correctamente.")
         return payload
     except JWTError as e:
         logger.warning(f"Token JWT inválido: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# Tokens ya decodificados y validados, para no repetir jwt.decode en cada petición
+tokens_cache = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
+def decodificar_token(token: str) -> Optional[dict]:
+    """
+    Igual que `verify_token`, pero reutilizando los tokens ya validados.
+
+    Cada entrada caduca como muy tarde en el `exp` del token, de modo que un token
+    expirado nunca se sirve desde la caché. Los tokens inválidos no se guardan.
+
+    Args:
+        token (str): Token JWT recibido en la cabecera Authorization.
+
+    Returns:
+        Optional[dict]: Payload decodificado si el token es válido, None si no.
+    """
+    payload = tokens_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = verify_token(token)
+    if payload is not None and "exp" in payload:
+        tokens_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+def invalidar_tokens_de(email: str) -> int:
+    """
+    Elimina de la caché los tokens emitidos para un email (p. ej. al desactivar el usuario).
+
+    Args:
+        email (str): Valor del claim `sub`.
+
+    Returns:
+        int: Número de tokens eliminados.
+    """
+    return tokens_cache.eliminar_si(lambda _token, payload: payload.get("sub") == email)
\ No newline at end of file
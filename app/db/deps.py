@@ -1,8 +1,23 @@
 # app/api/deps.py
 from typing import AsyncGenerator
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import decodificar_token, invalidar_tokens_de
 from app.db.session import AsyncSessionLocal
+from app.db.replicas import COOKIE_LEER_PRIMARIO, enrutador_lecturas
 from app.db import models
 from loguru import logger
+from app.core.logging_config import logger_muestreado
+
+# Esquema Bearer: el token se obtiene en /auth/login
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+# Usuarios autenticados recientemente, por email (claim `sub` del token)
+usuarios_cache = TTLCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
 
 async def get_db() -> AsyncGenerator:
     """
@@ -23,27 +38,111 @@ async def get_db() -> AsyncGenerator:
     finally:
         if session:
             await session.close()
-            logger.debug("Sesión de base de datos cerrada correctamente.")
+            logger_muestreado.debug("Sesión de base de datos cerrada correctamente.")
+
+async def get_db_lectura(request: Request) -> AsyncGenerator:
+    """
+    Dependencia para endpoints de solo lectura: sesión sobre una réplica si las hay.
+
+    Usa el primario si no hay réplicas configuradas, si ninguna está sana o si el
+    cliente escribió hace poco (cookie `leer_primario`), para que lea sus propias escrituras.
+
+    Yields:
+    - session: AsyncSession de solo lectura.
+    """
+    session = None
+    try:
+        if enrutador_lecturas.activo and COOKIE_LEER_PRIMARIO not in request.cookies:
+            session = await enrutador_lecturas.abrir_sesion()
+        else:
+            session = AsyncSessionLocal()
+        yield session
+    except Exception as e:
+        logger.error(f"Error en get_db_lectura: {e}")
+        raise
+    finally:
+        if session:
+            await session.close()
+            logger_muestreado.debug("Sesión de lectura cerrada correctamente.")
 
-async def get_current_user() -> models.Usuario:
+def _instantanea(usuario: models.Usuario) -> models.Usuario:
     """
-    Dependencia simulada para obtener el usuario actual.
+    Copia desvinculada de cualquier sesión, segura para compartir entre peticiones.
+
+    No incluye la contraseña hasheada ni relaciones.
+    """
+    return models.Usuario(
+        id=usuario.id,
+        nombre=usuario.nombre,
+        email=usuario.email,
+        hashed_password="",
+        is_active=usuario.is_active,
+        is_admin=usuario.is_admin,
+        created_at=usuario.created_at,
+    )
+
+def invalidar_usuario(email: str) -> None:
+    """
+    Elimina un usuario y sus tokens de las cachés de autenticación.
+
+    Parámetros:
+    - email: Email del usuario (claim `sub`).
+    """
+    usuarios_cache.pop(email)
+    tokens = invalidar_tokens_de(email)
+    logger.info("Cachés de autenticación invalidadas para {} ({} tokens)", email, tokens)
+
+@event.listens_for(models.Usuario, "after_update")
+def _invalidar_al_desactivar(mapper, connection, target: models.Usuario) -> None:
+    # Cualquier flush del ORM que cambie is_active (o el email) invalida las cachés
+    estado = inspect(target)
+    if estado.attrs.is_active.history.has_changes() or estado.attrs.email.history.has_changes():
+        for email in {target.email, *estado.attrs.email.history.deleted}:
+            invalidar_usuario(email)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> models.Usuario:
+    """
+    Dependencia que valida el token Bearer y retorna el usuario autenticado.
+
+    El payload del token se cachea hasta su `exp` y el usuario durante
+    USER_CACHE_TTL_SECONDS, así la mayoría de peticiones no hacen jwt.decode ni SELECT.
+
+    Parámetros:
+    - token: Token JWT de la cabecera Authorization.
+    - db: AsyncSession de la base de datos (solo si el usuario no está en caché).
 
     Retorna:
-    - models.Usuario: usuario de ejemplo.
-    
-    NOTA: Esta función actualmente retorna un usuario demo.
+    - models.Usuario: copia del usuario autenticado, desvinculada de la sesión.
+    - Lanza HTTPException 401 si el token no es válido o el usuario no existe o está inactivo.
     """
+    credenciales_invalidas = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     try:
-        demo_user = models.Usuario(
-            id=1,
-            nombre="Usuario Demo",
-            email="demo@example.com",
-            hashed_password="x",
-            is_active=True
-        )
-        logger.debug(f"Usuario demo obtenido: {demo_user.email}")
-        return demo_user
+        payload = decodificar_token(token)
+        email = payload.get("sub") if payload else None
+        if not email:
+            raise credenciales_invalidas
+
+        usuario = usuarios_cache.get(email)
+        if usuario is None:
+            result = await db.execute(select(models.Usuario).where(models.Usuario.email == email))
+            encontrado = result.scalar_one_or_none()
+            if encontrado is None or not encontrado.is_active:
+                logger.warning(f"Token válido para usuario inexistente o inactivo: {email}")
+                raise credenciales_invalidas
+            usuario = _instantanea(encontrado)
+            usuarios_cache.set(email, usuario)
+
+        logger_muestreado.debug("Usuario autenticado: {}", usuario.email)
+        return usuario
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en get_current_user: {e}")
-        raise
\ No newline at end of file
+        raise
@@ -1,21 +1,255 @@
 # app/db/init_db.py
+import argparse
 import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Union
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Dialect, Inspector
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
 from app.db.session import engine, Base
 from app.db import models  # Asegura que los modelos estén importados
 from loguru import logger
 
-async def init_db():
+# Tabla con la huella del esquema aplicado. Va en su propio MetaData para no formar
+# parte de la huella ni de Base.metadata.create_all.
+metadata_esquema = MetaData()
+version_esquema = Table(
+    "esquema_version",
+    metadata_esquema,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("huella", String(64), nullable=False),
+    Column("aplicado_en", DateTime, nullable=False),
+)
+
+# Nombre del bloqueo de MySQL que serializa el DDL entre contenedores que arrancan a la vez
+BLOQUEO_DDL = "centro_belleza_init_db"
+
+
+class EsquemaDesfasadoError(RuntimeError):
+    """La BD no coincide con los modelos después de create_all y las migraciones."""
+
+
+# ==============================
+# 🧱 Migraciones de tablas existentes
+# ==============================
+@dataclass(frozen=True)
+class AnadirColumna:
+    """
+    Añade una columna a una tabla existente si aún no la tiene.
+
+    Atributos:
+        tabla (str): Nombre de la tabla.
+        columna (str): Nombre de la columna.
+        definicion (str): Tipo y restricciones para ALTER TABLE; una columna NOT NULL
+            necesita un DEFAULT para rellenar las filas existentes.
+    """
+    tabla: str
+    columna: str
+    definicion: str
+
+    def pendiente(self, inspector: Inspector) -> bool:
+        return self.columna not in {c["name"] for c in inspector.get_columns(self.tabla)}
+
+    def aplicar(self, conn: Connection) -> None:
+        conn.execute(text(f"ALTER TABLE {self.tabla} ADD COLUMN {self.columna} {self.definicion}"))
+
+
+@dataclass(frozen=True)
+class CrearIndice:
+    """
+    Crea en una tabla existente un índice declarado en los modelos si aún no existe.
+
+    Atributos:
+        tabla (str): Nombre de la tabla.
+        indice (str): Nombre del índice en el modelo.
+    """
+    tabla: str
+    indice: str
+
+    def pendiente(self, inspector: Inspector) -> bool:
+        return self.indice not in {i["name"] for i in inspector.get_indexes(self.tabla)}
+
+    def aplicar(self, conn: Connection) -> None:
+        indice = next(i for i in Base.metadata.tables[self.tabla].indexes if i.name == self.indice)
+        conn.execute(CreateIndex(indice))
+
+
+# Pasos en orden de aplicación. create_all no toca las tablas que ya existen: cada
+# columna o índice nuevo en una tabla existente necesita aquí su paso. Son idempotentes
+# (se comprueba antes si hacen falta) y solo se ejecutan cuando cambia la huella.
+MIGRACIONES: tuple[Union[AnadirColumna, CrearIndice], ...] = (
+    # Recordatorios: las reservas existentes quedan sin recordatorio enviado; el
+    # programador solo carga citas futuras, así que no se envían avisos de citas pasadas
+    AnadirColumna("reservas", "recordatorio_enviado", "BOOLEAN NOT NULL DEFAULT 0"),
+    # Control optimista de concurrencia: las reservas existentes empiezan en la versión 1
+    AnadirColumna("reservas", "version", "INTEGER NOT NULL DEFAULT 1"),
+    # Motor de disponibilidad (rango de fechas por servicio) y paginación por cursor sobre fecha_hora
+    CrearIndice("reservas", "ix_reservas_servicio_fecha"),
+    CrearIndice("reservas", "ix_reservas_fecha"),
+    # Filtros del listado de reservas por usuario y por estado
+    CrearIndice("reservas", "ix_reservas_usuario_fecha"),
+    CrearIndice("reservas", "ix_reservas_estado_fecha"),
+)
+
+
+def huella_esquema(dialecto: Dialect) -> str:
+    """
+    Huella del esquema declarado en los modelos: SHA-256 del DDL que generaría create_all
+    y de los pasos de MIGRACIONES.
+
+    Cambia con cualquier tabla, columna, tipo, restricción, índice o migración nuevo o
+    modificado, y es estable entre procesos para el mismo código y dialecto.
+
+    Args:
+        dialecto (Dialect): Dialecto con el que se compila el DDL.
+
+    Returns:
+        str: Huella en hexadecimal (64 caracteres).
+    """
+    h = hashlib.sha256()
+    for tabla in Base.metadata.sorted_tables:
+        h.update(str(CreateTable(tabla).compile(dialect=dialecto)).encode())
+        for indice in sorted(tabla.indexes, key=lambda i: i.name or ""):
+            h.update(str(CreateIndex(indice).compile(dialect=dialecto)).encode())
+    for paso in MIGRACIONES:
+        h.update(repr(paso).encode())
+    return h.hexdigest()
+
+
+async def leer_huella() -> Optional[str]:
     """
-    Inicializa la base de datos creando todas las tablas definidas en los modelos.
+    Huella guardada en la BD, o None si la tabla `esquema_version` aún no existe.
     """
     try:
+        async with engine.connect() as conn:
+            return (await conn.execute(select(version_esquema.c.huella).where(version_esquema.c.id == 1))).scalar()
+    except DBAPIError:
+        return None
+
+
+def diferencias_esquema(conn: Connection) -> list[str]:
+    """
+    Compara las tablas reales con los modelos: tablas, columnas e índices que faltan.
+
+    Solo se comparan nombres; los tipos varían entre dialectos al reflejarlos.
+
+    Args:
+        conn (Connection): Conexión síncrona (dentro de run_sync).
+
+    Returns:
+        list[str]: Descripción de cada diferencia; vacía si el esquema coincide.
+    """
+    inspector = inspect(conn)
+    diferencias = []
+    for tabla in Base.metadata.sorted_tables:
+        if not inspector.has_table(tabla.name):
+            diferencias.append(f"falta la tabla {tabla.name}")
+            continue
+        columnas = {c["name"] for c in inspector.get_columns(tabla.name)}
+        diferencias += [f"falta la columna {tabla.name}.{c.name}" for c in tabla.columns if c.name not in columnas]
+        indices = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        diferencias += [
+            f"falta el índice {i.name} en {tabla.name}"
+            for i in sorted(tabla.indexes, key=lambda i: i.name or "") if i.name not in indices
+        ]
+    return diferencias
+
+
+def _migrar(conn: Connection) -> None:
+    inspector = inspect(conn)
+    for paso in MIGRACIONES:
+        # Una tabla que no existía la acaba de crear create_all con todo lo declarado
+        if inspector.has_table(paso.tabla) and paso.pendiente(inspector):
+            logger.info("🧱 Migración: {}", paso)
+            paso.aplicar(conn)
+            inspector.clear_cache()
+
+
+def _aplicar_ddl(conn: Connection, huella: str, forzar: bool) -> Optional[str]:
+    # Se relee la huella ya con el bloqueo: otro contenedor puede haberlo aplicado mientras se esperaba
+    metadata_esquema.create_all(conn)
+    anterior = conn.execute(select(version_esquema.c.huella).where(version_esquema.c.id == 1)).scalar()
+    if anterior == huella and not forzar:
+        return anterior
+    Base.metadata.create_all(conn)
+    _migrar(conn)
+    # La huella solo se guarda si el esquema real ya coincide con los modelos; si no,
+    # el arranque se detiene en lugar de dar por aplicado un esquema incompleto
+    diferencias = diferencias_esquema(conn)
+    if diferencias:
+        raise EsquemaDesfasadoError(
+            "El esquema de la base de datos no coincide con los modelos tras create_all y las migraciones: "
+            + "; ".join(diferencias)
+            + ". Añade los pasos que faltan a MIGRACIONES en app/db/init_db.py."
+        )
+    conn.execute(delete(version_esquema))
+    conn.execute(insert(version_esquema).values(id=1, huella=huella, aplicado_en=datetime.utcnow()))
+    return anterior
+
+
+async def init_db(forzar: bool = False) -> bool:
+    """
+    Crea y migra las tablas de los modelos solo si el esquema cambió desde el último arranque.
+
+    En el caso habitual (mismo código que el último despliegue) basta una consulta a
+    `esquema_version` y no se ejecuta ningún DDL ni la reflexión tabla a tabla de
+    create_all. Si la huella no coincide, create_all crea las tablas que faltan (con
+    sus índices), los pasos de MIGRACIONES añaden a las tablas existentes las columnas
+    e índices nuevos, y se comprueba que las columnas e índices reales coinciden con
+    los modelos antes de guardar la nueva huella.
+
+    Args:
+        forzar (bool): Aplicar el DDL y la comprobación aunque la huella coincida.
+
+    Returns:
+        bool: True si se ejecutó el DDL, False si el esquema ya estaba al día.
+
+    Raises:
+        EsquemaDesfasadoError: Si tras las migraciones sigue faltando alguna tabla,
+            columna o índice; la huella no se guarda y el arranque se detiene.
+    """
+    t0 = time.perf_counter()
+    try:
+        huella = huella_esquema(engine.dialect)
+        if not forzar and await leer_huella() == huella:
+            logger.info("✅ Esquema al día ({}), sin DDL en {:.0f} ms", huella[:12], (time.perf_counter() - t0) * 1000)
+            return False
+
         async with engine.begin() as conn:
-            # Crear todas las tablas
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("✅ Tablas creadas correctamente en la base de datos.")
+            mysql = engine.dialect.name == "mysql"
+            if mysql:
+                await conn.execute(text("SELECT GET_LOCK(:nombre, 60)"), {"nombre": BLOQUEO_DDL})
+            try:
+                anterior = await conn.run_sync(_aplicar_ddl, huella, forzar)
+            finally:
+                if mysql:
+                    await conn.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": BLOQUEO_DDL})
+        if anterior == huella and not forzar:
+            logger.info("✅ Esquema aplicado por otro proceso mientras se esperaba el bloqueo ({})", huella[:12])
+            return False
+        if anterior is not None and anterior != huella:
+            logger.info("El esquema de los modelos cambió ({} -> {}): tablas migradas y verificadas", anterior[:12], huella[:12])
+        logger.info("✅ Tablas creadas correctamente en la base de datos ({}, {:.0f} ms).", huella[:12], (time.perf_counter() - t0) * 1000)
+        return True
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {e}")
         raise
 
+
+async def main(forzar: bool) -> None:
+    try:
+        await init_db(forzar)
+    finally:
+        await engine.dispose()
+
+
 if __name__ == "__main__":
-    asyncio.run(init_db())
+    parser = argparse.ArgumentParser(description="Crea y migra las tablas si el esquema de los modelos cambió.")
+    parser.add_argument("--forzar", action="store_true", help="aplicar el DDL y la comprobación aunque la huella coincida")
+    args = parser.parse_args()
+    asyncio.run(main(args.forzar))
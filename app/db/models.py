@@ -1,5 +1,5 @@
 # app/db/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Boolean, func
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Float, Boolean, Index, LargeBinary, false, func, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -73,19 +73,101 @@ class Reserva(Base):
         servicio_id (int): FK al servicio reservado.
         fecha_hora (datetime): Fecha y hora de la reserva.
         estado (str): Estado de la reserva ("pendiente", "confirmado", "cancelado").
+        recordatorio_enviado (bool): Indica si ya se envió (o reclamó) el recordatorio de la cita.
+        version (int): Versión para el control optimista de concurrencia; cada cambio de
+            estado o de fecha la incrementa (ver `app.services.estados`).
         created_at (datetime): Fecha de creación del registro.
         usuario (Usuario): Relación con el usuario.
         servicio (Servicio): Relación con el servicio.
     """
     __tablename__ = "reservas"
+    __table_args__ = (
+        # Búsqueda por rango de fechas dentro de un servicio (motor de disponibilidad y
+        # listado filtrado por servicio)
+        Index("ix_reservas_servicio_fecha", "servicio_id", "fecha_hora"),
+        # Listado de las reservas de un usuario por fecha. También cubre la FK: MySQL no
+        # crea su índice implícito sobre usuario_id si ya hay uno que empieza por ella
+        Index("ix_reservas_usuario_fecha", "usuario_id", "fecha_hora"),
+        # Listado por estado (p. ej. pendientes de confirmar) en un rango de fechas
+        Index("ix_reservas_estado_fecha", "estado", "fecha_hora"),
+        # Paginación por cursor sobre (fecha_hora, id) y ventanas del programador de recordatorios;
+        # InnoDB añade la PK a cada índice secundario
+        Index("ix_reservas_fecha", "fecha_hora"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=False)
     fecha_hora = Column(DateTime(timezone=True), nullable=False)
     estado = Column(String(50), default="pendiente")  # pendiente, confirmado, cancelado
+    recordatorio_enviado = Column(Boolean, default=False, server_default=false(), nullable=False)
+    # Se incrementa en el propio UPDATE condicional (WHERE id = ? AND version = ?) de cada
+    # transición; reclamar el recordatorio no la cambia, para no invalidar ediciones en curso
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relaciones
     usuario = relationship("Usuario", back_populates="reservas")
-    servicio = relationship("Servicio", back_populates="reservas")
\ No newline at end of file
+    servicio = relationship("Servicio", back_populates="reservas")
+
+# ==============================
+# 📊 Resumen diario de reservas
+# ==============================
+class ResumenReserva(Base):
+    """
+    Reservas e ingresos por servicio, día (UTC) y estado, mantenidos de forma incremental.
+
+    Cada alta o cambio de estado de una reserva ajusta su fila en la misma transacción
+    (ver `app.services.resumen`), de modo que los informes leen este resumen y su coste
+    no crece con el histórico de reservas.
+
+    Atributos:
+        servicio_id (int): FK al servicio.
+        fecha (date): Día de la cita, en UTC.
+        estado (str): Estado de las reservas contadas.
+        reservas (int): Número de reservas.
+        ingresos (float): Suma del precio del servicio vigente al registrar cada reserva.
+    """
+    __tablename__ = "resumen_reservas"
+    __table_args__ = (
+        # Informes por rango de fechas de todos los servicios
+        Index("ix_resumen_reservas_fecha", "fecha"),
+    )
+
+    servicio_id = Column(Integer, ForeignKey("servicios.id"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    estado = Column(String(50), primary_key=True)
+    reservas = Column(Integer, nullable=False, default=0)
+    ingresos = Column(Float, nullable=False, default=0.0)
+
+# ==============================
+# 🔁 Respuestas de peticiones idempotentes
+# ==============================
+class RespuestaIdempotente(Base):
+    """
+    Respuesta guardada de una petición POST con cabecera Idempotency-Key.
+
+    Se inserta en la misma transacción que la escritura que produjo la respuesta, de
+    modo que un reintento con la misma clave (en cualquier worker, o tras un reinicio)
+    la repite sin volver a ejecutar el handler. Ver `app.services.idempotencia`.
+
+    Atributos:
+        ambito (str): Endpoint y, si lo hay, usuario autenticado al que pertenece la clave.
+        clave (str): Valor de la cabecera Idempotency-Key.
+        huella (str): Huella del cuerpo de la petición, para rechazar la clave con otro cuerpo.
+        status_code (int): Código HTTP de la respuesta.
+        cuerpo (bytes): Cuerpo JSON de la respuesta.
+        created_at (datetime): Momento en que se guardó (UTC); caduca tras IDEMPOTENCY_TTL_SECONDS.
+    """
+    __tablename__ = "respuestas_idempotentes"
+    __table_args__ = (
+        # Purga de las respuestas caducadas
+        Index("ix_respuestas_idempotentes_created_at", "created_at"),
+    )
+
+    ambito = Column(String(64), primary_key=True)
+    clave = Column(String(255), primary_key=True)
+    huella = Column(String(32), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    cuerpo = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
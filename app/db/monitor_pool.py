@@ -0,0 +1,123 @@
+# app/db/monitor_pool.py
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from loguru import logger
+
+from app.core.metrics import Histograma, LIMITES_LATENCIA
+
+# Vida de una conexión (segundos): de 1 s a 2 h
+LIMITES_VIDA_CONEXION = (1, 5, 15, 60, 300, 900, 1800, 3600, 7200)
+
+
+# ==============================
+# 🔍 Monitor del pool de conexiones
+# ==============================
+class MonitorPool:
+    """
+    Recoge métricas del pool de conexiones mediante los eventos de SQLAlchemy.
+
+    Atributos:
+        espera_checkout (Histograma): Tiempo esperando una conexión libre (segundos).
+        vida_conexiones (Histograma): Vida de las conexiones cerradas (segundos).
+        checkouts (int): Conexiones entregadas a sesiones.
+        conexiones_creadas (int): Conexiones DBAPI abiertas.
+        conexiones_cerradas (int): Conexiones DBAPI cerradas (reciclado, errores, dispose).
+        invalidaciones (int): Conexiones invalidadas (p. ej. por pre-ping fallido).
+        timeouts (int): Esperas que superaron DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self):
+        self.espera_checkout = Histograma(LIMITES_LATENCIA)
+        self.vida_conexiones = Histograma(LIMITES_VIDA_CONEXION)
+        self.checkouts = 0
+        self.conexiones_creadas = 0
+        self.conexiones_cerradas = 0
+        self.invalidaciones = 0
+        self.timeouts = 0
+
+    def instrumentar(self, engine: AsyncEngine) -> None:
+        """
+        Registra los listeners de eventos sobre el pool del motor.
+
+        Args:
+            engine (AsyncEngine): Motor asíncrono cuyo pool se va a observar.
+        """
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        connection_record.info["creada_en"] = time.monotonic()
+        self.conexiones_creadas += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+
+    def _on_close(self, dbapi_connection, connection_record) -> None:
+        self.conexiones_cerradas += 1
+        creada_en = connection_record.info.get("creada_en")
+        if creada_en is not None:
+            self.vida_conexiones.observar(time.monotonic() - creada_en)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidaciones += 1
+        logger.warning(f"Conexión del pool invalidada: {exception}")
+
+    def estado(self, engine: AsyncEngine) -> dict:
+        """
+        Retorna el estado actual del pool y los histogramas acumulados.
+
+        Args:
+            engine (AsyncEngine): Motor cuyo pool se consulta.
+
+        Returns:
+            dict: Ocupación del pool, contadores e histogramas.
+        """
+        pool = engine.sync_engine.pool
+        ocupacion = {"clase": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            ocupacion.update(
+                tamano=pool.size(),
+                en_uso=pool.checkedout(),
+                libres=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout=pool.timeout(),
+            )
+        return {
+            "pool": ocupacion,
+            "checkouts": self.checkouts,
+            "conexiones_creadas": self.conexiones_creadas,
+            "conexiones_cerradas": self.conexiones_cerradas,
+            "invalidaciones": self.invalidaciones,
+            "timeouts": self.timeouts,
+            "espera_checkout_segundos": self.espera_checkout.instantanea(),
+            "vida_conexiones_segundos": self.vida_conexiones.instantanea(),
+        }
+
+
+monitor_pool = MonitorPool()
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono que mide cuánto espera cada checkout por una conexión libre.
+
+    SQLAlchemy no emite un evento antes del checkout, por eso se cronometra `_do_get`,
+    que es donde se bloquea la espera cuando el pool y el overflow están agotados.
+    """
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            monitor_pool.timeouts += 1
+            raise
+        finally:
+            monitor_pool.espera_checkout.observar(time.perf_counter() - inicio)
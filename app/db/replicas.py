@@ -0,0 +1,176 @@
+# app/db/replicas.py
+import itertools
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, opciones_pool, proteger_tras_fork
+
+# Cookie que marca a un cliente que acaba de escribir: sus lecturas van al primario
+COOKIE_LEER_PRIMARIO = "leer_primario"
+METODOS_LECTURA = {"GET", "HEAD", "OPTIONS"}
+
+
+class Replica:
+    """
+    Réplica de solo lectura con su motor y su estado de salud.
+
+    Atributos:
+        nombre (str): URL sin contraseña, para logs y /interno.
+        engine (AsyncEngine): Motor asíncrono de la réplica.
+        sesiones (async_sessionmaker): Fábrica de sesiones sobre el motor.
+        caida_hasta (float): Instante (monotonic) hasta el que no se usa tras un fallo.
+        usos (int): Sesiones servidas.
+        fallos (int): Fallos de conexión o desconexiones detectadas.
+        ultimo_error (Optional[str]): Último error registrado.
+    """
+
+    def __init__(self, url: str):
+        self.nombre = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_engine(url, echo=False, future=True, **opciones_pool(url))
+        proteger_tras_fork(self.engine)
+        self.sesiones = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.caida_hasta = 0.0
+        self.usos = 0
+        self.fallos = 0
+        self.ultimo_error: Optional[str] = None
+
+    def disponible(self, ahora: float) -> bool:
+        return ahora >= self.caida_hasta
+
+
+# ==============================
+# 🔀 Enrutado de lecturas a réplicas
+# ==============================
+class EnrutadorLecturas:
+    """
+    Reparte las sesiones de solo lectura entre las réplicas configuradas.
+
+    Round-robin entre las réplicas sanas. La sesión se conecta antes de entregarse
+    (con pre-ping si está activo), así que una réplica caída se detecta en la
+    dependencia y se pasa a la siguiente; si ninguna responde, se usa el primario.
+    Una réplica que falla queda fuera `reintento` segundos y después vuelve a probarse.
+    Las desconexiones a mitad de petición también la marcan como caída (evento `handle_error`).
+
+    Atributos:
+        replicas (list[Replica]): Réplicas configuradas (vacía: todo va al primario).
+        reintento (float): Segundos que una réplica caída queda fuera de la rotación.
+        al_primario (int): Lecturas servidas por el primario por falta de réplicas sanas.
+    """
+
+    def __init__(self, urls: list[str], reintento: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.reintento = reintento
+        self.al_primario = 0
+        self._turno = itertools.count()
+        for replica in self.replicas:
+            event.listen(replica.engine.sync_engine, "handle_error", self._al_error(replica))
+
+    @property
+    def activo(self) -> bool:
+        """True si hay al menos una réplica configurada."""
+        return bool(self.replicas)
+
+    def motores(self) -> list[AsyncEngine]:
+        """Motores de las réplicas (para instrumentarlos o cerrarlos)."""
+        return [r.engine for r in self.replicas]
+
+    async def abrir_sesion(self) -> AsyncSession:
+        """
+        Retorna una sesión conectada a una réplica sana, o al primario si no hay ninguna.
+
+        Returns:
+            AsyncSession: Sesión lista para consultas; el llamador debe cerrarla.
+        """
+        ahora = time.monotonic()
+        inicio = next(self._turno)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(inicio + i) % len(self.replicas)]
+            if not replica.disponible(ahora):
+                continue
+            session = replica.sesiones()
+            try:
+                await session.connection()
+            except Exception as e:
+                await session.close()
+                self.marcar_caida(replica, e)
+                continue
+            replica.usos += 1
+            return session
+        self.al_primario += 1
+        return AsyncSessionLocal()
+
+    def marcar_caida(self, replica: Replica, error: Exception) -> None:
+        """Saca una réplica de la rotación durante `reintento` segundos."""
+        replica.fallos += 1
+        replica.ultimo_error = str(error)
+        replica.caida_hasta = time.monotonic() + self.reintento
+        logger.warning(f"Réplica {replica.nombre} fuera de rotación {self.reintento:.0f}s: {error}")
+
+    def _al_error(self, replica: Replica):
+        def escuchar(contexto) -> None:
+            if contexto.is_disconnect:
+                self.marcar_caida(replica, contexto.original_exception)
+        return escuchar
+
+    def estado(self) -> dict:
+        """Salud y uso de cada réplica."""
+        ahora = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "nombre": r.nombre,
+                    "disponible": r.disponible(ahora),
+                    "reintento_en_segundos": round(max(r.caida_hasta - ahora, 0.0), 1),
+                    "usos": r.usos,
+                    "fallos": r.fallos,
+                    "ultimo_error": r.ultimo_error,
+                }
+                for r in self.replicas
+            ],
+            "lecturas_al_primario": self.al_primario,
+        }
+
+    async def cerrar(self) -> None:
+        """Cierra los pools de todas las réplicas."""
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+enrutador_lecturas = EnrutadorLecturas(settings.DATABASE_REPLICA_URLS, settings.REPLICA_RETRY_SECONDS)
+
+
+class MiddlewareLeerEscrituras:
+    """
+    Middleware ASGI que garantiza leer las propias escrituras cuando hay réplicas.
+
+    Tras una escritura con éxito (método distinto de GET/HEAD/OPTIONS y estado < 400)
+    añade la cookie `leer_primario` durante READ_YOUR_WRITES_SECONDS: mientras esté
+    presente, `get_db_lectura` usa el primario y el cliente no ve datos anteriores a
+    su escritura por el retraso de replicación. La cookie viaja con el cliente, así
+    que funciona aunque la siguiente lectura la atienda otro worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f"{COOKIE_LEER_PRIMARIO}=1; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; "
+            f"Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in METODOS_LECTURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                mensaje["headers"] = [*mensaje.get("headers", []), (b"set-cookie", self.cookie)]
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
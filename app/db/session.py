@@ -1,17 +1,62 @@
 # app/db/session.py
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import os
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base
-from app.core.config import settings
+from app.core.config import settings, por_worker
+from app.db.monitor_pool import PoolInstrumentado, monitor_pool
 from loguru import logger
+from app.core.logging_config import logger_muestreado
 from typing import AsyncGenerator
 
 # ==============================
 # 🔧 Configuración de la BD
 # ==============================
 
+def opciones_pool(url: str) -> dict:
+    """
+    Opciones del pool de conexiones según la configuración.
+
+    SQLite (benchmarks, pruebas locales) usa el pool por defecto de su dialecto.
+    DB_POOL_SIZE y DB_MAX_OVERFLOW son del contenedor: cada worker abre su parte,
+    así que el total de conexiones contra MySQL no crece con WEB_WORKERS.
+
+    Args:
+        url (str): URL de conexión.
+
+    Returns:
+        dict: Argumentos para create_async_engine.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": PoolInstrumentado,
+        "pool_size": por_worker(settings.DB_POOL_SIZE),
+        "max_overflow": por_worker(settings.DB_MAX_OVERFLOW, minimo=0),
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def proteger_tras_fork(motor: AsyncEngine) -> None:
+    """
+    Descarta en el proceso hijo las conexiones heredadas del padre tras un fork.
+
+    uvicorn arranca sus workers con spawn (cada uno importa la app y crea su motor),
+    pero un gestor que haga fork tras importar la app (gunicorn --preload) compartiría
+    los sockets del pool entre procesos. `dispose(close=False)` deja al hijo con un
+    pool vacío sin cerrar las conexiones que sigue usando el padre.
+
+    Args:
+        motor (AsyncEngine): Motor a proteger.
+    """
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: motor.sync_engine.dispose(close=False))
+
 # Motor de conexión asíncrono a la base de datos
 # echo=False evita mostrar todas las consultas en consola, cambiar a True para debug
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True, **opciones_pool(settings.DATABASE_URL))
+monitor_pool.instrumentar(engine)
+proteger_tras_fork(engine)
 
 # Creador de sesiones asíncronas
 # expire_on_commit=False evita que los objetos se "expiren" automáticamente tras commit
@@ -42,4 +87,4 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     finally:
         if session:
             await session.close()
-            logger.debug("Sesión de base de datos cerrada correctamente.")
\ No newline at end of file
+            logger_muestreado.debug("Sesión de base de datos cerrada correctamente.")
\ No newline at end of file
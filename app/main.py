@@ -1,17 +1,61 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+# Primero: marca el inicio del informe de arranque antes de importar el resto
+from app.core.arranque import informe_arranque
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from loguru import logger
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+from app.db.session import engine
+from app.core.config import settings
+from app.core.logging_config import configurar_logging
+from app.core.security import pool_hashing
+from app.core.rate_limit import limitador
+from app.tasks.reminders import programador_recordatorios
+from app.utils.email import bandeja_salida
+from app.services.salud import contador_filas
+from app.db.replicas import MiddlewareLeerEscrituras, enrutador_lecturas
+from app.api.metricas import TIPO_PROMETHEUS, MiddlewareMetricas, exportar_prometheus, instrumentar_consultas
+from app.api.routes import auth, servicios, reservas, usuarios, interno, salud
 
-from app.db.session import get_session
-from app.api.routes import auth, servicios, reservas, usuarios
+# Sustituye el sink por defecto de loguru (síncrono, nivel DEBUG) antes de arrancar
+configurar_logging()
+
+# ==============================
+# 🔹 Ciclo de vida (arranque y parada)
+# ==============================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranca las tareas en segundo plano del worker y las detiene al apagar la aplicación.
+    """
+    bandeja_salida.iniciar()
+    if settings.REMINDERS_ENABLED:
+        programador_recordatorios.iniciar()
+    contador_filas.iniciar()
+    informe_arranque.marcar("lifespan")
+    informe_arranque.registrar()
+    logger.info("🚀 API del Centro de Belleza iniciada correctamente")
+    try:
+        yield
+    finally:
+        await contador_filas.detener()
+        await programador_recordatorios.detener()
+        await bandeja_salida.detener()
+        pool_hashing.cerrar()
+        await limitador.cerrar()
+        await enrutador_lecturas.cerrar()
+        # Cierra las conexiones del pool: un worker reciclado no deja conexiones abiertas en MySQL
+        await engine.dispose()
+        logger.info("🛑 API del Centro de Belleza detenida")
+        await logger.complete()  # vaciar la cola del sink antes de salir
 
 # ==============================
 # 🔹 Inicialización de FastAPI
 # ==============================
-app = FastAPI(title="Centro de Belleza API", version="1.0")
+app = FastAPI(title="Centro de Belleza API", version="1.0", lifespan=lifespan)
 
 # ==============================
 # 🔹 Configuración CORS
@@ -22,8 +66,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],  # paginación por cursor
 )
 
+# ==============================
+# 🔹 Métricas (latencia por ruta y consultas SQL por petición)
+# ==============================
+# Se añade después de CORS para quedar por fuera y medir también las respuestas de CORS
+app.add_middleware(MiddlewareMetricas)
+instrumentar_consultas(engine)
+for motor_replica in enrutador_lecturas.motores():
+    instrumentar_consultas(motor_replica)
+
+# ==============================
+# 🔹 Réplicas de lectura (leer las propias escrituras)
+# ==============================
+if enrutador_lecturas.activo:
+    app.add_middleware(MiddlewareLeerEscrituras)
+
 # ==============================
 # 🔹 Registro de routers
 # ==============================
@@ -31,14 +91,8 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(servicios.router, prefix="/servicios", tags=["Servicios"])
 app.include_router(reservas.router, prefix="/reservas", tags=["Reservas"])
 app.include_router(usuarios.router, prefix="/usuarios", tags=["Usuarios"])
-
-# ==============================
-# 🔹 Eventos de arranque
-# ==============================
-@app.on_event("startup")
-async def startup_event():
-    """Evento que se ejecuta al iniciar la aplicación."""
-    logger.info("🚀 API del Centro de Belleza iniciada correctamente")
+app.include_router(interno.router, prefix="/interno")
+app.include_router(salud.router, prefix="/health", tags=["Health"])
 
 # ==============================
 # 🔹 Endpoints generales
@@ -52,24 +106,37 @@ async def root():
     """
     return {"message": "Bienvenido al backend del Centro de Belleza 💅"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Métricas del worker en formato de exposición de Prometheus.
+
+    Incluye latencia, códigos de estado y sentencias SQL por ruta, peticiones en curso,
+    estado del pool de conexiones y de las tareas en segundo plano.
+    """
+    try:
+        return Response(content=exportar_prometheus(engine), media_type=TIPO_PROMETHEUS)
+    except Exception as e:
+        logger.error(f"Error al generar las métricas: {e}")
+        raise HTTPException(status_code=500, detail="Error al generar las métricas")
+
 @app.get("/check_db")
-async def check_db(session: AsyncSession = Depends(get_session)):
+async def check_db():
     """
     Endpoint de verificación de la base de datos.
 
-    Intenta contar los usuarios existentes en la tabla 'usuarios'.
-    
-    Parámetros:
-        session (AsyncSession): Sesión asíncrona de la base de datos.
+    Devuelve el número de usuarios del último conteo en caché, que se refresca cada
+    ROW_COUNT_REFRESH_SECONDS; no ejecuta un COUNT(*) por petición. Para sondas de
+    orquestadores usar /health/live y /health/ready.
 
     Retorna:
-        dict: Número de usuarios en la base de datos.
+        dict: Número de usuarios en la base de datos y antigüedad del conteo en segundos.
     """
     try:
-        query = text("SELECT COUNT(*) FROM usuarios;")
-        result = await session.execute(query)
-        count = result.scalar()
-        return {"usuarios_en_bd": count}
+        count = await contador_filas.obtener("usuarios")
+        return {"usuarios_en_bd": count, "antiguedad_segundos": round(contador_filas.antiguedad(), 1)}
     except Exception as e:
         logger.error(f"Error al consultar la base de datos: {e}")
-        raise HTTPException(status_code=500, detail="Error al consultar la base de datos")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error al consultar la base de datos")
+
+informe_arranque.marcar("importacion")
@@ -1,7 +1,9 @@
 # app/schemas/reserva.py
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Literal, Optional, List
+from app.schemas.servicio import ServicioOut
+from app.schemas.usuario import UsuarioOut
 
 # ==============================
 # 📅 Schemas para Reserva
@@ -25,9 +27,12 @@ class ReservaBase(BaseModel):
 class ReservaCreate(ReservaBase):
     """
     Esquema para la creación de una reserva.
-    Hereda todos los campos de ReservaBase.
+    Hereda los campos de ReservaBase; una reserva nueva solo puede estar pendiente o confirmada.
+
+    Atributos:
+        estado (str, opcional): "pendiente" (por defecto) o "confirmado".
     """
-    pass
+    estado: Optional[Literal["pendiente", "confirmado"]] = "pendiente"
 
 class ReservaUpdate(BaseModel):
     """
@@ -49,10 +54,132 @@ class ReservaOut(ReservaBase):
     Atributos:
         id (int): Identificador único de la reserva.
         created_at (datetime): Fecha de creación de la reserva.
+        version (int): Versión actual; se envía en los PATCH para detectar cambios concurrentes.
     """
     id: int
     created_at: datetime
+    version: int
 
     class Config:
         # Permite crear el schema desde un objeto ORM (modelo SQLAlchemy)
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ReservaExpandidaOut(ReservaOut):
+    """
+    Esquema de salida de una reserva con sus relaciones anidadas (`?expand=`).
+
+    Cada relación solo aparece en la respuesta si se pidió en `expand`.
+
+    Atributos:
+        servicio (ServicioOut, opcional): Servicio reservado.
+        usuario (UsuarioOut, opcional): Usuario que realizó la reserva.
+    """
+    servicio: Optional[ServicioOut] = None
+    usuario: Optional[UsuarioOut] = None
+
+class ReservaCambioEstado(BaseModel):
+    """
+    Esquema para confirmar o cancelar una reserva.
+
+    Atributos:
+        version (int): Versión de la reserva que el cliente leyó por última vez.
+    """
+    version: int
+
+class ReservaReprogramar(ReservaCambioEstado):
+    """
+    Esquema para mover una reserva a otra fecha y hora.
+
+    Atributos:
+        version (int): Versión de la reserva que el cliente leyó por última vez.
+        fecha_hora (datetime): Nueva fecha y hora de la cita.
+    """
+    fecha_hora: datetime
+
+class HuecoOut(BaseModel):
+    """
+    Esquema de salida para un intervalo libre de un servicio.
+
+    Atributos:
+        inicio (datetime): Fecha y hora de inicio del hueco (UTC).
+        fin (datetime): Fecha y hora de fin del hueco (UTC).
+    """
+    inicio: datetime
+    fin: datetime
+
+class DisponibilidadOut(BaseModel):
+    """
+    Esquema de salida para la disponibilidad de un servicio en un rango de fechas.
+
+    Atributos:
+        servicio_id (int): ID del servicio consultado.
+        duracion_minutos (int): Duración de cada reserva del servicio.
+        desde (datetime): Inicio efectivo del rango consultado (UTC).
+        hasta (datetime): Fin del rango consultado (UTC).
+        huecos (List[HuecoOut]): Intervalos libres dentro del rango.
+    """
+    servicio_id: int
+    duracion_minutos: int
+    desde: datetime
+    hasta: datetime
+    huecos: List[HuecoOut]
+
+class ReservaBulkResultado(BaseModel):
+    """
+    Resultado de un elemento de una creación masiva de reservas.
+
+    Atributos:
+        indice (int): Posición del elemento en la lista enviada.
+        status_code (int): Código HTTP equivalente al resultado del elemento (201, 404, 409...).
+        reserva (ReservaOut, opcional): Reserva creada, si tuvo éxito.
+        error (str, opcional): Motivo del fallo, si no se creó.
+    """
+    indice: int
+    status_code: int
+    reserva: Optional[ReservaOut] = None
+    error: Optional[str] = None
+
+class ReservaBulkOut(BaseModel):
+    """
+    Esquema de salida de una creación masiva de reservas.
+
+    Atributos:
+        creadas (int): Número de reservas creadas.
+        fallidas (int): Número de elementos rechazados.
+        resultados (List[ReservaBulkResultado]): Resultado por elemento, en el orden recibido.
+    """
+    creadas: int
+    fallidas: int
+    resultados: List[ReservaBulkResultado]
+
+class ResumenDiaOut(BaseModel):
+    """
+    Esquema de salida de una fila del resumen diario de reservas.
+
+    Atributos:
+        fecha (date): Día de las citas (UTC).
+        servicio_id (int): ID del servicio.
+        estado (str): Estado de las reservas contadas.
+        reservas (int): Número de reservas.
+        ingresos (float): Importe de esas reservas.
+    """
+    fecha: date
+    servicio_id: int
+    estado: str
+    reservas: int
+    ingresos: float
+
+class ResumenServicioOut(BaseModel):
+    """
+    Esquema de salida de los totales de un servicio y estado en un rango de días.
+
+    Atributos:
+        servicio_id (int): ID del servicio.
+        estado (str): Estado de las reservas contadas.
+        reservas (int): Número de reservas en el rango.
+        ingresos (float): Importe de esas reservas.
+    """
+    servicio_id: int
+    estado: str
+    reservas: int
+    ingresos: float
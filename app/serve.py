@@ -0,0 +1,186 @@
+# app/serve.py
+"""
+Punto de entrada de producción: `python -m app.serve`.
+
+Arranca WEB_WORKERS procesos de uvicorn (0 = uno por CPU) sobre el mismo socket,
+con uvloop y httptools, sin el vigilante de ficheros de --reload. Para desarrollo
+sigue sirviendo `uvicorn app.main:app --reload`.
+
+Con más de un worker, el proceso supervisor de uvicorn:
+- reinicia un worker si muere o deja de responder;
+- recicla cada worker tras WEB_MAX_REQUESTS peticiones (más hasta un 10% aleatorio,
+  para que no se reciclen todos a la vez): el worker deja de aceptar conexiones,
+  termina las que tiene en curso (hasta WEB_GRACEFUL_TIMEOUT_SECONDS) y el
+  supervisor arranca otro en su lugar;
+- con SIGHUP reinicia los workers uno a uno (p. ej. tras cambiar la configuración).
+
+Cada worker se arranca con spawn, importa la app y crea su propio motor de BD
+con su parte de DB_POOL_SIZE y DB_MAX_OVERFLOW (ver `app.core.config.por_worker`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from typing import Optional
+
+import uvicorn
+from loguru import logger
+from uvicorn.supervisors import Multiprocess
+
+from app.core.config import por_worker, settings
+
+# Segundos entre dejar de aceptar conexiones y cerrar las que aún no enviaron su petición
+MARGEN_CIERRE = 0.5
+
+
+def numero_workers(configurado: int) -> int:
+    """
+    Workers efectivos: el valor configurado o, si es 0, uno por CPU disponible.
+
+    Args:
+        configurado (int): WEB_WORKERS o el valor de --workers.
+
+    Returns:
+        int: Número de procesos a arrancar (al menos 1).
+    """
+    if configurado > 0:
+        return configurado
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+class MiddlewareCierre:
+    """
+    Middleware ASGI que añade `Connection: close` a las respuestas mientras el worker se detiene.
+
+    uvicorn cierra la conexión tras una respuesta que lleva esa cabecera, en lugar de
+    dejarla abierta para la siguiente petición. Se comprueba al empezar cada respuesta,
+    así que también la reciben las peticiones que ya estaban en curso.
+
+    Atributos:
+        cerrando (bool): Se activa al empezar el apagado del worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cerrando = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if self.cerrando and mensaje["type"] == "http.response.start":
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", ()), (b"connection", b"close")]}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+
+class ServidorWorker(uvicorn.Server):
+    """
+    Servidor de uvicorn que reparte el reciclado de los workers en el tiempo.
+
+    Cada worker recibe una copia de la configuración y suma a `limit_max_requests`
+    un margen aleatorio propio; con el mismo límite exacto, workers con carga
+    equilibrada se reciclarían casi a la vez.
+
+    Al detenerse, uvicorn cierra de inmediato las conexiones keep-alive sin petición
+    en curso, y el cliente que justo enviaba la siguiente recibe un reset. Aquí primero
+    se deja de aceptar conexiones y, durante MARGEN_CIERRE segundos, las respuestas
+    salen con `Connection: close`: los clientes reconectan a otro worker en lugar de
+    reutilizar una conexión que se va a cerrar (ver MiddlewareCierre).
+
+    Atributos:
+        proceso_hijo (bool): Si corre en un worker del supervisor (sale con os._exit al terminar).
+        cierre (Optional[MiddlewareCierre]): Middleware que envuelve la app del worker.
+    """
+
+    def __init__(self, config: uvicorn.Config, proceso_hijo: bool):
+        super().__init__(config)
+        self.proceso_hijo = proceso_hijo
+        self.cierre: Optional[MiddlewareCierre] = None
+
+    def run(self, sockets=None) -> None:
+        if self.config.limit_max_requests:
+            self.config.limit_max_requests += random.randint(0, self.config.limit_max_requests // 10)
+        super().run(sockets=sockets)
+        if self.proceso_hijo:
+            # El supervisor comprueba cada worker con un ping de hasta
+            # timeout_worker_healthcheck segundos. Si llega mientras el intérprete se
+            # cierra (el hilo que responde ya no corre), espera el timeout entero antes de
+            # arrancar el reemplazo. Los logs ya están vaciados (lifespan + handlers).
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(0)
+
+    async def startup(self, sockets=None) -> None:
+        # La app ya está cargada; los protocolos HTTP la toman de la configuración al abrir cada conexión
+        self.cierre = MiddlewareCierre(self.config.loaded_app)
+        self.config.loaded_app = self.cierre
+        await super().startup(sockets=sockets)
+
+    async def shutdown(self, sockets=None) -> None:
+        for servidor in self.servers:
+            servidor.close()
+        if self.cierre is not None:
+            self.cierre.cerrando = True
+        await asyncio.sleep(MARGEN_CIERRE)
+        await super().shutdown(sockets=sockets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API del Centro de Belleza.")
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS, help="procesos de uvicorn (0 = uno por CPU)")
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    args = parser.parse_args()
+
+    workers = numero_workers(args.workers)
+    # Los workers heredan el entorno: así cada uno calcula su parte de los pools
+    os.environ["WEB_WORKERS"] = str(workers)
+    settings.WEB_WORKERS = workers
+
+    if workers > 1 and settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == "memory":
+        logger.warning(
+            f"Límites de peticiones en memoria con {workers} workers: cada worker cuenta por separado, "
+            f"usar RATE_LIMIT_BACKEND=redis para un límite común"
+        )
+    logger.info(
+        "Arrancando {} worker(s) en {}:{} (pool de BD por worker: {}+{})",
+        workers, args.host, args.port,
+        por_worker(settings.DB_POOL_SIZE), por_worker(settings.DB_MAX_OVERFLOW, minimo=0),
+    )
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        # Con un solo worker no hay supervisor que lo reemplace: reciclarlo pararía el servidor
+        limit_max_requests=(settings.WEB_MAX_REQUESTS or None) if workers > 1 else None,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+        timeout_keep_alive=settings.WEB_KEEPALIVE_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=settings.WEB_ACCESS_LOG,
+    )
+    servidor = ServidorWorker(config, proceso_hijo=workers > 1)
+    # Lo mismo que uvicorn.run, pero con ServidorWorker en cada proceso
+    try:
+        if workers == 1:
+            servidor.run()
+        else:
+            Multiprocess(config, target=servidor.run, sockets=[config.bind_socket()]).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
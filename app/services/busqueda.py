@@ -0,0 +1,214 @@
+# app/services/busqueda.py
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Optional
+
+# Palabras vacías del español que no se indexan ni se buscan. Sin "una"/"unas":
+# sin tilde coinciden con "uña"/"uñas"
+PALABRAS_VACIAS = frozenset(
+    "a al con de del e el en la las lo los o para por sin su sus u un unos y".split()
+)
+# Peso de cada aparición de un término según el campo
+PESO_NOMBRE = 3.0
+PESO_DESCRIPCION = 1.0
+# Factor de un término que coincide solo por prefijo ("mani" -> "manicura") frente a uno exacto
+FACTOR_PREFIJO = 0.6
+# Longitud mínima de un término de la consulta para expandirlo por prefijo
+MIN_PREFIJO = 2
+# Multiplicador si el nombre del servicio empieza por la consulta completa
+BONUS_INICIO_NOMBRE = 1.5
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+class _TablaSinMarcas(dict):
+    """Tabla para `str.translate` que quita los diacríticos; cada carácter se descompone una sola vez."""
+
+    def __missing__(self, codigo: int) -> str:
+        base = "".join(c for c in unicodedata.normalize("NFKD", chr(codigo)) if not unicodedata.combining(c))
+        self[codigo] = base
+        return base
+
+
+_SIN_MARCAS = _TablaSinMarcas()
+
+
+def normalizar(texto: str) -> str:
+    """
+    Normaliza un texto para buscar sin distinguir mayúsculas ni tildes.
+
+    Quita tildes, diéresis y la virgulilla de la ñ ("Uñas Depilación" -> "unas depilacion")
+    y sustituye cualquier otro signo por un espacio.
+
+    Args:
+        texto (str): Texto original.
+
+    Returns:
+        str: Texto en minúsculas ASCII, con palabras separadas por un espacio.
+    """
+    texto = texto.casefold()
+    if not texto.isascii():
+        texto = texto.translate(_SIN_MARCAS)
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def _raiz(palabra: str) -> str:
+    # Plural simple: "uñas" y "uña" comparten término
+    return palabra[:-1] if len(palabra) > 3 and palabra.endswith("s") else palabra
+
+
+def terminos(texto: Optional[str]) -> list[str]:
+    """
+    Términos de búsqueda de un texto: normalizados, sin palabras vacías y sin plural.
+
+    Args:
+        texto (Optional[str]): Texto a tokenizar.
+
+    Returns:
+        list[str]: Términos en el orden del texto (con repeticiones).
+    """
+    return _terminos(normalizar(texto or ""))
+
+
+def _terminos(normalizado: str) -> list[str]:
+    return [_raiz(p) for p in normalizado.split() if p not in PALABRAS_VACIAS]
+
+
+# ==============================
+# 🔎 Índice invertido con prefijos
+# ==============================
+class IndiceBusqueda:
+    """
+    Índice invertido en memoria sobre el nombre y la descripción de los servicios.
+
+    Cada término apunta a los servicios que lo contienen con su peso (apariciones por
+    campo). El vocabulario se mantiene ordenado para resolver prefijos con una
+    búsqueda binaria, de modo que una consulta solo recorre los términos que empiezan
+    por lo escrito y nunca el catálogo completo. Añadir, cambiar o quitar un servicio
+    solo toca sus propios términos.
+
+    Puntuación: para cada término de la consulta, el mejor término del índice que
+    coincide (exacto o por prefijo, este con FACTOR_PREFIJO) por su peso y su idf.
+    Todos los términos de la consulta deben aparecer en el servicio.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, float]] = {}
+        self._vocabulario: list[str] = []
+        self._terminos_doc: dict[int, tuple[str, ...]] = {}
+        self._nombres: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._terminos_doc)
+
+    @property
+    def num_terminos(self) -> int:
+        """Tamaño del vocabulario."""
+        return len(self._vocabulario)
+
+    def indexar(self, servicio_id: int, nombre: str, descripcion: Optional[str]) -> None:
+        """
+        Añade un servicio al índice, o reemplaza sus términos si ya estaba.
+
+        Args:
+            servicio_id (int): ID del servicio.
+            nombre (str): Nombre del servicio.
+            descripcion (Optional[str]): Descripción del servicio.
+        """
+        self.quitar(servicio_id)
+        nombre_normalizado = normalizar(nombre)
+        pesos: dict[str, float] = defaultdict(float)
+        for termino in _terminos(nombre_normalizado):
+            pesos[termino] += PESO_NOMBRE
+        for termino in terminos(descripcion):
+            pesos[termino] += PESO_DESCRIPCION
+        for termino, peso in pesos.items():
+            posting = self._postings.get(termino)
+            if posting is None:
+                posting = self._postings[termino] = {}
+                insort(self._vocabulario, termino)
+            posting[servicio_id] = peso
+        self._terminos_doc[servicio_id] = tuple(pesos)
+        self._nombres[servicio_id] = nombre_normalizado
+
+    def quitar(self, servicio_id: int) -> None:
+        """Elimina un servicio del índice (no hace nada si no estaba)."""
+        for termino in self._terminos_doc.pop(servicio_id, ()):
+            posting = self._postings[termino]
+            del posting[servicio_id]
+            if not posting:
+                del self._postings[termino]
+                del self._vocabulario[bisect_left(self._vocabulario, termino)]
+        self._nombres.pop(servicio_id, None)
+
+    def _coincidencias(self, token: str, total: int, prefijo: Optional[str]) -> dict[int, float]:
+        """
+        Puntuación de cada servicio para un término de la consulta.
+
+        Args:
+            token (str): Término ya sin plural; coincide con el mismo término del índice.
+            total (int): Servicios indexados (para el idf).
+            prefijo (Optional[str]): Palabra tal como se escribió, si además se completa por prefijo.
+
+        Returns:
+            dict[int, float]: ID del servicio -> mejor puntuación entre los términos que coinciden.
+        """
+        candidatos = [(token, 1.0)] if token in self._postings else []
+        if prefijo is not None and len(prefijo) >= MIN_PREFIJO:
+            vocabulario = self._vocabulario
+            i = bisect_left(vocabulario, prefijo)
+            while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+                if vocabulario[i] != token:
+                    candidatos.append((vocabulario[i], FACTOR_PREFIJO))
+                i += 1
+
+        parcial: dict[int, float] = {}
+        for termino, factor in candidatos:
+            posting = self._postings[termino]
+            factor *= math.log(1 + total / len(posting))
+            for servicio_id, peso in posting.items():
+                puntos = peso * factor
+                if puntos > parcial.get(servicio_id, 0.0):
+                    parcial[servicio_id] = puntos
+        return parcial
+
+    def buscar(self, consulta: str, limit: int) -> list[int]:
+        """
+        Busca servicios que contengan todos los términos de la consulta.
+
+        Solo la última palabra se completa por prefijo (es la que el cliente está
+        escribiendo); las anteriores deben coincidir enteras, para que "pies manos"
+        no encuentre "piernas".
+
+        Args:
+            consulta (str): Texto escrito por el cliente.
+            limit (int): Número máximo de resultados.
+
+        Returns:
+            list[int]: IDs de los servicios, de mayor a menor puntuación (a igualdad, por ID).
+        """
+        frase = normalizar(consulta)
+        palabras = [p for p in frase.split() if p not in PALABRAS_VACIAS]
+        if not palabras:
+            return []
+        ultima = palabras[-1]
+        total = len(self._terminos_doc)
+        puntuaciones: Optional[dict[int, float]] = None
+        # Primero los términos más largos: suelen ser los más selectivos
+        for token in sorted(dict.fromkeys(map(_raiz, palabras)), key=len, reverse=True):
+            parcial = self._coincidencias(token, total, ultima if token == _raiz(ultima) else None)
+            if puntuaciones is None:
+                puntuaciones = parcial
+            else:
+                puntuaciones = {sid: p + parcial[sid] for sid, p in puntuaciones.items() if sid in parcial}
+            if not puntuaciones:
+                return []
+
+        for servicio_id in puntuaciones:
+            if self._nombres[servicio_id].startswith(frase):
+                puntuaciones[servicio_id] *= BONUS_INICIO_NOMBRE
+        return heapq.nsmallest(limit, puntuaciones, key=lambda sid: (-puntuaciones[sid], sid))
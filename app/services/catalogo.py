@@ -0,0 +1,184 @@
+# app/services/catalogo.py
+import asyncio
+import hashlib
+import time
+from bisect import bisect_right
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.core.config import settings
+from app.db import models
+from app.schemas.servicio import ServicioOut
+from app.services.busqueda import IndiceBusqueda
+
+
+def calcular_etag(contenido: bytes) -> str:
+    """
+    Calcula un ETag fuerte a partir del contenido serializado.
+
+    Al depender solo del contenido, dos workers con el mismo catálogo producen el mismo ETag.
+
+    Args:
+        contenido (bytes): Cuerpo de la respuesta.
+
+    Returns:
+        str: ETag entre comillas, listo para la cabecera.
+    """
+    return '"' + hashlib.blake2b(contenido, digest_size=16).hexdigest() + '"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si la cabecera If-None-Match del cliente coincide con el ETag actual.
+
+    Args:
+        if_none_match (Optional[str]): Valor de la cabecera (puede ser una lista o "*").
+        etag (str): ETag actual del recurso.
+
+    Returns:
+        bool: True si se puede responder 304.
+    """
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos
+
+
+# ==============================
+# 💾 Caché del catálogo de servicios
+# ==============================
+class CatalogoCache:
+    """
+    Copia en memoria del catálogo de servicios, ya serializada a JSON.
+
+    Guarda un mapa id -> bytes de `ServicioOut` y la lista ordenada de ids, de modo
+    que las páginas se arman concatenando bytes sin tocar la BD ni pydantic.
+    `version` se incrementa con cada escritura; la caché se recarga completa al
+    caducar `CATALOG_CACHE_TTL_SECONDS`, lo que recoge cambios hechos por otros workers.
+
+    El índice de búsqueda de los servicios activos se mantiene a la vez: cada escritura
+    y cada recarga reindexan solo los servicios cuyo JSON ha cambiado.
+
+    Atributos:
+        version (int): Contador de versiones del catálogo en este worker.
+        busqueda (IndiceBusqueda): Índice invertido sobre nombre y descripción.
+    """
+
+    def __init__(self, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self.version = 0
+        self._cargado_en: Optional[float] = None
+        self._ids: list[int] = []
+        self._items: dict[int, bytes] = {}
+        self.busqueda = IndiceBusqueda()
+        self._lock = asyncio.Lock()
+
+    def _vigente(self) -> bool:
+        return self._cargado_en is not None and time.monotonic() - self._cargado_en < self.ttl_segundos
+
+    async def asegurar(self, db: AsyncSession) -> None:
+        """
+        Carga el catálogo desde la BD si la caché está vacía o ha caducado.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos (solo se usa si hay que recargar).
+        """
+        if self._vigente():
+            return
+        async with self._lock:
+            if self._vigente():
+                return
+            result = await db.execute(select(models.Servicio).order_by(models.Servicio.id))
+            items = {}
+            cambiados = 0
+            for servicio in result.scalars():
+                servicio_out = ServicioOut.model_validate(servicio)
+                items[servicio.id] = servicio_out.model_dump_json().encode()
+                if self._items.get(servicio.id) != items[servicio.id]:
+                    self._indexar(servicio_out)
+                    cambiados += 1
+            for servicio_id in self._items.keys() - items.keys():
+                self.busqueda.quitar(servicio_id)
+            self._items = items
+            self._ids = sorted(items)
+            self._cargado_en = time.monotonic()
+            self.version += 1
+            logger.debug("Catálogo cargado en caché: {} servicios ({} reindexados), versión {}",
+                         len(items), cambiados, self.version)
+
+    def _indexar(self, servicio: ServicioOut) -> None:
+        # Los servicios inactivos no aparecen en la búsqueda
+        if servicio.is_active is False:
+            self.busqueda.quitar(servicio.id)
+        else:
+            self.busqueda.indexar(servicio.id, servicio.nombre, servicio.descripcion)
+
+    def registrar(self, servicio: ServicioOut) -> None:
+        """
+        Añade o reemplaza un servicio en la caché tras una escritura y sube la versión.
+
+        Args:
+            servicio (ServicioOut): Servicio ya validado.
+        """
+        if servicio.id not in self._items:
+            self._ids.insert(bisect_right(self._ids, servicio.id), servicio.id)
+        self._items[servicio.id] = servicio.model_dump_json().encode()
+        self._indexar(servicio)
+        self.version += 1
+
+    def invalidar(self) -> None:
+        """Fuerza una recarga completa en la siguiente lectura."""
+        self._cargado_en = None
+        self.version += 1
+
+    def obtener(self, servicio_id: int) -> Optional[bytes]:
+        """Retorna el JSON de un servicio o None si no está en caché."""
+        return self._items.get(servicio_id)
+
+    def pagina(self, despues_de: Optional[int], limit: Optional[int]) -> tuple[bytes, Optional[int]]:
+        """
+        Arma una página del catálogo a partir de los bytes ya serializados.
+
+        Args:
+            despues_de (Optional[int]): Último id de la página anterior (cursor), o None.
+            limit (Optional[int]): Tamaño de página; None devuelve el resto del catálogo.
+
+        Returns:
+            tuple[bytes, Optional[int]]: Cuerpo JSON de la página y último id si hay más páginas.
+        """
+        inicio = bisect_right(self._ids, despues_de) if despues_de is not None else 0
+        fin = len(self._ids) if limit is None else min(inicio + limit, len(self._ids))
+        ids = self._ids[inicio:fin]
+        cuerpo = b"[" + b",".join(self._items[i] for i in ids) + b"]"
+        siguiente = ids[-1] if ids and fin < len(self._ids) else None
+        return cuerpo, siguiente
+
+    def lineas(self, despues_de: Optional[int], limit: Optional[int]) -> bytes:
+        """Igual que `pagina`, pero en formato NDJSON (una línea por servicio)."""
+        inicio = bisect_right(self._ids, despues_de) if despues_de is not None else 0
+        fin = len(self._ids) if limit is None else min(inicio + limit, len(self._ids))
+        return b"".join(self._items[i] + b"\n" for i in self._ids[inicio:fin])
+
+    def buscar(self, consulta: str, limit: int) -> bytes:
+        """
+        Busca servicios activos por nombre y descripción.
+
+        Args:
+            consulta (str): Texto de búsqueda (sin distinguir mayúsculas ni tildes).
+            limit (int): Número máximo de resultados.
+
+        Returns:
+            bytes: Lista JSON de servicios, ordenada por relevancia.
+        """
+        ids = self.busqueda.buscar(consulta, limit)
+        return b"[" + b",".join(self._items[i] for i in ids) + b"]"
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+# Instancia global compartida por las rutas del worker
+catalogo_cache = CatalogoCache(settings.CATALOG_CACHE_TTL_SECONDS)
@@ -0,0 +1,296 @@
+# app/services/disponibilidad.py
+import asyncio
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import exists, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.core.config import settings
+from app.db import models
+
+# ==============================
+# 🕒 Utilidades de fechas
+# ==============================
+# Estado de una reserva que libera su horario
+ESTADO_CANCELADO = "cancelado"
+# Estado con el que se crea una reserva si no se indica otro
+ESTADO_PENDIENTE = "pendiente"
+# Estado de una reserva aceptada por el centro
+ESTADO_CONFIRMADO = "confirmado"
+
+
+def normalizar_fecha(fecha: datetime) -> datetime:
+    """
+    Normaliza una fecha a UTC sin zona horaria y en segundos enteros, el formato que
+    guarda MySQL en DATETIME (sin fracciones; redondearía en lugar de truncar).
+
+    Args:
+        fecha (datetime): Fecha con o sin zona horaria.
+
+    Returns:
+        datetime: Fecha en UTC sin tzinfo ni microsegundos.
+    """
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha.replace(microsecond=0)
+
+
+def ahora_utc() -> datetime:
+    """Fecha y hora actual en UTC sin zona horaria."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ==============================
+# 📚 Índice de intervalos por servicio
+# ==============================
+class IndiceServicio:
+    """
+    Índice ordenado de las reservas activas de un servicio.
+
+    Todas las reservas de un servicio comparten su `duracion_minutos`, por lo que
+    ordenar por inicio también ordena por fin: basta mirar el vecino anterior para
+    saber si un intervalo nuevo se solapa (búsqueda binaria, O(log n)).
+
+    Atributos:
+        servicio_id (int): ID del servicio indexado.
+        duracion (timedelta): Duración de cada reserva del servicio.
+        horizonte (datetime): Reservas que empiezan antes de esta fecha no están indexadas.
+        cargado_en (float): Instante (monotónico) en que se cargó el índice.
+    """
+
+    def __init__(self, servicio_id: int, duracion_minutos: int, horizonte: datetime):
+        self.servicio_id = servicio_id
+        self.duracion = timedelta(minutes=duracion_minutos)
+        self.horizonte = horizonte
+        self.cargado_en = time.monotonic()
+        self._inicios: list[datetime] = []
+        self._ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._inicios)
+
+    def agregar(self, inicio: datetime, reserva_id: int) -> None:
+        """Inserta una reserva manteniendo el orden por fecha de inicio."""
+        i = bisect_left(self._inicios, inicio)
+        self._inicios.insert(i, inicio)
+        self._ids.insert(i, reserva_id)
+
+    def quitar(self, inicio: datetime, reserva_id: int) -> bool:
+        """Elimina una reserva del índice. Retorna False si no estaba indexada."""
+        i = bisect_left(self._inicios, inicio)
+        while i < len(self._inicios) and self._inicios[i] == inicio:
+            if self._ids[i] == reserva_id:
+                del self._inicios[i]
+                del self._ids[i]
+                return True
+            i += 1
+        return False
+
+    def solapa(self, inicio: datetime, excluir: Optional[int] = None) -> bool:
+        """
+        Indica si un intervalo [inicio, inicio + duracion) choca con alguna reserva indexada.
+
+        Args:
+            inicio (datetime): Inicio normalizado del intervalo.
+            excluir (Optional[int]): Reserva que no cuenta (la que se está reprogramando).
+
+        Returns:
+            bool: True si existe solapamiento.
+        """
+        i = bisect_left(self._inicios, inicio + self.duracion)
+        if excluir is None:
+            return i > 0 and self._inicios[i - 1] + self.duracion > inicio
+        # Las reservas indexadas no se solapan entre sí: como mucho dos pueden chocar
+        while i > 0 and self._inicios[i - 1] + self.duracion > inicio:
+            i -= 1
+            if self._ids[i] != excluir:
+                return True
+        return False
+
+    def huecos(self, desde: datetime, hasta: datetime, paso: timedelta) -> list[tuple[datetime, datetime]]:
+        """
+        Calcula los intervalos libres entre dos fechas.
+
+        Args:
+            desde (datetime): Inicio del rango (normalizado).
+            hasta (datetime): Fin del rango (normalizado).
+            paso (timedelta): Separación entre inicios de huecos candidatos.
+
+        Returns:
+            list[tuple[datetime, datetime]]: Pares (inicio, fin) disponibles.
+        """
+        libres = []
+        inicio = desde
+        while inicio + self.duracion <= hasta:
+            if not self.solapa(inicio):
+                libres.append((inicio, inicio + self.duracion))
+            inicio += paso
+        return libres
+
+
+# ==============================
+# ⚙️ Motor de disponibilidad
+# ==============================
+class MotorDisponibilidad:
+    """
+    Mantiene en memoria un `IndiceServicio` por servicio, cargado bajo demanda.
+
+    Cada índice se carga con una consulta por rango sobre el índice compuesto
+    `(servicio_id, fecha_hora)` y solo incluye reservas a partir de ahora, de modo
+    que su coste no crece con el histórico. Los índices caducan tras
+    `AVAILABILITY_INDEX_TTL_SECONDS` para recoger reservas creadas por otros workers.
+    """
+
+    def __init__(self, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self._indices: dict[int, IndiceServicio] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def _vigente(self, indice: IndiceServicio) -> bool:
+        return time.monotonic() - indice.cargado_en < self.ttl_segundos
+
+    async def obtener_indice(self, db: AsyncSession, servicio_id: int) -> Optional[IndiceServicio]:
+        """
+        Retorna el índice del servicio, cargándolo si no existe o ha caducado.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos.
+            servicio_id (int): ID del servicio.
+
+        Returns:
+            Optional[IndiceServicio]: Índice del servicio o None si el servicio no existe.
+        """
+        indice = self._indices.get(servicio_id)
+        if indice is not None and self._vigente(indice):
+            return indice
+
+        lock = self._locks.get(servicio_id)
+        if lock is None:
+            lock = self._locks[servicio_id] = asyncio.Lock()
+        async with lock:
+            # Otra corrutina pudo haberlo cargado mientras esperábamos
+            indice = self._indices.get(servicio_id)
+            if indice is not None and self._vigente(indice):
+                return indice
+            indice = await self._cargar(db, servicio_id)
+            if indice is None:
+                # Servicio inexistente (o borrado): no guardar un lock por cada ID que envíe un cliente.
+                # Quien ya espera este lock lo sigue usando; una carga repetida solo vuelve a leer.
+                self._indices.pop(servicio_id, None)
+                self._locks.pop(servicio_id, None)
+            else:
+                self._indices[servicio_id] = indice
+            return indice
+
+    async def _cargar(self, db: AsyncSession, servicio_id: int) -> Optional[IndiceServicio]:
+        result = await db.execute(
+            select(models.Servicio.duracion_minutos).where(models.Servicio.id == servicio_id)
+        )
+        duracion_minutos = result.scalar_one_or_none()
+        if duracion_minutos is None:
+            return None
+
+        indice = IndiceServicio(servicio_id, duracion_minutos, ahora_utc())
+        # Incluir reservas que empezaron hace menos de una duración: aún ocupan el horario
+        desde = indice.horizonte - indice.duracion
+        filas = await db.execute(
+            select(models.Reserva.id, models.Reserva.fecha_hora)
+            .where(
+                models.Reserva.servicio_id == servicio_id,
+                models.Reserva.fecha_hora > desde,
+                models.Reserva.estado != ESTADO_CANCELADO,
+            )
+            .order_by(models.Reserva.fecha_hora)
+        )
+        for reserva_id, fecha_hora in filas:
+            indice.agregar(normalizar_fecha(fecha_hora), reserva_id)
+        logger.debug("Índice de disponibilidad cargado: servicio {}, {} reservas", servicio_id, len(indice))
+        return indice
+
+    async def insertar_si_libre(
+        self, db: AsyncSession, indice: IndiceServicio, valores: dict
+    ) -> Optional[int]:
+        """
+        Inserta una reserva solo si su horario no se solapa, en una única sentencia.
+
+        Emite `INSERT INTO reservas (...) SELECT ... WHERE NOT EXISTS (solapamiento)`, que
+        sustituye al SELECT de comprobación más el INSERT. La clave foránea de
+        `usuario_id`/`servicio_id` la valida la BD (IntegrityError). No hace commit.
+
+        Args:
+            db (AsyncSession): Sesión de BD.
+            indice (IndiceServicio): Índice del servicio (aporta la duración).
+            valores (dict): Columna -> valor de la nueva reserva; debe incluir `fecha_hora`.
+
+        Returns:
+            Optional[int]: ID de la reserva insertada, o None si el horario estaba ocupado.
+        """
+        columnas = list(valores)
+        origen = select(
+            *(literal(valores[c], type_=models.Reserva.__table__.c[c].type) for c in columnas)
+        ).where(~exists().where(*self._condiciones_solapamiento(indice, valores["fecha_hora"])))
+        result = await db.execute(insert(models.Reserva).from_select(columnas, origen))
+        return result.lastrowid if result.rowcount == 1 else None
+
+    def condicion_libre(self, indice: IndiceServicio, inicio: datetime, excluir: int):
+        """
+        Condición `NOT EXISTS (solapamiento)` para el UPDATE que mueve una reserva a `inicio`.
+
+        MySQL no deja leer en una subconsulta la tabla que se actualiza (error 1093)
+        salvo a través de una tabla derivada materializada; el LIMIT impide que el
+        optimizador la fusione con la consulta exterior. Sigue siendo un rango sobre
+        ix_reservas_servicio_fecha.
+
+        Args:
+            indice (IndiceServicio): Índice del servicio (aporta la duración).
+            inicio (datetime): Nuevo inicio normalizado.
+            excluir (int): ID de la reserva que se mueve.
+
+        Returns:
+            Condición para el WHERE del UPDATE.
+        """
+        ocupada = (
+            select(models.Reserva.id)
+            .where(*self._condiciones_solapamiento(indice, inicio), models.Reserva.id != excluir)
+            .limit(1)
+            .correlate(None)
+            .subquery("ocupada")
+        )
+        return ~select(ocupada.c.id).exists()
+
+    @staticmethod
+    def _condiciones_solapamiento(indice: IndiceServicio, inicio: datetime) -> tuple:
+        """Condiciones de rango sobre ix_reservas_servicio_fecha para reservas que solapan con `inicio`."""
+        return (
+            models.Reserva.servicio_id == indice.servicio_id,
+            models.Reserva.fecha_hora > inicio - indice.duracion,
+            models.Reserva.fecha_hora < inicio + indice.duracion,
+            models.Reserva.estado != ESTADO_CANCELADO,
+        )
+
+    def registrar(self, servicio_id: int, inicio: datetime, reserva_id: int) -> None:
+        """Añade una reserva al índice del servicio si está cargado."""
+        indice = self._indices.get(servicio_id)
+        if indice is not None:
+            indice.agregar(normalizar_fecha(inicio), reserva_id)
+
+    def retirar(self, servicio_id: int, inicio: datetime, reserva_id: int) -> None:
+        """Quita una reserva del índice del servicio si está cargado."""
+        indice = self._indices.get(servicio_id)
+        if indice is not None:
+            indice.quitar(normalizar_fecha(inicio), reserva_id)
+
+    def invalidar(self, servicio_id: Optional[int] = None) -> None:
+        """Descarta el índice de un servicio, o todos si no se indica ninguno."""
+        if servicio_id is None:
+            self._indices.clear()
+        else:
+            self._indices.pop(servicio_id, None)
+
+
+# Instancia global compartida por las rutas del worker
+motor_disponibilidad = MotorDisponibilidad(settings.AVAILABILITY_INDEX_TTL_SECONDS)
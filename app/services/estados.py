@@ -0,0 +1,42 @@
+# app/services/estados.py
+from typing import Optional
+
+from app.services.disponibilidad import ESTADO_CANCELADO, ESTADO_CONFIRMADO, ESTADO_PENDIENTE
+
+# ==============================
+# 🔀 Máquina de estados de una reserva
+# ==============================
+# Estado actual -> estados a los que puede pasar. Cancelada es final.
+TRANSICIONES: dict[str, frozenset[str]] = {
+    ESTADO_PENDIENTE: frozenset({ESTADO_CONFIRMADO, ESTADO_CANCELADO}),
+    ESTADO_CONFIRMADO: frozenset({ESTADO_CANCELADO}),
+    ESTADO_CANCELADO: frozenset(),
+}
+
+# Estados en los que se puede cambiar la fecha de la cita (conserva el estado)
+REPROGRAMABLES = frozenset({ESTADO_PENDIENTE, ESTADO_CONFIRMADO})
+
+# Estado con el que termina cada acción de los endpoints PATCH
+ACCIONES = {
+    "confirmar": ESTADO_CONFIRMADO,
+    "cancelar": ESTADO_CANCELADO,
+}
+
+
+def puede_pasar(actual: Optional[str], nuevo: str) -> bool:
+    """
+    Indica si una reserva en el estado `actual` puede pasar a `nuevo`.
+
+    Args:
+        actual (Optional[str]): Estado guardado (None cuenta como pendiente).
+        nuevo (str): Estado de destino.
+
+    Returns:
+        bool: True si la transición es válida. Estados desconocidos no admiten ninguna.
+    """
+    return nuevo in TRANSICIONES.get(actual or ESTADO_PENDIENTE, frozenset())
+
+
+def puede_reprogramar(actual: Optional[str]) -> bool:
+    """Indica si una reserva en el estado `actual` puede cambiar de fecha."""
+    return (actual or ESTADO_PENDIENTE) in REPROGRAMABLES
@@ -0,0 +1,253 @@
+# app/services/idempotencia.py
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logging_config import logger_muestreado
+from app.db import models
+from app.services.disponibilidad import ahora_utc
+from app.utils.exceptions import clasificar_integridad
+
+# Cabecera que marca una respuesta repetida (el handler no se ha vuelto a ejecutar)
+CABECERA_REPETIDA = "Idempotent-Replayed"
+# Segundos mínimos entre dos purgas de respuestas caducadas en la BD
+PURGA_CADA_SEGUNDOS = 3600
+
+_tabla = models.RespuestaIdempotente
+
+
+def huella_peticion(cuerpo: BaseModel) -> str:
+    """
+    Huella del cuerpo validado de una petición, para detectar una clave reutilizada con otro cuerpo.
+
+    Es un HMAC con SECRET_KEY: el cuerpo puede llevar una contraseña y la huella se guarda en la BD.
+
+    Args:
+        cuerpo (BaseModel): Cuerpo de la petición ya validado.
+
+    Returns:
+        str: Huella en hexadecimal (32 caracteres).
+    """
+    return hashlib.blake2b(
+        cuerpo.model_dump_json().encode(), key=settings.SECRET_KEY.encode()[:64], digest_size=16
+    ).hexdigest()
+
+
+def es_clave_duplicada(error: IntegrityError) -> bool:
+    """
+    Indica si un IntegrityError viene de guardar una respuesta cuya clave ya estaba guardada.
+
+    MySQL anterior a 8.0.19 no nombra la tabla ("for key 'PRIMARY'"); en los endpoints
+    idempotentes es la única clave primaria que no genera la BD.
+    """
+    violacion = clasificar_integridad(error)
+    return violacion.tipo == "unico" and (violacion.menciona(_tabla.__tablename__) or violacion.menciona("'PRIMARY'"))
+
+
+@dataclass(frozen=True)
+class RespuestaGuardada:
+    """
+    Respuesta de una petición idempotente, lista para repetirse.
+
+    Atributos:
+        huella (str): Huella del cuerpo de la petición original.
+        status_code (int): Código HTTP.
+        cuerpo (bytes): Cuerpo JSON.
+    """
+    huella: str
+    status_code: int
+    cuerpo: bytes
+
+
+@dataclass
+class PeticionIdempotente:
+    """
+    Petición con cabecera Idempotency-Key en curso.
+
+    Atributos:
+        ambito (str): Endpoint y usuario al que pertenece la clave (p. ej. "reservas:12").
+        clave (str): Valor de la cabecera Idempotency-Key.
+        huella (str): Huella del cuerpo (ver `huella_peticion`).
+        respuesta (Optional[RespuestaGuardada]): Respuesta anotada por el handler con `anotar`.
+    """
+    ambito: str
+    clave: str
+    huella: str
+    respuesta: Optional[RespuestaGuardada] = None
+
+    def anotar(self, db: AsyncSession, status_code: int, cuerpo: BaseModel) -> None:
+        """
+        Añade la respuesta a la sesión para guardarla en la misma transacción que la escritura.
+
+        El handler la llama justo antes de su commit: si el commit falla no queda nada
+        guardado, y si tiene éxito ningún reintento puede repetir la escritura.
+
+        Args:
+            db (AsyncSession): Sesión del handler.
+            status_code (int): Código HTTP de la respuesta.
+            cuerpo (BaseModel): Esquema de salida del endpoint.
+        """
+        contenido = cuerpo.model_dump_json().encode()
+        self.respuesta = RespuestaGuardada(self.huella, status_code, contenido)
+        db.add(models.RespuestaIdempotente(
+            ambito=self.ambito,
+            clave=self.clave,
+            huella=self.huella,
+            status_code=status_code,
+            cuerpo=contenido,
+            created_at=ahora_utc(),
+        ))
+
+
+# ==============================
+# 🔁 Ejecución idempotente
+# ==============================
+class Idempotencia:
+    """
+    Ejecuta cada Idempotency-Key una sola vez y repite su respuesta en los reintentos.
+
+    Las respuestas se buscan primero en una caché en memoria acotada (TTLCache) y, si
+    no están, en la tabla `respuestas_idempotentes`, que comparten todos los workers y
+    sobrevive a reinicios. Las peticiones con la misma clave que llegan mientras la
+    primera se ejecuta en este worker esperan su resultado en lugar de ejecutarse.
+    Entre workers, la clave primaria de la tabla hace que solo un commit gane; el
+    perdedor deshace su escritura y repite la respuesta del ganador.
+
+    Solo se guardan las respuestas correctas: un reintento tras un error (404, 409,
+    500...) vuelve a ejecutar el handler.
+
+    Atributos:
+        ttl_segundos (int): Vida de una respuesta guardada.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self._cache = TTLCache(max_entradas, ttl_segundos)
+        self._en_curso: dict[tuple[str, str], asyncio.Future] = {}
+        self._purgado_en: Optional[float] = None
+
+    async def ejecutar(
+        self,
+        db: AsyncSession,
+        peticion: PeticionIdempotente,
+        operacion: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Ejecuta `operacion` si la clave no tiene respuesta guardada; si la tiene, la repite.
+
+        Args:
+            db (AsyncSession): Sesión del handler (primario).
+            peticion (PeticionIdempotente): Clave, ámbito y huella de la petición.
+            operacion (Callable[[], Awaitable[Any]]): Cuerpo del handler; debe llamar a
+                `peticion.anotar` antes de su commit.
+
+        Returns:
+            Any: Respuesta guardada (original o repetida), o el resultado de `operacion`
+            si no anotó ninguna.
+
+        Raises:
+            HTTPException: 422 si la clave ya se usó con otro cuerpo; los errores de `operacion`.
+        """
+        clave = (peticion.ambito, peticion.clave)
+        while True:
+            guardada = self._cache.get(clave)
+            if guardada is not None:
+                return self._repetir(peticion, guardada)
+            en_curso = self._en_curso.get(clave)
+            if en_curso is None:
+                break
+            # La misma clave se está ejecutando en este worker: esperar y volver a mirar la caché.
+            # Si la primera falló, la siguiente en despertar ejecuta la operación.
+            await asyncio.shield(en_curso)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_curso[clave] = futuro
+        try:
+            await self._purgar(db)
+            guardada = await self._leer(db, peticion)
+            if guardada is not None:
+                return self._repetir(peticion, guardada)
+            try:
+                resultado = await operacion()
+            except HTTPException:
+                # Otra ejecución de la clave en otro worker pudo ganar (horario ya ocupado,
+                # email ya registrado, clave duplicada al guardar): repetir su respuesta
+                guardada = await self._leer(db, peticion)
+                if guardada is None:
+                    raise
+                return self._repetir(peticion, guardada)
+            if peticion.respuesta is None:
+                return resultado
+            self._cache.set(clave, peticion.respuesta)
+            return Response(
+                content=peticion.respuesta.cuerpo,
+                status_code=peticion.respuesta.status_code,
+                media_type="application/json",
+            )
+        finally:
+            del self._en_curso[clave]
+            futuro.set_result(None)
+
+    def _repetir(self, peticion: PeticionIdempotente, guardada: RespuestaGuardada) -> Response:
+        if guardada.huella != peticion.huella:
+            logger.warning(f"Idempotency-Key reutilizada con otro cuerpo en {peticion.ambito}")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="La Idempotency-Key ya se usó con una petición distinta",
+            )
+        logger_muestreado.info("Respuesta idempotente repetida en {}", peticion.ambito)
+        return Response(
+            content=guardada.cuerpo,
+            status_code=guardada.status_code,
+            media_type="application/json",
+            headers={CABECERA_REPETIDA: "true"},
+        )
+
+    async def _leer(self, db: AsyncSession, peticion: PeticionIdempotente) -> Optional[RespuestaGuardada]:
+        """Busca la respuesta en la BD y, si sigue vigente, la copia a la caché."""
+        result = await db.execute(
+            select(_tabla.huella, _tabla.status_code, _tabla.cuerpo, _tabla.created_at)
+            .where(_tabla.ambito == peticion.ambito, _tabla.clave == peticion.clave)
+        )
+        fila = result.first()
+        if fila is None:
+            return None
+        limite = ahora_utc() - timedelta(seconds=self.ttl_segundos)
+        if fila.created_at <= limite:
+            # Caducada: se borra para que la clave pueda volver a guardarse
+            await db.execute(delete(_tabla).where(
+                _tabla.ambito == peticion.ambito, _tabla.clave == peticion.clave, _tabla.created_at <= limite
+            ))
+            await db.commit()
+            return None
+        guardada = RespuestaGuardada(fila.huella, fila.status_code, fila.cuerpo)
+        self._cache.set((peticion.ambito, peticion.clave), guardada, ttl=(fila.created_at - limite).total_seconds())
+        return guardada
+
+    async def _purgar(self, db: AsyncSession) -> None:
+        """Borra las respuestas caducadas de la BD, como mucho una vez cada PURGA_CADA_SEGUNDOS."""
+        ahora = time.monotonic()
+        if self._purgado_en is not None and ahora - self._purgado_en < PURGA_CADA_SEGUNDOS:
+            return
+        self._purgado_en = ahora
+        limite = ahora_utc() - timedelta(seconds=self.ttl_segundos)
+        result = await db.execute(delete(_tabla).where(_tabla.created_at <= limite))
+        await db.commit()
+        if result.rowcount:
+            logger.debug("Respuestas idempotentes caducadas borradas: {}", result.rowcount)
+
+
+# Instancia global compartida por las rutas del worker
+idempotencia = Idempotencia(settings.IDEMPOTENCY_CACHE_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
@@ -0,0 +1,167 @@
+# app/services/resumen.py
+import asyncio
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, Integer, String, bindparam, delete, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.db import models
+from app.db.session import AsyncSessionLocal, engine
+from app.services.disponibilidad import ESTADO_PENDIENTE
+
+# (servicio_id, fecha, estado): clave de una fila del resumen
+ClaveResumen = tuple[int, date, str]
+
+
+def clave_resumen(servicio_id: int, fecha_hora: datetime, estado: Optional[str]) -> ClaveResumen:
+    """
+    Clave del resumen a la que pertenece una reserva.
+
+    Args:
+        servicio_id (int): ID del servicio reservado.
+        fecha_hora (datetime): Inicio de la cita, ya normalizado a UTC.
+        estado (Optional[str]): Estado de la reserva (None cuenta como pendiente).
+
+    Returns:
+        ClaveResumen: (servicio_id, día UTC, estado).
+    """
+    return servicio_id, fecha_hora.date(), estado or ESTADO_PENDIENTE
+
+
+# ==============================
+# 📊 Mantenimiento incremental del resumen
+# ==============================
+def _sentencia_acumular(dialecto: str):
+    """
+    INSERT ... SELECT que suma `reservas` (y su importe al precio actual del servicio)
+    a una fila del resumen, creándola si no existe.
+
+    El precio se lee de `servicios` en la misma sentencia, así que ajustar el resumen
+    cuesta una sola ida y vuelta y no depende de cachés del worker.
+    """
+    tabla = models.ResumenReserva.__table__
+    servicio = models.Servicio.__table__
+    servicio_id = bindparam("servicio_id", type_=Integer)
+    reservas = bindparam("reservas", type_=Integer)
+    origen = select(
+        servicio_id,
+        bindparam("fecha", type_=Date),
+        bindparam("estado", type_=String),
+        reservas,
+        reservas * servicio.c.precio,
+    ).where(servicio.c.id == servicio_id)
+    columnas = ["servicio_id", "fecha", "estado", "reservas", "ingresos"]
+
+    if dialecto == "mysql":
+        sentencia = mysql.insert(tabla).from_select(columnas, origen)
+        return sentencia.on_duplicate_key_update(
+            reservas=tabla.c.reservas + sentencia.inserted.reservas,
+            ingresos=tabla.c.ingresos + sentencia.inserted.ingresos,
+        )
+    if dialecto == "sqlite":
+        sentencia = sqlite.insert(tabla).from_select(columnas, origen)
+        return sentencia.on_conflict_do_update(
+            index_elements=[tabla.c.servicio_id, tabla.c.fecha, tabla.c.estado],
+            set_={
+                "reservas": tabla.c.reservas + sentencia.excluded.reservas,
+                "ingresos": tabla.c.ingresos + sentencia.excluded.ingresos,
+            },
+        )
+    raise ValueError(f"Dialecto no soportado para el resumen de reservas: {dialecto}")
+
+
+async def acumular(db: AsyncSession, cambios: Iterable[tuple[ClaveResumen, int]]) -> None:
+    """
+    Ajusta el resumen en la transacción actual; el llamador hace el COMMIT.
+
+    Los cambios con la misma clave se agrupan y todos se envían en un único executemany.
+    Un cambio de estado o de fecha se expresa como -1 en la clave anterior y +1 en la nueva.
+
+    Args:
+        db (AsyncSession): Sesión con la transacción de la escritura de reservas.
+        cambios (Iterable[tuple[ClaveResumen, int]]): Pares (clave, variación del número de reservas).
+    """
+    totales: Counter = Counter()
+    for clave, variacion in cambios:
+        totales[clave] += variacion
+    filas = [
+        {"servicio_id": servicio_id, "fecha": fecha, "estado": estado, "reservas": variacion}
+        for (servicio_id, fecha, estado), variacion in totales.items()
+        if variacion
+    ]
+    if filas:
+        await db.execute(_sentencia_acumular(db.bind.dialect.name), filas)
+
+
+async def registrar_alta(db: AsyncSession, servicio_id: int, fecha_hora: datetime, estado: Optional[str]) -> None:
+    """Suma una reserva nueva al resumen, en la transacción de su INSERT."""
+    await acumular(db, [(clave_resumen(servicio_id, fecha_hora, estado), 1)])
+
+
+async def registrar_cambio(db: AsyncSession, anterior: ClaveResumen, nueva: ClaveResumen) -> None:
+    """Mueve una reserva de una clave del resumen a otra (cambio de estado o de día)."""
+    if anterior != nueva:
+        await acumular(db, [(anterior, -1), (nueva, 1)])
+
+
+# ==============================
+# 🔁 Reconstrucción completa
+# ==============================
+async def reconstruir(db: AsyncSession) -> int:
+    """
+    Recalcula el resumen completo a partir de `reservas`, en una sola transacción.
+
+    Sirve para poblar la tabla la primera vez o corregir derivas; los ingresos se
+    recalculan con el precio actual de cada servicio.
+
+    Args:
+        db (AsyncSession): Sesión sobre el primario.
+
+    Returns:
+        int: Número de filas del resumen generadas.
+    """
+    reserva = models.Reserva
+    estado = func.coalesce(reserva.estado, ESTADO_PENDIENTE)
+    dia = func.date(reserva.fecha_hora)
+    origen = (
+        select(
+            reserva.servicio_id,
+            dia,
+            estado,
+            func.count(),
+            func.count() * models.Servicio.precio,
+        )
+        .join(models.Servicio, models.Servicio.id == reserva.servicio_id)
+        .group_by(reserva.servicio_id, dia, estado, models.Servicio.precio)
+    )
+    try:
+        await db.execute(delete(models.ResumenReserva))
+        resultado = await db.execute(
+            insert(models.ResumenReserva).from_select(
+                ["servicio_id", "fecha", "estado", "reservas", "ingresos"], origen
+            )
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error al reconstruir el resumen de reservas: {e}")
+        raise
+    logger.info("Resumen de reservas reconstruido: {} filas", resultado.rowcount)
+    return resultado.rowcount
+
+
+async def _main() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await reconstruir(db)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # python -m app.services.resumen
+    asyncio.run(_main())
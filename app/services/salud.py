@@ -0,0 +1,224 @@
+# app/services/salud.py
+import asyncio
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+from loguru import logger
+
+from app.core.config import settings
+from app.db import models
+from app.db.replicas import enrutador_lecturas
+from app.db.session import engine
+from app.tasks.reminders import programador_recordatorios
+from app.utils.email import bandeja_salida
+
+# Tablas cuyo número de filas se mantiene en caché: solo las que sirve algún endpoint
+# (/check_db). Cada worker las cuenta, así que reservas, la tabla que más crece, no está
+TABLAS_CONTADAS = {
+    "usuarios": models.Usuario.id,
+}
+
+
+# ==============================
+# 🔢 Conteo de filas en caché
+# ==============================
+class ContadorFilas:
+    """
+    Número de filas de las tablas de TABLAS_CONTADAS, refrescado periódicamente en segundo plano.
+
+    Un COUNT(*) en InnoDB recorre un índice entero y crece con la tabla: aquí se hace
+    una vez cada `intervalo` segundos (con un pequeño desfase aleatorio para que los
+    workers no coincidan), leyendo de una réplica si la hay, y los endpoints sirven
+    el último valor.
+
+    Atributos:
+        intervalo (float): Segundos entre refrescos.
+        conteos (dict[str, int]): Último número de filas por tabla.
+        actualizado_en (Optional[float]): Instante (monotonic) del último refresco con éxito.
+        errores (int): Refrescos fallidos.
+    """
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self.conteos: dict[str, int] = {}
+        self.actualizado_en: Optional[float] = None
+        self.errores = 0
+        self._cerrojo = asyncio.Lock()
+        self._tarea: Optional[asyncio.Task] = None
+
+    def iniciar(self) -> None:
+        """Arranca el refresco periódico en el event loop actual."""
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle(), name="conteo-filas")
+            logger.info("🔢 Conteo de filas en caché iniciado (cada {}s)", self.intervalo)
+
+    async def detener(self) -> None:
+        """Cancela el refresco periódico."""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    @property
+    def activo(self) -> bool:
+        """True si la tarea de refresco está en marcha."""
+        return self._tarea is not None and not self._tarea.done()
+
+    async def refrescar(self) -> None:
+        """Cuenta las filas de TABLAS_CONTADAS con una sola consulta de subconsultas escalares."""
+        consulta = select(*[
+            select(func.count(columna)).scalar_subquery().label(tabla)
+            for tabla, columna in TABLAS_CONTADAS.items()
+        ])
+        session = await enrutador_lecturas.abrir_sesion()
+        try:
+            fila = (await session.execute(consulta)).one()
+        finally:
+            await session.close()
+        self.conteos = dict(fila._mapping)
+        self.actualizado_en = time.monotonic()
+
+    async def obtener(self, tabla: str) -> int:
+        """
+        Último número de filas de una tabla; solo consulta la BD si aún no hay ninguno.
+
+        Args:
+            tabla (str): Nombre de la tabla (clave de TABLAS_CONTADAS).
+
+        Returns:
+            int: Número de filas en el último refresco.
+        """
+        if self.actualizado_en is None:
+            async with self._cerrojo:
+                if self.actualizado_en is None:
+                    await self.refrescar()
+        return self.conteos[tabla]
+
+    def antiguedad(self) -> Optional[float]:
+        """Segundos desde el último refresco con éxito (None si no lo hubo)."""
+        return None if self.actualizado_en is None else time.monotonic() - self.actualizado_en
+
+    async def _bucle(self) -> None:
+        while True:
+            try:
+                async with self._cerrojo:
+                    await self.refrescar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Error al refrescar el conteo de filas: {e}")
+            await asyncio.sleep(self.intervalo * random.uniform(0.9, 1.1))
+
+
+contador_filas = ContadorFilas(settings.ROW_COUNT_REFRESH_SECONDS)
+
+
+# ==============================
+# 🩺 Comprobaciones de disponibilidad (readiness)
+# ==============================
+def saturacion_pool(motor: AsyncEngine) -> Optional[float]:
+    """
+    Fracción de la capacidad del pool (tamaño + overflow) en uso.
+
+    Args:
+        motor (AsyncEngine): Motor cuyo pool se mide.
+
+    Returns:
+        Optional[float]: Entre 0 y 1, o None si el pool no es un QueuePool (p. ej. SQLite).
+    """
+    pool = motor.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    capacidad = pool.size() + max(pool._max_overflow, 0)
+    return pool.checkedout() / capacidad if capacidad else 1.0
+
+
+class ComprobadorSalud:
+    """
+    Calcula la disponibilidad del worker y la cachea `ttl` segundos.
+
+    Comprobaciones: pool no saturado, `SELECT 1` contra el primario con timeout y
+    tareas en segundo plano vivas. Las sondas concurrentes esperan a la misma
+    comprobación en lugar de lanzar cada una la suya, así que una tormenta de
+    sondas cuesta como mucho una ida y vuelta a la BD por worker y `ttl`.
+
+    Atributos:
+        ttl (float): Segundos que se reutiliza un resultado.
+        timeout_bd (float): Tiempo máximo para el `SELECT 1`.
+        umbral_pool (float): Saturación del pool a partir de la cual el worker no está listo.
+        comprobaciones (int): Comprobaciones reales realizadas (no servidas desde caché).
+    """
+
+    def __init__(self, ttl: float, timeout_bd: float, umbral_pool: float):
+        self.ttl = ttl
+        self.timeout_bd = timeout_bd
+        self.umbral_pool = umbral_pool
+        self.comprobaciones = 0
+        self._resultado: Optional[tuple[bool, dict]] = None
+        self._calculado_en = 0.0
+        self._cerrojo = asyncio.Lock()
+
+    async def listo(self) -> tuple[bool, dict]:
+        """
+        Retorna la disponibilidad del worker, desde caché si tiene menos de `ttl` segundos.
+
+        Returns:
+            tuple[bool, dict]: Si está listo y el detalle de cada comprobación.
+        """
+        if self._resultado is not None and time.monotonic() - self._calculado_en < self.ttl:
+            return self._resultado
+        async with self._cerrojo:
+            if self._resultado is None or time.monotonic() - self._calculado_en >= self.ttl:
+                self._resultado = await self._comprobar()
+                self._calculado_en = time.monotonic()
+                self.comprobaciones += 1
+        return self._resultado
+
+    async def _comprobar(self) -> tuple[bool, dict]:
+        detalle = {}
+
+        saturacion = saturacion_pool(engine)
+        pool_ok = saturacion is None or saturacion < self.umbral_pool
+        detalle["pool"] = {"ok": pool_ok, "saturacion": None if saturacion is None else round(saturacion, 3)}
+
+        # Con el pool saturado el SELECT 1 solo esperaría a una conexión libre
+        if pool_ok:
+            detalle["base_de_datos"] = await self._comprobar_bd()
+        else:
+            detalle["base_de_datos"] = {"ok": False, "error": "pool saturado, no se comprueba"}
+
+        tareas = {"bandeja_salida": bandeja_salida.activa}
+        if settings.REMINDERS_ENABLED:
+            tareas["recordatorios"] = programador_recordatorios.activo
+        tareas["conteo_filas"] = contador_filas.activo
+        detalle["tareas"] = {"ok": all(tareas.values()), **tareas}
+
+        ok = all(comprobacion["ok"] for comprobacion in detalle.values())
+        if not ok:
+            logger.warning(f"Worker no listo: {detalle}")
+        return ok, detalle
+
+    async def _comprobar_bd(self) -> dict:
+        async def select_1() -> None:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(select_1(), timeout=self.timeout_bd)
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+        return {"ok": True, "latencia_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+comprobador_salud = ComprobadorSalud(
+    settings.HEALTH_CACHE_SECONDS, settings.HEALTH_DB_TIMEOUT_SECONDS, settings.HEALTH_POOL_SATURATION
+)
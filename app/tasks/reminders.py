@@ -0,0 +1,285 @@
+# app/tasks/reminders.py
+import asyncio
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select, update
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import Histograma
+from app.db import models
+from app.db.session import AsyncSessionLocal
+from app.services.disponibilidad import ESTADO_CANCELADO, ahora_utc, normalizar_fecha
+from app.utils.email import notificar_recordatorio
+
+# Retraso de los recordatorios respecto a su hora prevista (segundos): de 10 ms a 10 min
+LIMITES_RETRASO = (0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 600)
+# Espera tras un error de BD antes de reintentar la carga de una ventana
+ESPERA_TRAS_ERROR = 5.0
+
+
+@dataclass
+class Recordatorio:
+    """
+    Datos necesarios para enviar el recordatorio de una reserva.
+
+    Atributos:
+        reserva_id (int): ID de la reserva.
+        fecha_hora (datetime): Fecha y hora de la cita (UTC).
+        email (str): Email del usuario.
+        nombre_usuario (str): Nombre del usuario.
+        servicio (str): Nombre del servicio reservado.
+    """
+    reserva_id: int
+    fecha_hora: datetime
+    email: str
+    nombre_usuario: str
+    servicio: str
+
+
+async def enviar_por_correo(recordatorio: Recordatorio) -> None:
+    """Envío por defecto: encola el correo en la bandeja de salida (no espera al SMTP)."""
+    notificar_recordatorio(
+        recordatorio.email, recordatorio.nombre_usuario, recordatorio.servicio, recordatorio.fecha_hora
+    )
+
+
+# ==============================
+# ⏰ Programador de recordatorios
+# ==============================
+class ProgramadorRecordatorios:
+    """
+    Programador asíncrono de recordatorios basado en un min-heap.
+
+    Carga las reservas por ventanas de tiempo (`REMINDER_WINDOW_MINUTES`) usando el
+    índice sobre `fecha_hora`, así que cada carga lee solo las citas de esa ventana
+    y el coste no crece con el histórico. Entre cargas duerme hasta el siguiente
+    recordatorio. Las reservas nuevas o reprogramadas se añaden con `programar`;
+    las entradas obsoletas del heap se descartan al salir (borrado perezoso).
+
+    Antes de enviar, cada recordatorio se reclama con un UPDATE condicional sobre
+    `recordatorio_enviado`, de modo que con varios workers solo uno lo envía.
+
+    Atributos:
+        antelacion (timedelta): Tiempo entre el recordatorio y la cita.
+        ventana (timedelta): Tamaño de cada ventana de carga.
+        enviados (int): Recordatorios enviados por este worker.
+        omitidos (int): Recordatorios reclamados por otro worker, cancelados o reprogramados.
+        errores (int): Fallos al cargar ventanas o enviar recordatorios.
+        retraso (Histograma): Retraso entre la hora prevista y el envío (segundos).
+    """
+
+    def __init__(
+        self,
+        antelacion: timedelta,
+        ventana: timedelta,
+        enviar: Callable[[Recordatorio], Awaitable[None]] = enviar_por_correo,
+    ):
+        self.antelacion = antelacion
+        self.ventana = ventana
+        self.enviar = enviar
+        self.enviados = 0
+        self.omitidos = 0
+        self.errores = 0
+        self.retraso = Histograma(LIMITES_RETRASO)
+        self._heap: list[tuple[datetime, int]] = []
+        # reserva_id -> hora prevista vigente; una entrada del heap que no coincide está obsoleta
+        self._vigentes: dict[int, datetime] = {}
+        self._cargado_hasta: Optional[datetime] = None
+        self._despertar = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+
+    # ------------------------------
+    # Ciclo de vida
+    # ------------------------------
+    def iniciar(self) -> None:
+        """Arranca la tarea del programador en el event loop actual."""
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle(), name="recordatorios")
+            logger.info("⏰ Programador de recordatorios iniciado")
+
+    async def detener(self) -> None:
+        """Cancela la tarea del programador y espera a que termine."""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+            logger.info("Programador de recordatorios detenido")
+
+    @property
+    def activo(self) -> bool:
+        """True si la tarea del programador está en marcha."""
+        return self._tarea is not None and not self._tarea.done()
+
+    # ------------------------------
+    # API incremental
+    # ------------------------------
+    def programar(self, reserva_id: int, fecha_hora: datetime) -> None:
+        """
+        Añade o reprograma el recordatorio de una reserva.
+
+        Si la hora del recordatorio cae más allá de la ventana ya cargada no se hace
+        nada: la carga de esa ventana la recogerá desde la BD. Las citas pasadas se ignoran.
+
+        Args:
+            reserva_id (int): ID de la reserva.
+            fecha_hora (datetime): Fecha y hora de la cita.
+        """
+        fecha_hora = normalizar_fecha(fecha_hora)
+        vence = fecha_hora - self.antelacion
+        if self._cargado_hasta is None or vence >= self._cargado_hasta or fecha_hora <= ahora_utc():
+            self._vigentes.pop(reserva_id, None)
+            return
+        self._vigentes[reserva_id] = vence
+        heapq.heappush(self._heap, (vence, reserva_id))
+        self._despertar.set()
+
+    def cancelar(self, reserva_id: int) -> None:
+        """Descarta el recordatorio pendiente de una reserva (cancelada o borrada)."""
+        self._vigentes.pop(reserva_id, None)
+
+    def estadisticas(self) -> dict:
+        """Profundidad de la cola, retraso y contadores del programador."""
+        ahora = ahora_utc()
+        proximo = self._heap[0][0] if self._heap else None
+        return {
+            "activo": self.activo,
+            "profundidad_heap": len(self._heap),
+            "pendientes": len(self._vigentes),
+            "proximo": proximo.isoformat() if proximo else None,
+            "atraso_actual_segundos": max((ahora - proximo).total_seconds(), 0.0) if proximo else 0.0,
+            "cargado_hasta": self._cargado_hasta.isoformat() if self._cargado_hasta else None,
+            "enviados": self.enviados,
+            "omitidos": self.omitidos,
+            "errores": self.errores,
+            "retraso_segundos": self.retraso.instantanea(),
+        }
+
+    # ------------------------------
+    # Bucle principal
+    # ------------------------------
+    async def _bucle(self) -> None:
+        # Al arrancar se recogen también recordatorios vencidos cuya cita aún no ha pasado
+        self._cargado_hasta = ahora_utc() - self.antelacion
+        while True:
+            try:
+                ahora = ahora_utc()
+                # Mantener cargada al menos una ventana por delante (al arrancar, todo el atraso de una vez)
+                while self._cargado_hasta <= ahora + self.ventana:
+                    await self._cargar_ventana(max(self._cargado_hasta + self.ventana, ahora + self.ventana))
+                    ahora = ahora_utc()
+                    await self._disparar_vencidos(ahora)
+
+                await self._disparar_vencidos(ahora_utc())
+
+                proxima_carga = self._cargado_hasta - self.ventana
+                siguiente = min(self._heap[0][0], proxima_carga) if self._heap else proxima_carga
+                espera = max((siguiente - ahora_utc()).total_seconds(), 0.0)
+                self._despertar.clear()
+                try:
+                    await asyncio.wait_for(self._despertar.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Error en el programador de recordatorios: {e}")
+                await asyncio.sleep(ESPERA_TRAS_ERROR)
+
+    async def _cargar_ventana(self, hasta: datetime) -> None:
+        desde = self._cargado_hasta
+        # Avanzar antes de consultar: lo que se cree durante la consulta entra por `programar`
+        self._cargado_hasta = hasta
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(models.Reserva.id, models.Reserva.fecha_hora).where(
+                        models.Reserva.fecha_hora >= desde + self.antelacion,
+                        models.Reserva.fecha_hora < hasta + self.antelacion,
+                        models.Reserva.estado != ESTADO_CANCELADO,
+                        models.Reserva.recordatorio_enviado.is_(False),
+                    )
+                )
+                filas = result.all()
+        except Exception:
+            self._cargado_hasta = desde
+            raise
+        for reserva_id, fecha_hora in filas:
+            vence = normalizar_fecha(fecha_hora) - self.antelacion
+            self._vigentes[reserva_id] = vence
+            heapq.heappush(self._heap, (vence, reserva_id))
+        if filas:
+            logger.debug("Ventana de recordatorios {:%H:%M}-{:%H:%M}: {} reservas", desde, hasta, len(filas))
+
+    async def _disparar_vencidos(self, ahora: datetime) -> None:
+        while self._heap and self._heap[0][0] <= ahora:
+            vence, reserva_id = heapq.heappop(self._heap)
+            if self._vigentes.get(reserva_id) != vence:
+                continue  # entrada obsoleta (reprogramada o cancelada)
+            del self._vigentes[reserva_id]
+            try:
+                recordatorio = await self._reclamar(reserva_id, vence + self.antelacion)
+                if recordatorio is None:
+                    self.omitidos += 1
+                    continue
+                await self.enviar(recordatorio)
+                self.enviados += 1
+                self.retraso.observar((ahora_utc() - vence).total_seconds())
+            except Exception as e:
+                self.errores += 1
+                logger.error(f"Error al enviar el recordatorio de la reserva {reserva_id}: {e}")
+
+    async def _reclamar(self, reserva_id: int, prevista: datetime) -> Optional[Recordatorio]:
+        """
+        Marca el recordatorio como enviado si nadie lo hizo antes y retorna sus datos.
+
+        Se reclama por ID, no por igualdad con la fecha prevista, que depende de la
+        precisión con que cada BD guarda `fecha_hora`. La cota sobre la hora (con un
+        segundo de margen) descarta la entrada obsoleta de otro worker si la cita se
+        reprogramó más tarde.
+
+        Args:
+            reserva_id (int): ID de la reserva.
+            prevista (datetime): Fecha de la cita con la que se programó el recordatorio.
+
+        Returns:
+            Optional[Recordatorio]: Datos del recordatorio, o None si ya estaba enviado,
+            la reserva se canceló o la cita ya no vence.
+        """
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(models.Reserva)
+                .where(
+                    models.Reserva.id == reserva_id,
+                    models.Reserva.fecha_hora < prevista + timedelta(seconds=1),
+                    models.Reserva.estado != ESTADO_CANCELADO,
+                    models.Reserva.recordatorio_enviado.is_(False),
+                )
+                .values(recordatorio_enviado=True)
+            )
+            if result.rowcount != 1:
+                await session.rollback()
+                return None
+            datos = await session.execute(
+                select(models.Reserva.fecha_hora, models.Usuario.email, models.Usuario.nombre, models.Servicio.nombre)
+                .join(models.Usuario, models.Reserva.usuario_id == models.Usuario.id)
+                .join(models.Servicio, models.Reserva.servicio_id == models.Servicio.id)
+                .where(models.Reserva.id == reserva_id)
+            )
+            fecha_hora, email, nombre_usuario, servicio = datos.one()
+            await session.commit()
+        return Recordatorio(reserva_id, normalizar_fecha(fecha_hora), email, nombre_usuario, servicio)
+
+
+# Instancia global del worker, arrancada desde el lifespan de la aplicación
+programador_recordatorios = ProgramadorRecordatorios(
+    antelacion=timedelta(minutes=settings.REMINDER_LEAD_MINUTES),
+    ventana=timedelta(minutes=settings.REMINDER_WINDOW_MINUTES),
+)
@@ -0,0 +1,384 @@
+# app/utils/email.py
+import asyncio
+import random
+import smtplib
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+
+@dataclass
+class Mensaje:
+    """
+    Correo pendiente en la bandeja de salida.
+
+    Atributos:
+        destinatario (str): Dirección de destino.
+        asunto (str): Asunto del correo.
+        cuerpo (str): Cuerpo en texto plano.
+        intentos (int): Intentos de envío realizados.
+        ultimo_error (Optional[str]): Último error de envío, si lo hubo.
+        creado_en (float): Instante de encolado (time.time()).
+    """
+    destinatario: str
+    asunto: str
+    cuerpo: str
+    intentos: int = 0
+    ultimo_error: Optional[str] = None
+    creado_en: float = field(default_factory=time.time)
+
+
+class ErrorPermanente(Exception):
+    """Rechazo definitivo del servidor SMTP (5xx): reintentar no sirve."""
+
+
+# ==============================
+# ✉️ Bandeja de salida asíncrona
+# ==============================
+class BandejaSalida:
+    """
+    Bandeja de salida de correos con envío en segundo plano.
+
+    Los handlers llaman a `encolar`, que no bloquea ni hace E/S: la latencia de la
+    petición no depende del servidor SMTP. Una tarea del worker saca los correos por
+    lotes y los envía reutilizando una única conexión SMTP (smtplib en un hilo),
+    respetando un límite de correos por segundo (token bucket). Los fallos
+    transitorios se reintentan con backoff exponencial y jitter; los permanentes o
+    los que agotan los intentos pasan a la lista de fallidos (`muertos`).
+
+    Con `habilitado=False` no se abre conexión: cada correo se registra en el log.
+
+    Atributos:
+        encolados (int): Correos aceptados en la cola.
+        enviados (int): Correos entregados al servidor SMTP (o registrados en el log).
+        reintentos (int): Reintentos programados tras fallos transitorios.
+        descartados (int): Correos rechazados por cola llena.
+        conexiones (int): Conexiones SMTP abiertas.
+        muertos (deque[Mensaje]): Últimos correos que no pudieron enviarse.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        remitente: str,
+        usuario: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        habilitado: bool = True,
+        timeout: float = 10.0,
+        inactividad: float = 30.0,
+        max_cola: int = 10000,
+        lote: int = 50,
+        tasa_por_segundo: float = 10.0,
+        max_intentos: int = 5,
+        espera_base: float = 2.0,
+        max_muertos: int = 1000,
+    ):
+        self.host = host
+        self.port = port
+        self.remitente = remitente
+        self.usuario = usuario
+        self.password = password
+        self.starttls = starttls
+        self.habilitado = habilitado
+        self.timeout = timeout
+        self.inactividad = inactividad
+        self.lote = max(lote, 1)
+        self.tasa_por_segundo = tasa_por_segundo
+        self.max_intentos = max(max_intentos, 1)
+        self.espera_base = espera_base
+        self.encolados = 0
+        self.enviados = 0
+        self.reintentos = 0
+        self.descartados = 0
+        self.conexiones = 0
+        self.muertos: deque[Mensaje] = deque(maxlen=max_muertos)
+        self._max_cola = max_cola
+        self._cola: Optional[asyncio.Queue] = None
+        # id(mensaje) -> (temporizador, mensaje) de los reintentos programados
+        self._en_espera: dict[int, tuple[asyncio.TimerHandle, Mensaje]] = {}
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._tokens = float(self.lote)
+        self._ultimo_relleno = time.monotonic()
+        self._tarea: Optional[asyncio.Task] = None
+
+    # ------------------------------
+    # Ciclo de vida
+    # ------------------------------
+    def iniciar(self) -> None:
+        """Arranca la tarea de envío en el event loop actual."""
+        if self._cola is None:
+            self._cola = asyncio.Queue(maxsize=self._max_cola)
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle(), name="bandeja-salida")
+            logger.info("✉️ Bandeja de salida iniciada ({})", "SMTP" if self.habilitado else "solo log")
+
+    async def detener(self, timeout: float = 5.0) -> None:
+        """
+        Intenta vaciar la cola durante `timeout` segundos y detiene la tarea de envío.
+
+        Los reintentos aún programados se abandonan y pasan a la lista de fallidos.
+        """
+        if self._tarea is None:
+            return
+        for handle, mensaje in self._en_espera.values():
+            handle.cancel()
+            self.muertos.append(mensaje)
+        self._en_espera.clear()
+        try:
+            await asyncio.wait_for(self._cola.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Bandeja de salida detenida con {self._cola.qsize()} correos sin enviar")
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+        await asyncio.to_thread(self._cerrar_conexion)
+        logger.info("Bandeja de salida detenida")
+
+    @property
+    def activa(self) -> bool:
+        """True si la tarea de envío está en marcha."""
+        return self._tarea is not None and not self._tarea.done()
+
+    # ------------------------------
+    # API para los handlers
+    # ------------------------------
+    def encolar(self, destinatario: str, asunto: str, cuerpo: str) -> bool:
+        """
+        Añade un correo a la cola sin bloquear.
+
+        Args:
+            destinatario (str): Dirección de destino.
+            asunto (str): Asunto.
+            cuerpo (str): Cuerpo en texto plano.
+
+        Returns:
+            bool: False si la bandeja no está iniciada o la cola está llena (el correo se descarta).
+        """
+        if self._cola is None:
+            logger.warning(f"Bandeja de salida no iniciada: correo a {destinatario} descartado")
+            self.descartados += 1
+            return False
+        try:
+            self._cola.put_nowait(Mensaje(destinatario, asunto, cuerpo))
+        except asyncio.QueueFull:
+            logger.warning(f"Cola de correo llena: correo a {destinatario} descartado")
+            self.descartados += 1
+            return False
+        self.encolados += 1
+        return True
+
+    def estadisticas(self) -> dict:
+        """Profundidad de la cola, contadores y últimos correos fallidos."""
+        return {
+            "activa": self.activa,
+            "smtp": self.habilitado,
+            "en_cola": self._cola.qsize() if self._cola is not None else 0,
+            "reintentos_pendientes": len(self._en_espera),
+            "encolados": self.encolados,
+            "enviados": self.enviados,
+            "reintentos": self.reintentos,
+            "descartados": self.descartados,
+            "fallidos": len(self.muertos),
+            "conexiones": self.conexiones,
+            "ultimos_fallidos": [
+                {"destinatario": m.destinatario, "asunto": m.asunto, "intentos": m.intentos, "error": m.ultimo_error}
+                for m in list(self.muertos)[-10:]
+            ],
+        }
+
+    # ------------------------------
+    # Envío en segundo plano
+    # ------------------------------
+    async def _bucle(self) -> None:
+        while True:
+            try:
+                primero = await asyncio.wait_for(self._cola.get(), timeout=self.inactividad)
+            except asyncio.TimeoutError:
+                # Sin tráfico: liberar la conexión para que el servidor no la cierre a medias
+                if self._smtp is not None:
+                    await asyncio.to_thread(self._cerrar_conexion)
+                continue
+
+            lote = [primero]
+            while len(lote) < self.lote and not self._cola.empty():
+                lote.append(self._cola.get_nowait())
+            try:
+                await self._esperar_tokens(len(lote))
+                resultados = await asyncio.to_thread(self._enviar_lote, lote)
+                for mensaje, error in zip(lote, resultados):
+                    self._procesar_resultado(mensaje, error)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en la bandeja de salida: {e}")
+                for mensaje in lote:
+                    self._procesar_resultado(mensaje, e)
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    async def _esperar_tokens(self, n: int) -> None:
+        """Token bucket: espera hasta poder enviar `n` correos sin superar la tasa."""
+        if self.tasa_por_segundo <= 0:
+            return
+        ahora = time.monotonic()
+        self._tokens = min(self.lote, self._tokens + (ahora - self._ultimo_relleno) * self.tasa_por_segundo)
+        self._ultimo_relleno = ahora
+        if self._tokens < n:
+            await asyncio.sleep((n - self._tokens) / self.tasa_por_segundo)
+            self._tokens = float(n)
+            self._ultimo_relleno = time.monotonic()
+        self._tokens -= n
+
+    def _procesar_resultado(self, mensaje: Mensaje, error: Optional[Exception]) -> None:
+        mensaje.intentos += 1
+        if error is None:
+            self.enviados += 1
+            return
+        mensaje.ultimo_error = str(error)
+        if isinstance(error, ErrorPermanente) or mensaje.intentos >= self.max_intentos:
+            logger.error(f"Correo a {mensaje.destinatario} descartado tras {mensaje.intentos} intentos: {error}")
+            self.muertos.append(mensaje)
+            return
+        espera = self.espera_base * 2 ** (mensaje.intentos - 1) * random.uniform(0.5, 1.5)
+        logger.warning(f"Fallo al enviar correo a {mensaje.destinatario}, reintento en {espera:.1f}s: {error}")
+        self.reintentos += 1
+        handle = asyncio.get_running_loop().call_later(espera, self._reencolar, mensaje)
+        self._en_espera[id(mensaje)] = (handle, mensaje)
+
+    def _reencolar(self, mensaje: Mensaje) -> None:
+        self._en_espera.pop(id(mensaje), None)
+        try:
+            self._cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            mensaje.ultimo_error = "cola llena al reintentar"
+            self.muertos.append(mensaje)
+
+    # ------------------------------
+    # SMTP (se ejecuta en un hilo)
+    # ------------------------------
+    def _enviar_lote(self, lote: list[Mensaje]) -> list[Optional[Exception]]:
+        """Envía un lote sobre la conexión reutilizada; retorna el error de cada correo o None."""
+        resultados: list[Optional[Exception]] = []
+        for mensaje in lote:
+            if not self.habilitado:
+                logger.info("✉️ [sin SMTP] Para {}: {}", mensaje.destinatario, mensaje.asunto)
+                resultados.append(None)
+                continue
+            resultados.append(self._enviar_uno(mensaje))
+        return resultados
+
+    def _enviar_uno(self, mensaje: Mensaje) -> Optional[Exception]:
+        correo = EmailMessage()
+        correo["From"] = self.remitente
+        correo["To"] = mensaje.destinatario
+        correo["Subject"] = mensaje.asunto
+        correo.set_content(mensaje.cuerpo)
+        # Un reintento inmediato si el servidor cerró la conexión reutilizada
+        for intento in range(2):
+            try:
+                self._conectar().send_message(correo)
+                return None
+            except smtplib.SMTPRecipientsRefused as e:
+                return ErrorPermanente(f"destinatario rechazado: {e.recipients}")
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    return ErrorPermanente(f"{e.smtp_code} {e.smtp_error!r}")
+                # 4xx: fallo transitorio, se reintenta más tarde con backoff
+                return e
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                self._cerrar_conexion()
+                if intento:
+                    return e
+            except smtplib.SMTPException as e:
+                self._cerrar_conexion()
+                return e
+        return None
+
+    def _conectar(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    smtp.starttls()
+                if self.usuario:
+                    smtp.login(self.usuario, self.password or "")
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.conexiones += 1
+        return self._smtp
+
+    def _cerrar_conexion(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+
+# Instancia global del worker, arrancada desde el lifespan de la aplicación
+bandeja_salida = BandejaSalida(
+    host=settings.SMTP_HOST,
+    port=settings.SMTP_PORT,
+    remitente=settings.EMAIL_FROM,
+    usuario=settings.SMTP_USER,
+    password=settings.SMTP_PASSWORD,
+    starttls=settings.SMTP_STARTTLS,
+    habilitado=settings.EMAIL_ENABLED,
+    timeout=settings.SMTP_TIMEOUT_SECONDS,
+    inactividad=settings.SMTP_IDLE_SECONDS,
+    max_cola=settings.EMAIL_QUEUE_MAX,
+    lote=settings.EMAIL_BATCH_SIZE,
+    tasa_por_segundo=settings.EMAIL_RATE_PER_SECOND,
+    max_intentos=settings.EMAIL_MAX_ATTEMPTS,
+    espera_base=settings.EMAIL_RETRY_BASE_SECONDS,
+    max_muertos=settings.EMAIL_DEAD_LETTER_MAX,
+)
+
+
+# ==============================
+# 📨 Notificaciones
+# ==============================
+def notificar_registro(email: str, nombre: str) -> bool:
+    """Encola el correo de bienvenida de un usuario recién registrado."""
+    return bandeja_salida.encolar(
+        email,
+        "Bienvenido/a al Centro de Belleza",
+        f"Hola {nombre},\n\nTu cuenta se ha creado correctamente. ¡Ya puedes reservar tu primera cita!\n",
+    )
+
+
+def notificar_reserva(email: str, nombre: str, reserva_id: int, fecha_hora: datetime) -> bool:
+    """Encola la confirmación de una reserva recién creada."""
+    return bandeja_salida.encolar(
+        email,
+        f"Reserva #{reserva_id} registrada",
+        f"Hola {nombre},\n\nHemos registrado tu reserva #{reserva_id} para el "
+        f"{fecha_hora:%d/%m/%Y a las %H:%M} (UTC).\n",
+    )
+
+
+def notificar_recordatorio(email: str, nombre: str, servicio: str, fecha_hora: datetime) -> bool:
+    """Encola el recordatorio de una cita próxima."""
+    return bandeja_salida.encolar(
+        email,
+        f"Recordatorio: {servicio} el {fecha_hora:%d/%m/%Y}",
+        f"Hola {nombre},\n\nTe recordamos tu cita de {servicio} el "
+        f"{fecha_hora:%d/%m/%Y a las %H:%M} (UTC).\n",
+    )
@@ -0,0 +1,156 @@
+# app/utils/exceptions.py
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# Códigos de error de MySQL para violaciones de restricciones
+MYSQL_DUPLICADO = 1062
+MYSQL_FK_PADRE_INEXISTENTE = 1452
+MYSQL_NO_NULO = 1048
+# Códigos de error de MySQL por bloqueos entre transacciones
+MYSQL_ESPERA_BLOQUEO = 1205
+MYSQL_INTERBLOQUEO = 1213
+
+
+class ServicioSaturadoError(HTTPException):
+    """
+    Error 503 que indica que un recurso interno (pool, cola) está saturado.
+
+    Hereda de HTTPException para que los handlers, que ya relanzan HTTPException,
+    lo propaguen tal cual con la cabecera Retry-After.
+
+    Args:
+        detail (str): Mensaje para el cliente.
+        retry_after (int): Segundos sugeridos antes de reintentar.
+    """
+
+    def __init__(self, detail: str, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class LimiteExcedidoError(HTTPException):
+    """
+    Error 429 que indica que el cliente superó un límite de peticiones.
+
+    Como ServicioSaturadoError, hereda de HTTPException para que los handlers lo
+    propaguen tal cual con la cabecera Retry-After.
+
+    Args:
+        retry_after (float): Segundos hasta que se admita la siguiente petición.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas peticiones, inténtalo más tarde",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+class ConflictoVersionError(HTTPException):
+    """
+    Error 409 que indica que el recurso cambió desde que el cliente leyó su versión.
+
+    El cliente debe volver a leerlo y decidir si repite el cambio sobre la versión nueva.
+
+    Args:
+        recurso (str): Nombre del recurso para el mensaje (p. ej. "La reserva").
+    """
+
+    def __init__(self, recurso: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{recurso} fue modificada por otra petición; vuelve a leerla e inténtalo de nuevo",
+        )
+
+
+class ClaveIdempotenteEnUsoError(HTTPException):
+    """
+    Error 409 que indica que otra petición con la misma Idempotency-Key guardó su respuesta antes.
+
+    Lo lanza un handler cuando su commit choca con la respuesta que acaba de guardar una
+    ejecución concurrente de la misma clave (en otro worker); `Idempotencia.ejecutar` lo
+    convierte en la repetición de esa respuesta. Como los demás errores de este módulo,
+    hereda de HTTPException para que los handlers lo propaguen tal cual.
+    """
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otra petición con la misma Idempotency-Key se está procesando; inténtalo de nuevo",
+        )
+
+
+@dataclass
+class ViolacionIntegridad:
+    """
+    Restricción violada por una escritura, independiente del driver.
+
+    Atributos:
+        tipo (str): "unico", "clave_foranea", "no_nulo" u "otro".
+        detalle (str): Mensaje original del driver (incluye tabla, columna o nombre de la restricción).
+    """
+    tipo: str
+    detalle: str
+
+    def menciona(self, nombre: str) -> bool:
+        """True si el mensaje del driver menciona la columna o restricción indicada."""
+        return nombre.lower() in self.detalle.lower()
+
+
+def clasificar_integridad(error: IntegrityError) -> ViolacionIntegridad:
+    """
+    Clasifica un IntegrityError de SQLAlchemy según la restricción violada.
+
+    Reconoce los códigos de MySQL (asyncmy) y los mensajes de SQLite (aiosqlite),
+    para que los handlers puedan confiar en las restricciones de la BD en lugar de
+    hacer un SELECT previo y aun así responder con el código HTTP adecuado.
+
+    Args:
+        error (IntegrityError): Excepción lanzada por el INSERT/UPDATE/COMMIT.
+
+    Returns:
+        ViolacionIntegridad: Tipo de violación y mensaje original.
+    """
+    original = error.orig
+    args = getattr(original, "args", ()) or ()
+    codigo: Optional[int] = args[0] if args and isinstance(args[0], int) else None
+    detalle = " ".join(str(a) for a in args) or str(original)
+
+    if codigo == MYSQL_DUPLICADO or "UNIQUE constraint failed" in detalle:
+        tipo = "unico"
+    elif codigo == MYSQL_FK_PADRE_INEXISTENTE or "FOREIGN KEY constraint failed" in detalle:
+        tipo = "clave_foranea"
+    elif codigo == MYSQL_NO_NULO or "NOT NULL constraint failed" in detalle:
+        tipo = "no_nulo"
+    else:
+        tipo = "otro"
+    return ViolacionIntegridad(tipo, detalle)
+
+
+def es_bloqueo(error: OperationalError) -> bool:
+    """
+    Indica si un OperationalError se debe a un bloqueo con otra transacción concurrente.
+
+    Reconoce el interbloqueo y la espera de bloqueo agotada de MySQL y el "database is
+    locked" de SQLite. La transacción no se aplicó: el handler la deshace y responde
+    como a cualquier otro conflicto con una petición concurrente.
+
+    Args:
+        error (OperationalError): Excepción lanzada por la sentencia o el COMMIT.
+
+    Returns:
+        bool: True si es un bloqueo; False para cualquier otro error de la BD.
+    """
+    args = getattr(error.orig, "args", ()) or ()
+    if args and args[0] in (MYSQL_ESPERA_BLOQUEO, MYSQL_INTERBLOQUEO):
+        return True
+    detalle = " ".join(str(a) for a in args) or str(error.orig)
+    return "database is locked" in detalle or "database table is locked" in detalle
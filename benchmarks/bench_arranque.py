@@ -0,0 +1,133 @@
+# benchmarks/bench_arranque.py
+"""
+Informe del arranque en frío de un contenedor del backend.
+
+1. Importación de `app.main` (python -X importtime en procesos nuevos): tiempo total,
+   paquetes que más aportan y módulos de la app más caros. Se compara con importar
+   además jose y passlib al inicio (lo que se hacía antes de cargarlos perezosamente).
+2. `init_db`: sentencias SQL y tiempo con una BD vacía, con la huella del esquema al
+   día (el caso de cada arranque) y forzando create_all (lo que se hacía siempre).
+   En MySQL cada sentencia es una ida y vuelta al servidor.
+3. Tiempo hasta que uvicorn responde en /health/live, desde que se lanza el proceso.
+
+Uso:
+    python -m benchmarks.bench_arranque --repeticiones 5
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+from benchmarks.comun import preparar_entorno, silenciar_logs
+
+preparar_entorno("bench_arranque")
+
+PATRON_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importar(codigo: str) -> list[tuple[int, int, int, str]]:
+    """Ejecuta `codigo` con -X importtime en un proceso nuevo; retorna (propio, acumulado, nivel, módulo) en µs."""
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, check=True, env=os.environ,
+    ).stderr
+    return [
+        (int(propio), int(acumulado), len(sangria) // 2, modulo)
+        for propio, acumulado, sangria, modulo in PATRON_IMPORTTIME.findall(salida)
+    ]
+
+
+def informe_importacion(repeticiones: int) -> None:
+    totales = {"actual": [], "con jose y passlib al inicio": []}
+    por_paquete: dict[str, list[int]] = defaultdict(list)
+    modulos_app: dict[str, list[int]] = defaultdict(list)
+    for _ in range(repeticiones):
+        filas = importar("import app.main")
+        totales["actual"].append(next(a for _, a, _, m in filas if m == "app.main"))
+        suma: dict[str, int] = defaultdict(int)
+        for propio, acumulado, _, modulo in filas:
+            suma[modulo.split(".")[0]] += propio
+            if modulo.startswith("app."):
+                modulos_app[modulo].append(acumulado)
+        for paquete, propio in suma.items():
+            por_paquete[paquete].append(propio)
+        filas = importar("import jose.jwt, passlib.context; import app.main")
+        totales["con jose y passlib al inicio"].append(
+            sum(a for _, a, nivel, m in filas if nivel == 0 and m.split(".")[0] in ("jose", "passlib", "app"))
+        )
+
+    print(f"\nImportación de app.main ({repeticiones} procesos nuevos, p50)")
+    for caso, muestras in totales.items():
+        print(f"  {caso:<32}{statistics.median(muestras) / 1000:>8.0f} ms")
+    print("\n  Paquetes con más tiempo propio de importación:")
+    for paquete, muestras in sorted(por_paquete.items(), key=lambda kv: -statistics.median(kv[1]))[:12]:
+        print(f"    {paquete:<30}{statistics.median(muestras) / 1000:>8.1f} ms")
+    print("\n  Módulos de la app (tiempo acumulado, incluye sus dependencias):")
+    for modulo, muestras in sorted(modulos_app.items(), key=lambda kv: -statistics.median(kv[1]))[:10]:
+        print(f"    {modulo:<30}{statistics.median(muestras) / 1000:>8.1f} ms")
+
+
+async def informe_init_db() -> None:
+    from sqlalchemy import event
+
+    from app.db.init_db import init_db
+    from app.db.session import engine
+
+    sentencias = 0
+
+    def contar(*args):
+        nonlocal sentencias
+        sentencias += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", contar)
+    print(f"\ninit_db ({engine.dialect.name})")
+    print(f"  {'caso':<32}{'sentencias':>12}{'ms':>10}")
+    for caso, forzar in (("BD vacía", False), ("huella al día", False), ("create_all forzado", True)):
+        sentencias, t0 = 0, time.perf_counter()
+        await init_db(forzar)
+        print(f"  {caso:<32}{sentencias:>12}{(time.perf_counter() - t0) * 1000:>10.1f}")
+    await engine.dispose()
+
+
+def hasta_listo(puerto: int) -> float:
+    """Lanza uvicorn y mide cuánto tarda /health/live en responder 200."""
+    t0 = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ,
+    )
+    try:
+        while time.perf_counter() - t0 < 30:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/health/live", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("uvicorn no respondió en 30 s")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main(repeticiones: int, puerto: int) -> None:
+    informe_importacion(repeticiones)
+    silenciar_logs()
+    asyncio.run(informe_init_db())
+    muestras = [hasta_listo(puerto) for _ in range(repeticiones)]
+    print(f"\nuvicorn hasta /health/live = 200: p50 {statistics.median(muestras) * 1000:.0f} ms "
+          f"(mín {min(muestras) * 1000:.0f}, máx {max(muestras) * 1000:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+    main(args.repeticiones, args.puerto)
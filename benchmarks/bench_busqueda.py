@@ -0,0 +1,233 @@
+# benchmarks/bench_busqueda.py
+"""
+Mide GET /servicios/buscar con un catálogo de decenas de miles de servicios.
+
+1. Construcción del índice en la primera carga del catálogo y coste de una
+   actualización incremental (un servicio) frente a reconstruirlo entero.
+2. Comprobaciones: tildes y ñ, prefijos, varias palabras, orden por relevancia,
+   servicios inactivos y servicios nuevos visibles al momento.
+3. Latencia por consulta: índice invertido, recorrido lineal del catálogo ya
+   normalizado en memoria, LIKE '%..%' en la BD y la petición HTTP completa.
+
+Uso:
+    python -m benchmarks.bench_busqueda --servicios 30000 --repeticiones 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.comun import imprimir, medir, medir_async, preparar_entorno, sembrar, silenciar_logs
+
+preparar_entorno("bench_busqueda")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, or_, select  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schemas.servicio import ServicioOut  # noqa: E402
+from app.services.busqueda import IndiceBusqueda, normalizar  # noqa: E402
+from app.services.catalogo import catalogo_cache  # noqa: E402
+
+TRATAMIENTOS = (
+    "Manicura", "Pedicura", "Depilación", "Masaje", "Corte", "Tinte", "Peinado", "Maquillaje",
+    "Limpieza facial", "Tratamiento capilar", "Uñas acrílicas", "Mechas", "Alisado",
+    "Extensiones de pestañas", "Diseño de cejas", "Exfoliación", "Lifting de pestañas", "Bronceado",
+)
+VARIANTES = (
+    "express", "premium", "con cera", "láser", "relajante", "descontracturante", "de novia",
+    "infantil", "semipermanente", "francesa", "hidratante", "orgánico", "clásico", "a domicilio",
+)
+ZONAS = ("piernas", "brazos", "axilas", "espalda", "rostro", "cuello", "manos", "pies", "ingles", "labio")
+PRODUCTOS = (
+    "aceite de argán", "keratina", "colágeno", "ácido hialurónico", "vitamina C", "arcilla",
+    "aloe vera", "manteca de karité", "gel", "parafina", "piedras calientes", "té verde",
+)
+SALONES = ("Centro", "Norte", "Sur", "Málaga", "Sevilla", "Córdoba", "Logroño", "Cádiz", "Jaén", "Ourense")
+
+CONSULTAS = (
+    "unas",                   # sin ñ
+    "depilacion laser",       # sin tildes, dos palabras
+    "mani",                   # prefijo corto
+    "MASAJE piedras",         # mayúsculas, nombre + descripción
+    "keratina",               # solo en descripciones
+    "pestañas lifting",       # orden distinto al del nombre
+    "logrono",                # ciudad con ñ
+    "hialuronico rostro",
+    "pedicura francesa pies",
+    "xilofono",               # sin resultados
+)
+
+
+def generar(n: int, aleatorio: random.Random) -> list[dict]:
+    servicios = []
+    for i in range(n):
+        nombre = f"{aleatorio.choice(TRATAMIENTOS)} {aleatorio.choice(VARIANTES)}"
+        if aleatorio.random() < 0.5:
+            nombre += f" {aleatorio.choice(ZONAS)}"
+        descripcion = (
+            f"Servicio de {nombre.lower()} con {aleatorio.choice(PRODUCTOS)} y {aleatorio.choice(PRODUCTOS)}"
+            f" en el salón {aleatorio.choice(SALONES)}, referencia R{i:06d}."
+        )
+        servicios.append({
+            "nombre": f"{nombre} {aleatorio.choice(SALONES)}",
+            "descripcion": descripcion,
+            "precio": 10 + i % 90,
+            "duracion_minutos": 30 + (i % 4) * 15,
+            "is_active": aleatorio.random() > 0.05,
+        })
+    return servicios
+
+
+async def servicios_out() -> list[ServicioOut]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(models.Servicio).order_by(models.Servicio.id))
+        return [ServicioOut.model_validate(s) for s in result.scalars()]
+
+
+# ==============================
+# 1️⃣ Construcción e incremental
+# ==============================
+async def construir(servicios: list[ServicioOut], repeticiones: int) -> None:
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        await catalogo_cache.asegurar(session)
+    primera_carga = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indice = IndiceBusqueda()
+    for s in servicios:
+        if s.is_active:
+            indice.indexar(s.id, s.nombre, s.descripcion)
+    solo_indice = time.perf_counter() - t0
+
+    # Recarga por TTL sin cambios: no reindexa nada
+    catalogo_cache.invalidar()
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        await catalogo_cache.asegurar(session)
+    recarga = time.perf_counter() - t0
+
+    print(f"\n1. Índice: {len(indice)} servicios activos, {indice.num_terminos} términos")
+    print(f"  primera carga del catálogo (BD + JSON + índice)  {primera_carga * 1000:>10.1f} ms")
+    print(f"  de ella, construir el índice                     {solo_indice * 1000:>10.1f} ms")
+    print(f"  recarga por TTL sin cambios (nada que reindexar) {recarga * 1000:>10.1f} ms")
+
+    aleatorio = random.Random(1)
+    nombres = [s.nombre for s in servicios]
+
+    def actualizar():
+        s = aleatorio.choice(servicios)
+        catalogo_cache.registrar(s.model_copy(update={"nombre": aleatorio.choice(nombres)}))
+
+    r = medir(actualizar, repeticiones * 10)
+    print(f"  registrar un servicio (reindexa solo ese)         {r['p50_ms']:>10.3f} ms p50, {r['p99_ms']:.3f} ms p99")
+    # Deja el catálogo como en la BD para el resto del benchmark
+    for s in servicios:
+        catalogo_cache.registrar(s)
+
+
+# ==============================
+# 2️⃣ Comprobaciones
+# ==============================
+async def comprobar(cliente: httpx.AsyncClient) -> None:
+    async def buscar(q: str, limit: int = 100) -> list[dict]:
+        r = await cliente.get("/servicios/buscar", params={"q": q, "limit": limit})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    print("\n2. Comprobaciones")
+    assert await buscar("unas") == await buscar("Uñas") == await buscar("UÑAS") != []
+    assert await buscar("depilacion laser") == await buscar("Depilación LÁSER") != []
+    print("  sin distinguir mayúsculas, tildes ni ñ ✓")
+
+    resultados = await buscar("mani")
+    assert resultados and all("mani" in normalizar(s["nombre"] + " " + s["descripcion"]) for s in resultados)
+    print("  prefijos: 'mani' -> " + resultados[0]["nombre"] + " ✓")
+
+    for s in await buscar("pedicura francesa pies"):
+        texto = normalizar(s["nombre"] + " " + s["descripcion"])
+        assert all(p in texto for p in ("pedicura", "frances", "pies")), texto
+    print("  todas las palabras de la consulta en cada resultado ✓")
+
+    resultados = await buscar("masaje", 100)
+    en_nombre = ["masaje" in normalizar(s["nombre"]) for s in resultados]
+    assert en_nombre == sorted(en_nombre, reverse=True), "coincidencias en el nombre primero"
+    print("  coincidencias en el nombre antes que solo en la descripción ✓")
+
+    assert all(s["is_active"] for s in await buscar("corte", 100))
+    assert await buscar("xilofono") == [] and await buscar("de la") == []
+    r = await cliente.get("/servicios/buscar", params={"q": ""})
+    assert r.status_code == 422, r.text
+    print("  sin inactivos, sin resultados para palabras vacías o desconocidas ✓")
+
+    nuevo = {"nombre": "Ritual zanzíbar", "descripcion": "Envoltura de chocolate", "precio": 50, "duracion_minutos": 60}
+    creado = (await cliente.post("/servicios/", json=nuevo)).json()
+    assert [s["id"] for s in await buscar("zanzibar")] == [creado["id"]]
+    assert [s["id"] for s in await buscar("ritual chocolate")][:1] == [creado["id"]]
+    print("  servicio creado visible al momento en la búsqueda ✓")
+
+
+# ==============================
+# 3️⃣ Latencia
+# ==============================
+async def comparar(cliente: httpx.AsyncClient, servicios: list[ServicioOut], repeticiones: int) -> None:
+    # Alternativa en memoria sin índice: recorrer el catálogo ya normalizado
+    textos = [(s.id, normalizar(f"{s.nombre} {s.descripcion or ''}")) for s in servicios if s.is_active]
+
+    def recorrido(q: str) -> list[int]:
+        palabras = normalizar(q).split()
+        return [i for i, t in textos if all(p in t for p in palabras)][:20]
+
+    async def like(q: str) -> list:
+        condiciones = [
+            or_(models.Servicio.nombre.like(f"%{p}%"), models.Servicio.descripcion.like(f"%{p}%"))
+            for p in q.split()
+        ]
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(models.Servicio.id).where(*condiciones).limit(20))
+            return result.all()
+
+    print(f"\n3. Latencia por consulta ({len(servicios)} servicios, limit=20)")
+    for q in CONSULTAS:
+        encontrados = len(catalogo_cache.busqueda.buscar(q, len(servicios)))
+        resultados = {
+            "índice invertido": medir(lambda: catalogo_cache.buscar(q, 20), repeticiones),
+            "recorrido lineal en memoria": medir(lambda: recorrido(q), max(5, repeticiones // 5)),
+            "LIKE '%..%' en la BD": await medir_async(lambda: like(q), max(5, repeticiones // 5)),
+            "HTTP GET /servicios/buscar": await medir_async(
+                lambda: cliente.get("/servicios/buscar", params={"q": q}), repeticiones
+            ),
+        }
+        imprimir(f"q={q!r} ({encontrados} coincidencias)", resultados)
+
+    async with AsyncSessionLocal() as session:
+        total = (await session.execute(select(func.count()).select_from(models.Servicio))).scalar_one()
+    print(f"\nNota: LIKE no ignora tildes y con '%..%' no usa índices: recorre las {total} filas en cada consulta.")
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    await init_db()
+    await sembrar(0, generar(args.servicios, random.Random(args.semilla)))
+    servicios = await servicios_out()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        await construir(servicios, args.repeticiones)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as cliente:
+            await comprobar(cliente)
+            await comparar(cliente, servicios, args.repeticiones)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servicios", type=int, default=30000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,261 @@
+# benchmarks/bench_carga.py
+"""
+Benchmark de carga extremo a extremo de la API.
+
+Arranca `app.main:app` (con su lifespan) contra una BD local, siembra volúmenes
+realistas de usuarios, servicios y reservas, y lanza peticiones concurrentes a
+cada endpoint a través de un cliente ASGI en proceso (httpx). Para cada escenario
+reporta throughput, p50/p95/p99 y códigos inesperados, y guarda el resultado en
+un JSON que se puede comparar con una ejecución anterior (`--comparar`).
+
+Por defecto usa SQLite (aiosqlite) en un fichero temporal. Para usar una MySQL
+desechable, exporta DATABASE_URL antes de lanzarlo: las tablas se BORRAN y se
+vuelven a crear.
+
+Las rutas que no cubre ningún escenario se listan al final, para que los
+endpoints nuevos no queden fuera del benchmark sin que nadie lo note.
+
+Uso:
+    python -m benchmarks.bench_carga --salida carga.json
+    python -m benchmarks.bench_carga --peticiones 1000 --concurrencia 64 --comparar carga.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from benchmarks.comun import PASSWORD, preparar_entorno, resumen, sembrar, silenciar_logs
+
+preparar_entorno("bench_carga")
+os.environ.setdefault("REMINDERS_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+# Rutas de documentación que no tiene sentido medir
+RUTAS_IGNORADAS = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+
+
+@dataclass
+class Escenario:
+    """
+    Un tipo de petición a medir.
+
+    Atributos:
+        nombre (str): Nombre del escenario en el informe.
+        metodo (str): Método HTTP.
+        ruta (str): Plantilla de la ruta (para el control de cobertura).
+        peticion (Callable[[int], dict]): Construye los kwargs de httpx para la petición i.
+        esperados (tuple[int, ...]): Códigos de estado válidos.
+        factor (float): Fracción de `--peticiones` que se lanzan (endpoints caros como el login).
+    """
+    nombre: str
+    metodo: str
+    ruta: str
+    peticion: Callable[[int], dict]
+    esperados: tuple[int, ...] = (200,)
+    factor: float = 1.0
+
+
+# ==============================
+# 🎯 Escenarios
+# ==============================
+def construir_escenarios(token: str, sembrado: dict, semilla: int) -> list[Escenario]:
+    aleatorio = random.Random(semilla + 1)
+    usuarios, servicios = sembrado["usuarios"], sembrado["servicios"]
+    auth = {"Authorization": f"Bearer {token}"}
+    # Reservas nuevas muy por delante de las sembradas: cada i es un hueco distinto
+    base_nuevas = datetime.fromisoformat(sembrado["ultima_fecha"]) + timedelta(days=30)
+    secuencia = itertools.count()
+    hoy = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+    def nueva_fecha() -> str:
+        return (base_nuevas + timedelta(hours=2 * next(secuencia))).isoformat()
+
+    def usuario() -> int:
+        return aleatorio.randint(1, usuarios)
+
+    def servicio() -> int:
+        return aleatorio.randint(1, servicios)
+
+    return [
+        Escenario("raiz", "GET", "/", lambda i: {"url": "/"}),
+        Escenario("check_db", "GET", "/check_db", lambda i: {"url": "/check_db"}),
+        Escenario("health live", "GET", "/health/live", lambda i: {"url": "/health/live"}),
+        Escenario("health ready", "GET", "/health/ready", lambda i: {"url": "/health/ready"}),
+        Escenario("auth ping", "GET", "/auth/ping", lambda i: {"url": "/auth/ping"}),
+        Escenario("login", "POST", "/auth/login", lambda i: {
+            "url": "/auth/login", "data": {"username": f"usuario{usuario()}@example.com", "password": PASSWORD},
+        }, factor=0.05),
+        Escenario("usuarios ping", "GET", "/usuarios/ping", lambda i: {"url": "/usuarios/ping"}),
+        Escenario("crear usuario", "POST", "/usuarios/", lambda i: {
+            "url": "/usuarios/", "json": {"nombre": f"Nuevo {i}", "email": f"nuevo{next(secuencia)}-{semilla}@example.com", "password": PASSWORD},
+        }, esperados=(201,), factor=0.05),
+        Escenario("listar usuarios", "GET", "/usuarios/", lambda i: {"url": "/usuarios/", "params": {"limit": 50}}),
+        Escenario("obtener usuario", "GET", "/usuarios/{usuario_id}", lambda i: {"url": f"/usuarios/{usuario()}"}),
+        Escenario("servicios ping", "GET", "/servicios/ping", lambda i: {"url": "/servicios/ping"}),
+        Escenario("crear servicio", "POST", "/servicios/", lambda i: {
+            "url": "/servicios/", "json": {"nombre": f"Nuevo servicio {i}", "precio": 25.0, "duracion_minutos": 45},
+        }, esperados=(201,), factor=0.1),
+        Escenario("listar servicios", "GET", "/servicios/", lambda i: {"url": "/servicios/"}),
+        Escenario("obtener servicio", "GET", "/servicios/{servicio_id}", lambda i: {"url": f"/servicios/{servicio()}"}),
+        Escenario("reservas ping", "GET", "/reservas/ping", lambda i: {"url": "/reservas/ping"}),
+        Escenario("crear reserva", "POST", "/reservas/", lambda i: {
+            "url": "/reservas/", "headers": auth,
+            "json": {"usuario_id": usuario(), "servicio_id": servicio(), "fecha_hora": nueva_fecha()},
+        }, esperados=(201,)),
+        Escenario("crear reservas bulk (10)", "POST", "/reservas/bulk", lambda i: {
+            "url": "/reservas/bulk", "headers": auth,
+            "json": [{"usuario_id": usuario(), "servicio_id": servicio(), "fecha_hora": nueva_fecha()} for _ in range(10)],
+        }, factor=0.2),
+        Escenario("listar reservas", "GET", "/reservas/", lambda i: {"url": "/reservas/", "params": {"limit": 100}}),
+        Escenario("reservas de un usuario", "GET", "/reservas/", lambda i: {
+            "url": "/reservas/", "params": {"usuario_id": usuario(), "desde": hoy.isoformat(), "limit": 50},
+        }),
+        Escenario("disponibilidad (7 días)", "GET", "/reservas/disponibilidad", lambda i: {
+            "url": "/reservas/disponibilidad",
+            "params": {"servicio_id": servicio(), "desde": (hoy + timedelta(days=1)).isoformat(),
+                       "hasta": (hoy + timedelta(days=8)).isoformat()},
+        }),
+        Escenario("resumen diario (30 días)", "GET", "/reservas/resumen", lambda i: {
+            "url": "/reservas/resumen",
+            "params": {"desde": hoy.date().isoformat(), "hasta": (hoy + timedelta(days=29)).date().isoformat()},
+        }, factor=0.2),
+        Escenario("resumen por servicio (1 año)", "GET", "/reservas/resumen/servicios", lambda i: {
+            "url": "/reservas/resumen/servicios",
+            "params": {"desde": hoy.date().isoformat(), "hasta": (hoy + timedelta(days=365)).date().isoformat()},
+        }, factor=0.2),
+        Escenario("interno pool", "GET", "/interno/pool", lambda i: {"url": "/interno/pool"}, factor=0.2),
+        Escenario("interno recordatorios", "GET", "/interno/recordatorios", lambda i: {"url": "/interno/recordatorios"}, factor=0.2),
+        Escenario("interno email", "GET", "/interno/email", lambda i: {"url": "/interno/email"}, factor=0.2),
+        Escenario("interno replicas", "GET", "/interno/replicas", lambda i: {"url": "/interno/replicas"}, factor=0.2),
+        Escenario("metrics", "GET", "/metrics", lambda i: {"url": "/metrics"}, factor=0.2),
+    ]
+
+
+async def ejecutar(cliente: httpx.AsyncClient, escenario: Escenario, n: int, concurrencia: int) -> dict:
+    """Lanza `n` peticiones del escenario con `concurrencia` tareas en paralelo."""
+    latencias: list[float] = []
+    estados: dict[str, int] = {}
+    indices = iter(range(n))
+
+    async def trabajador():
+        for i in indices:
+            kwargs = escenario.peticion(i)
+            t0 = time.perf_counter()
+            r = await cliente.request(escenario.metodo, **kwargs)
+            latencias.append(time.perf_counter() - t0)
+            estados[str(r.status_code)] = estados.get(str(r.status_code), 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(min(concurrencia, n))))
+    total = time.perf_counter() - t0
+    datos = resumen(latencias)
+    datos["rps"] = n / total if total else 0.0
+    datos["estados"] = estados
+    datos["inesperados"] = sum(c for e, c in estados.items() if int(e) not in escenario.esperados)
+    return datos
+
+
+def rutas_sin_cubrir(escenarios: list[Escenario]) -> list[str]:
+    cubiertas = {(e.metodo, e.ruta) for e in escenarios}
+    faltan = []
+    for ruta in app.routes:
+        if ruta.path in RUTAS_IGNORADAS:
+            continue
+        for metodo in sorted(getattr(ruta, "methods", None) or ()):
+            if metodo != "HEAD" and (metodo, ruta.path) not in cubiertas:
+                faltan.append(f"{metodo} {ruta.path}")
+    return faltan
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def imprimir_informe(resultados: dict, anterior: Optional[dict]) -> None:
+    previos = (anterior or {}).get("escenarios", {})
+    print(f"\n{'escenario':<28}{'n':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms){'':>2}{'inesp.':>7}"
+          + ("   Δp50    Δrps" if previos else ""))
+    for nombre, r in resultados.items():
+        linea = (f"{nombre:<28}{r['n']:>6}{r['rps']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                 f"{r['p99_ms']:>9.2f}{'':>8}{r['inesperados']:>7}")
+        previo = previos.get(nombre)
+        if previo and previo["p50_ms"] and previo["rps"]:
+            linea += f"{(r['p50_ms'] / previo['p50_ms'] - 1) * 100:>+7.0f}%{(r['rps'] / previo['rps'] - 1) * 100:>+7.0f}%"
+        print(linea)
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    print(f"BD: {settings.DATABASE_URL.split('@')[-1]}")
+    sembrado = await sembrar(args.usuarios, args.servicios, args.reservas, args.semilla)
+    print(f"Sembrado: {sembrado}")
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        silenciar_logs()  # el lifespan reconfigura loguru
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as cliente:
+            r = await cliente.post("/auth/login", data={"username": "usuario1@example.com", "password": PASSWORD})
+            token = r.json()["access_token"]
+            escenarios = construir_escenarios(token, sembrado, args.semilla)
+            if args.solo:
+                escenarios = [e for e in escenarios if any(s in e.nombre for s in args.solo)]
+            for escenario in escenarios:
+                n = max(1, int(args.peticiones * escenario.factor))
+                await ejecutar(cliente, escenario, min(n, args.calentamiento), args.concurrencia)
+                resultados[escenario.nombre] = await ejecutar(cliente, escenario, n, args.concurrencia)
+    await engine.dispose()
+
+    anterior = None
+    if args.comparar and os.path.exists(args.comparar):
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir_informe(resultados, anterior)
+    faltan = rutas_sin_cubrir(construir_escenarios("", sembrado, args.semilla))
+    if faltan:
+        print(f"\n⚠️ Rutas sin escenario: {', '.join(faltan)}")
+
+    informe = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "bd": settings.DATABASE_URL.split("://")[0],
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "sembrado": sembrado,
+        "escenarios": resultados,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=2000)
+    parser.add_argument("--servicios", type=int, default=40)
+    parser.add_argument("--reservas", type=int, default=50000)
+    parser.add_argument("--peticiones", type=int, default=500, help="peticiones por escenario (antes del factor)")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--calentamiento", type=int, default=20, help="peticiones de calentamiento por escenario")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--solo", nargs="*", help="ejecutar solo los escenarios cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--salida", default="resultados_carga.json")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para mostrar diferencias")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+# benchmarks/bench_catalogo.py
+"""
+Compara la ruta actual del catálogo (SELECT + ORM + pydantic + JSON) con la caché
+versionada de `app.services.catalogo`.
+
+Uso:
+    python -m benchmarks.bench_catalogo --servicios 500 --repeticiones 200
+"""
+import argparse
+import asyncio
+
+from benchmarks.comun import imprimir, medir, medir_async, preparar_entorno, sembrar, silenciar_logs
+
+preparar_entorno("bench_catalogo")
+
+import httpx  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schemas.servicio import ServicioOut  # noqa: E402
+from app.services.catalogo import calcular_etag, catalogo_cache, etag_coincide  # noqa: E402
+
+
+async def main(cantidad: int, repeticiones: int) -> None:
+    silenciar_logs()
+    await init_db()
+    await sembrar(0, [
+        {
+            "nombre": f"Servicio {i}",
+            "descripcion": f"Descripción del servicio número {i} del catálogo",
+            "precio": 10 + i % 90,
+            "duracion_minutos": 30 + (i % 4) * 15,
+        }
+        for i in range(cantidad)
+    ])
+    lista_out = TypeAdapter(list[ServicioOut])
+
+    async def ruta_actual():
+        # Equivalente al handler original: SELECT de entidades + validación + serialización
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(models.Servicio))
+            servicios = [ServicioOut.model_validate(s) for s in result.scalars().all()]
+            return lista_out.dump_json(servicios)
+
+    async with AsyncSessionLocal() as session:
+        await catalogo_cache.asegurar(session)
+    cuerpo, _ = catalogo_cache.pagina(None, None)
+    etag = calcular_etag(cuerpo)
+
+    def cache_200():
+        c, _ = catalogo_cache.pagina(None, None)
+        return calcular_etag(c)
+
+    def cache_304():
+        c, _ = catalogo_cache.pagina(None, None)
+        return etag_coincide(etag, calcular_etag(c))
+
+    resultados = {
+        "ruta actual (BD + pydantic)": await medir_async(ruta_actual, repeticiones),
+        "caché: página completa + ETag": medir(cache_200, repeticiones),
+        "caché: If-None-Match -> 304": medir(cache_304, repeticiones),
+        "caché: obtener por id": medir(lambda: catalogo_cache.obtener(cantidad // 2), repeticiones),
+    }
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        resultados["HTTP GET /servicios/?limit=1000 (200)"] = await medir_async(
+            lambda: client.get("/servicios/", params={"limit": 1000}), repeticiones
+        )
+        etag_http = (await client.get("/servicios/", params={"limit": 1000})).headers["etag"]
+        resultados["HTTP GET /servicios/?limit=1000 (304)"] = await medir_async(
+            lambda: client.get("/servicios/", params={"limit": 1000}, headers={"If-None-Match": etag_http}),
+            repeticiones,
+        )
+
+    imprimir(f"Catálogo de {cantidad} servicios", resultados)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servicios", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.servicios, args.repeticiones))
@@ -0,0 +1,122 @@
+# benchmarks/bench_email.py
+"""
+Comprueba que la latencia de crear_reserva no depende del servidor SMTP.
+
+Levanta un servidor SMTP local con aiosmtpd que tarda `--retraso` segundos en
+aceptar cada correo y crea reservas a través de la API (httpx sobre ASGI), primero
+con la bandeja en modo solo log y después enviando por SMTP. Compara ambas
+latencias con la de enviar el correo en línea (smtplib dentro del handler) y
+espera a que la bandeja entregue todos los correos, reportando conexiones,
+reintentos y fallidos.
+
+Uso:
+    python -m benchmarks.bench_email --reservas 50 --retraso 0.05
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import time
+
+from benchmarks.comun import imprimir, preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("bench_email")
+os.environ.setdefault("EMAIL_ENABLED", "true")
+os.environ.setdefault("SMTP_HOST", "127.0.0.1")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ.setdefault("EMAIL_RATE_PER_SECOND", "0")
+
+import httpx  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.email import bandeja_salida  # noqa: E402
+
+
+class ServidorLento:
+    """Handler de aiosmtpd que tarda `retraso` segundos en aceptar cada correo."""
+
+    def __init__(self, retraso: float):
+        self.retraso = retraso
+        self.recibidos = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.retraso)
+        self.recibidos += 1
+        return "250 OK"
+
+
+async def crear_reservas(cliente: httpx.AsyncClient, cabeceras: dict, desde: int, n: int) -> list[float]:
+    """Crea `n` reservas secuenciales y retorna la latencia de cada petición."""
+    latencias = []
+    for i in range(desde, desde + n):
+        fecha = f"2030-01-{1 + i // 20:02d}T{8 + (i % 20) // 2:02d}:{30 * (i % 2):02d}:00"
+        t0 = time.perf_counter()
+        r = await cliente.post("/reservas/", json={"usuario_id": 1, "servicio_id": 1, "fecha_hora": fecha}, headers=cabeceras)
+        latencias.append(time.perf_counter() - t0)
+        assert r.status_code == 201, r.text
+    return latencias
+
+
+async def main(reservas: int, retraso: float) -> None:
+    silenciar_logs()
+    handler = ServidorLento(retraso)
+    controlador = Controller(handler, hostname=settings.SMTP_HOST, port=settings.SMTP_PORT)
+    controlador.start()
+    await init_db()
+    bandeja_salida.iniciar()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+            await cliente.post("/usuarios/", json={"nombre": "Ana", "email": "ana@example.com", "password": "pw"})
+            r = await cliente.post("/auth/login", data={"username": "ana@example.com", "password": "pw"})
+            cabeceras = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            await cliente.post("/servicios/", json={"nombre": "Corte", "precio": 10, "duracion_minutos": 30})
+            await bandeja_salida._cola.join()
+
+            bandeja_salida.habilitado = False
+            sin_smtp = await crear_reservas(cliente, cabeceras, 0, reservas)
+            await bandeja_salida._cola.join()
+
+            bandeja_salida.habilitado = True
+            t0 = time.perf_counter()
+            con_smtp = await crear_reservas(cliente, cabeceras, reservas, reservas)
+            respuestas = time.perf_counter() - t0
+            await bandeja_salida._cola.join()
+            entrega = time.perf_counter() - t0
+
+        # Referencia: coste de enviar el correo dentro del handler, una conexión por petición
+        en_linea = []
+        for i in range(min(reservas, 20)):
+            t0 = time.perf_counter()
+            await asyncio.to_thread(_enviar_en_linea, f"linea{i}@example.com")
+            en_linea.append(time.perf_counter() - t0)
+
+        imprimir(f"crear_reserva x{reservas} con un servidor SMTP de {retraso * 1000:.0f} ms por correo", {
+            "bandeja sin SMTP (solo log)": resumen(sin_smtp),
+            "bandeja con SMTP lento": resumen(con_smtp),
+            "envío SMTP en línea (solo el correo)": resumen(en_linea),
+        })
+        estado = bandeja_salida.estadisticas()
+        print(f"Respuestas en {respuestas:.2f}s, correos entregados en {entrega:.2f}s")
+        print(f"Recibidos por el servidor: {handler.recibidos}, conexiones SMTP: {estado['conexiones']}, "
+              f"reintentos: {estado['reintentos']}, fallidos: {estado['fallidos']}")
+    finally:
+        await bandeja_salida.detener()
+        controlador.stop()
+        await engine.dispose()
+
+
+def _enviar_en_linea(destinatario: str) -> None:
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10) as smtp:
+        smtp.sendmail(settings.EMAIL_FROM, [destinatario], "Subject: prueba\r\n\r\nhola\r\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservas", type=int, default=50)
+    parser.add_argument("--retraso", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.reservas, args.retraso))
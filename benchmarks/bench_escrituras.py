@@ -0,0 +1,128 @@
+# benchmarks/bench_escrituras.py
+"""
+Cuenta las idas y vueltas a la BD y la latencia de crear_usuario y crear_reserva.
+
+Compara el flujo anterior (SELECT de comprobación + INSERT + COMMIT + refresh)
+con los handlers actuales, que confían en las restricciones UNIQUE/FK y fijan los
+valores por defecto en Python. Se cuentan sentencias y COMMIT/ROLLBACK mediante
+eventos del motor; `--rtt-ms` añade una latencia artificial por ida y vuelta para
+aproximar una BD en red (SQLite local responde en microsegundos).
+
+El hash de contraseña se sustituye por uno precalculado: bcrypt dominaría la
+latencia y aquí se mide solo el acceso a la BD.
+
+Uso:
+    python -m benchmarks.bench_escrituras --n 300 --rtt-ms 0.5
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.comun import ContadorSQL, imprimir, preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("bench_escrituras")
+
+from sqlalchemy import select  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.api.routes import reservas as rutas_reservas  # noqa: E402
+from app.api.routes import usuarios as rutas_usuarios  # noqa: E402
+from app.core.security import hash_password  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.schemas.reserva import ReservaCreate  # noqa: E402
+from app.schemas.usuario import UsuarioCreate  # noqa: E402
+from app.services.disponibilidad import motor_disponibilidad  # noqa: E402
+
+
+# ------------------------------
+# Flujo anterior, reproducido como referencia
+# ------------------------------
+async def crear_usuario_anterior(db, user: UsuarioCreate, hashed: str):
+    existe = await db.execute(select(models.Usuario).where(models.Usuario.email == user.email))
+    if existe.scalar_one_or_none():
+        raise ValueError("duplicado")
+    nuevo = models.Usuario(nombre=user.nombre, email=user.email, hashed_password=hashed)
+    db.add(nuevo)
+    await db.commit()
+    await db.refresh(nuevo)
+    return nuevo
+
+
+async def crear_reserva_anterior(db, reserva: ReservaCreate):
+    servicio = await db.execute(select(models.Servicio).where(models.Servicio.id == reserva.servicio_id))
+    if not servicio.scalar_one_or_none():
+        raise ValueError("servicio")
+    nueva = models.Reserva(**reserva.model_dump())
+    db.add(nueva)
+    await db.commit()
+    await db.refresh(nueva)
+    return nueva
+
+
+async def medir(contador: ContadorSQL, n: int, crear) -> dict:
+    """Ejecuta `crear(i, db)` n veces, cada una con su sesión, y resume idas y latencia."""
+    latencias = []
+    idas = 0
+    for i in range(n):
+        async with AsyncSessionLocal() as db:
+            antes = contador.total
+            t0 = time.perf_counter()
+            await crear(i, db)
+            latencias.append(time.perf_counter() - t0)
+            idas += contador.total - antes
+    datos = resumen(latencias)
+    datos["idas_por_op"] = idas / n
+    return datos
+
+
+async def main(n: int, rtt_ms: float) -> None:
+    silenciar_logs()
+    await init_db()
+    hashed = hash_password("pw")
+
+    async def hash_precalculado(password: str) -> str:
+        return hashed
+
+    rutas_usuarios.hash_password_async = hash_precalculado
+
+    async with AsyncSessionLocal() as db:
+        db.add(models.Servicio(nombre="Corte", precio=10, duracion_minutos=30))
+        await db.commit()
+    # Las rutas se llaman directamente: sin Depends ni Header resueltos, se pasan la petición y Idempotency-Key=None
+    peticion = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 1)})
+    operador = models.Usuario(id=1, nombre="Bench", email="bench@example.com", hashed_password="", is_active=True)
+    contador = ContadorSQL(transacciones=True, rtt=rtt_ms / 1000)
+    base = datetime(2030, 1, 1, 8, 0)
+
+    def usuario(prefijo: str, i: int) -> UsuarioCreate:
+        return UsuarioCreate(nombre=f"U{i}", email=f"{prefijo}{i}@example.com", password="pw")
+
+    def reserva(desplazamiento: int, i: int) -> ReservaCreate:
+        return ReservaCreate(usuario_id=1, servicio_id=1, fecha_hora=base + timedelta(hours=desplazamiento + i))
+
+    # Calentar el índice de disponibilidad (en producción está cargado casi siempre)
+    async with AsyncSessionLocal() as db:
+        await motor_disponibilidad.obtener_indice(db, 1)
+
+    resultados = {
+        "crear_usuario anterior": await medir(contador, n, lambda i, db: crear_usuario_anterior(db, usuario("a", i), hashed)),
+        "crear_usuario actual": await medir(contador, n, lambda i, db: rutas_usuarios.crear_usuario(usuario("b", i), peticion, db, None)),
+        "crear_reserva anterior": await medir(contador, n, lambda i, db: crear_reserva_anterior(db, reserva(0, i))),
+        "crear_reserva actual": await medir(contador, n, lambda i, db: rutas_reservas.crear_reserva(reserva(n, i), db, operador, None)),
+    }
+    await engine.dispose()
+
+    imprimir(f"Escrituras con {rtt_ms} ms simulados por ida y vuelta", resultados)
+    for nombre, datos in resultados.items():
+        print(f"{nombre:<28} {datos['idas_por_op']:.1f} idas y vueltas por operación")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.n, args.rtt_ms))
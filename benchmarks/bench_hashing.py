@@ -0,0 +1,94 @@
+# benchmarks/bench_hashing.py
+"""
+Mide la latencia del event loop mientras se procesan logins concurrentes.
+
+Compara `verify_password` llamado directamente dentro de la corrutina (bloquea el
+loop) con `verify_password_async` sobre el pool acotado de hilos y de procesos.
+La latencia del loop se mide con un "ticker" que duerme 5 ms y registra el retraso.
+
+Uso:
+    python -m benchmarks.bench_hashing --logins 16
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.comun import imprimir, preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("bench_hashing")
+
+from app.core.security import PoolHashing, hash_password, verify_password  # noqa: E402
+from app.utils.exceptions import ServicioSaturadoError  # noqa: E402
+
+INTERVALO_TICKER = 0.005
+
+
+async def con_ticker(carga) -> tuple[dict, float, int]:
+    """Ejecuta `carga()` mientras un ticker mide el retraso del event loop."""
+    retrasos: list[float] = []
+    terminado = asyncio.Event()
+
+    async def ticker():
+        while not terminado.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(INTERVALO_TICKER)
+            retrasos.append(time.perf_counter() - t0 - INTERVALO_TICKER)
+
+    tarea = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    rechazadas = await carga()
+    total = time.perf_counter() - t0
+    terminado.set()
+    await tarea
+    return resumen(retrasos or [0.0]), total, rechazadas
+
+
+async def main(logins: int, workers: int, cola: int) -> None:
+    silenciar_logs()
+    hashed = hash_password("secreto-de-prueba")
+
+    async def login_bloqueante():
+        # Lo que hacía el handler original: bcrypt directamente en la corrutina
+        return verify_password("secreto-de-prueba", hashed)
+
+    def carga_con(pool: PoolHashing):
+        async def carga():
+            async def login():
+                try:
+                    await pool.ejecutar(verify_password, "secreto-de-prueba", hashed)
+                    return 0
+                except ServicioSaturadoError:
+                    return 1
+
+            resultados = await asyncio.gather(*(login() for _ in range(logins)))
+            pool.cerrar()
+            return sum(resultados)
+        return carga
+
+    async def carga_bloqueante():
+        await asyncio.gather(*(login_bloqueante() for _ in range(logins)))
+        return 0
+
+    escenarios = {
+        "síncrono en el loop": carga_bloqueante,
+        f"pool de hilos ({workers})": carga_con(PoolHashing("thread", workers, logins, 1)),
+        f"pool de procesos ({workers})": carga_con(PoolHashing("process", workers, logins, 1)),
+        f"pool de hilos saturado (cola {cola})": carga_con(PoolHashing("thread", workers, cola, 1)),
+    }
+
+    resultados = {}
+    for nombre, carga in escenarios.items():
+        lag, total, rechazadas = await con_ticker(carga)
+        resultados[f"{nombre}: retraso del loop"] = lag
+        print(f"{nombre:<40} total {total * 1000:8.1f} ms, rechazadas (503): {rechazadas}")
+    imprimir(f"Retraso del event loop con {logins} logins concurrentes", resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cola", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers, args.cola))
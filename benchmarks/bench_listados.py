@@ -0,0 +1,93 @@
+# benchmarks/bench_listados.py
+"""
+Mide el coste de construir respuestas de listado de 10k filas.
+
+Compara, para reservas y usuarios:
+- ORM + response_model: entidades ORM validadas con `from_attributes` y serializadas
+  como hace FastAPI (dump_python en modo JSON + json.dumps), el camino anterior;
+- proyección: solo las columnas del esquema como tuplas, serializadas a bytes con el
+  TypeAdapter precompilado de `app.api.listados.Proyeccion`.
+
+Se separa la lectura (consulta + materialización de filas) de la serialización y
+se verifica que ambos caminos producen exactamente los mismos bytes.
+
+Uso:
+    python -m benchmarks.bench_listados --filas 10000 --repeticiones 20
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.comun import imprimir, preparar_entorno, resumen, sembrar, silenciar_logs
+
+preparar_entorno("bench_listados")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.api.routes.reservas import proyeccion_reservas  # noqa: E402
+from app.api.routes.usuarios import proyeccion_usuarios  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.schemas.reserva import ReservaOut  # noqa: E402
+from app.schemas.usuario import UsuarioOut  # noqa: E402
+
+
+def serializar_como_fastapi(adaptador: TypeAdapter, entidades) -> bytes:
+    """Validación `from_attributes` + serialización de `response_model` + render de JSONResponse."""
+    validadas = adaptador.validate_python(entidades)
+    contenido = adaptador.dump_python(validadas, mode="json")
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+async def medir(n: int, repeticiones: int, modelo, esquema, proyeccion) -> dict:
+    adaptador = TypeAdapter(list[esquema])
+    muestras = {clave: [] for clave in ("orm lectura", "orm serialización", "proyección lectura", "proyección serialización")}
+    for _ in range(repeticiones):
+        async with AsyncSessionLocal() as db:
+            t0 = time.perf_counter()
+            entidades = (await db.execute(select(modelo).order_by(modelo.id).limit(n))).scalars().all()
+            t1 = time.perf_counter()
+            anterior = serializar_como_fastapi(adaptador, entidades)
+            t2 = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            t3 = time.perf_counter()
+            filas = proyeccion.filas((await db.execute(proyeccion.select().order_by(modelo.id).limit(n))).all())
+            t4 = time.perf_counter()
+            actual = proyeccion.json(filas)
+            t5 = time.perf_counter()
+        assert anterior == actual, "las dos rutas deben producir los mismos bytes"
+        muestras["orm lectura"].append(t1 - t0)
+        muestras["orm serialización"].append(t2 - t1)
+        muestras["proyección lectura"].append(t4 - t3)
+        muestras["proyección serialización"].append(t5 - t4)
+    muestras["orm total"] = [a + b for a, b in zip(muestras["orm lectura"], muestras["orm serialización"])]
+    muestras["proyección total"] = [a + b for a, b in zip(muestras["proyección lectura"], muestras["proyección serialización"])]
+    return {clave: resumen(valores) for clave, valores in muestras.items()}
+
+
+async def main(n: int, repeticiones: int) -> None:
+    silenciar_logs()
+    await init_db()
+    await sembrar(n, 1, n)
+    try:
+        for nombre, modelo, esquema, proyeccion in (
+            ("reservas", models.Reserva, ReservaOut, proyeccion_reservas),
+            ("usuarios", models.Usuario, UsuarioOut, proyeccion_usuarios),
+        ):
+            resultados = await medir(n, repeticiones, modelo, esquema, proyeccion)
+            imprimir(f"Listado de {n} {nombre} ({repeticiones} repeticiones)", resultados)
+            ahorro = 1 - resultados["proyección total"]["p50_ms"] / resultados["orm total"]["p50_ms"]
+            print(f"Ahorro p50 total: {ahorro:.0%}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.filas, args.repeticiones))
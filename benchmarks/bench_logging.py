@@ -0,0 +1,131 @@
+# benchmarks/bench_logging.py
+"""
+Mide el coste del logging por petición con la configuración por defecto de loguru
+y con el pipeline de `app.core.logging_config`.
+
+Escenarios (mismas peticiones, logs a un fichero temporal como si stderr estuviera
+redirigido a un colector):
+- sin logs: referencia, sin ningún sink;
+- loguru por defecto: sink síncrono a nivel DEBUG (lo que había antes);
+- pipeline (texto / JSON): nivel INFO, sink encolado y muestreo de mensajes calientes.
+
+También mide el coste de una llamada `logger.debug` descartada por nivel con f-string
+(formateo anticipado) y con argumentos (formateo perezoso).
+
+Uso:
+    python -m benchmarks.bench_logging --peticiones 4000 --rondas 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+from benchmarks.comun import imprimir, preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("bench_logging")
+
+import httpx  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from app.core import logging_config  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def medir_peticiones(cliente: httpx.AsyncClient, n: int) -> tuple[list[float], float]:
+    """
+    Alterna peticiones de lectura típicas.
+
+    Returns:
+        tuple[list[float], float]: Latencia de cada petición y CPU del proceso por petición
+        (incluye el hilo del sink encolado, que se vacía antes de parar el reloj).
+    """
+    rutas = ("/servicios/1", "/reservas/?limit=20", "/usuarios/1")
+    latencias = []
+    cpu0 = time.process_time()
+    for i in range(n):
+        t0 = time.perf_counter()
+        r = await cliente.get(rutas[i % len(rutas)])
+        latencias.append(time.perf_counter() - t0)
+        assert r.status_code == 200, r.text
+    await logger.complete()
+    return latencias, (time.process_time() - cpu0) / n
+
+
+def micro_llamadas(n: int) -> dict:
+    """Coste medio (µs) de un logger.debug descartado por nivel, anticipado vs perezoso."""
+    silenciar_logs()
+    logger.add(sys.stderr, level="INFO")
+    reserva = {"id": 123, "usuario": "ana@example.com", "servicio": 7}
+    anticipado = timeit.timeit(lambda: logger.debug(f"Reserva {reserva['id']} de {reserva['usuario']} en {reserva}"), number=n)
+    perezoso = timeit.timeit(lambda: logger.debug("Reserva {} de {} en {}", reserva["id"], reserva["usuario"], reserva), number=n)
+    silenciar_logs()
+    return {"f-string": anticipado / n * 1e6, "argumentos": perezoso / n * 1e6}
+
+
+async def main(peticiones: int, rondas: int) -> None:
+    silenciar_logs()
+    await init_db()
+    destino = open(os.path.join(tempfile.gettempdir(), "bench_logging.log"), "w")
+
+    def sin_logs():
+        silenciar_logs()
+
+    def loguru_por_defecto():
+        silenciar_logs()
+        logger.add(destino, level="DEBUG")
+
+    def pipeline(json: bool):
+        def configurar():
+            settings.LOG_JSON = json
+            logging_config.configurar_logging(destino)
+        return configurar
+
+    escenarios = {
+        "sin logs": sin_logs,
+        "loguru por defecto (DEBUG, síncrono)": loguru_por_defecto,
+        "pipeline texto (INFO, encolado, muestreo)": pipeline(False),
+        "pipeline JSON (INFO, encolado, muestreo)": pipeline(True),
+    }
+
+    # Rondas intercaladas: el ruido del loop y de SQLite afecta por igual a todos los escenarios
+    latencias = {nombre: [] for nombre in escenarios}
+    cpu = {nombre: [] for nombre in escenarios}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+            await cliente.post("/usuarios/", json={"nombre": "Ana", "email": "ana@example.com", "password": "pw"})
+            await cliente.post("/servicios/", json={"nombre": "Corte", "precio": 10, "duracion_minutos": 30})
+            await medir_peticiones(cliente, 200)  # calentamiento
+            for _ in range(rondas):
+                for nombre, configurar in escenarios.items():
+                    configurar()
+                    muestras, cpu_peticion = await medir_peticiones(cliente, peticiones // rondas)
+                    latencias[nombre].extend(muestras)
+                    cpu[nombre].append(cpu_peticion)
+    finally:
+        silenciar_logs()
+        destino.close()
+        await engine.dispose()
+
+    resultados = {nombre: resumen(muestras) for nombre, muestras in latencias.items()}
+    cpu_mediana = {nombre: statistics.median(valores) for nombre, valores in cpu.items()}
+    base = cpu_mediana["sin logs"]
+    imprimir(f"Latencia por petición ({peticiones} peticiones de lectura, {rondas} rondas)", resultados)
+    for nombre, valor in cpu_mediana.items():
+        print(f"{nombre:<45} CPU {valor * 1e6:7.1f} µs/petición, logging {(valor - base) * 1e6:7.1f} µs")
+    micro = micro_llamadas(200_000)
+    print(f"\nlogger.debug descartado por nivel: f-string {micro['f-string']:.2f} µs, argumentos {micro['argumentos']:.2f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peticiones", type=int, default=4000)
+    parser.add_argument("--rondas", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.peticiones, args.rondas))
@@ -0,0 +1,136 @@
+# benchmarks/bench_workers.py
+"""
+Throughput de `python -m app.serve` con uno y con varios workers.
+
+Siembra una BD SQLite con los datos de bench_carga, arranca el servidor de producción
+como subproceso (uvloop + httptools) con cada número de workers y lanza peticiones
+concurrentes por HTTP real (conexiones keep-alive) desde este proceso durante `--segundos` por escenario.
+La última ejecución repite la de más workers con WEB_MAX_REQUESTS bajo, para
+comprobar que reciclar workers no produce errores.
+
+El generador de carga comparte máquina con el servidor: con pocas CPUs la mejora
+de varios workers queda limitada por ellas (se imprime el número de CPUs).
+Con SQLite las escrituras se serializan en el fichero; los escenarios son de lectura.
+
+Uso:
+    python -m benchmarks.bench_workers --workers 1 4 --segundos 10 --concurrencia 64
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.comun import preparar_entorno, resumen, sembrar, silenciar_logs
+
+preparar_entorno("bench_workers")
+os.environ.setdefault("REMINDERS_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+
+ESCENARIOS = {
+    "GET /servicios/ (caché)": "/servicios/",
+    "GET /reservas/?limit=100": "/reservas/?limit=100",
+    "GET /health/live": "/health/live",
+}
+
+
+def arrancar(workers: int, puerto: int, max_peticiones: int | None) -> subprocess.Popen:
+    entorno = dict(os.environ, WEB_WORKERS=str(workers), WEB_PORT=str(puerto), WEB_HOST="127.0.0.1",
+                   WEB_MAX_REQUESTS=str(max_peticiones or 0))
+    proceso = subprocess.Popen([sys.executable, "-m", "app.serve"], env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < 30:
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/health/live", timeout=1).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    proceso.kill()
+    raise TimeoutError("el servidor no respondió en 30 s")
+
+
+async def cliente_virtual(puerto: int, peticion: bytes, fin: float, muestras: list[float]) -> int:
+    """
+    Lanza peticiones por una conexión keep-alive hasta `fin`; retorna los errores.
+
+    Cliente HTTP/1.1 mínimo sobre asyncio: httpx en el mismo proceso se queda en unos
+    cientos de peticiones por segundo y mediría el cliente en lugar del servidor. Con
+    `Connection: close` en la respuesta se reconecta sin más; si el servidor corta la
+    conexión sin avisar (o responde otro código que 200) se cuenta un error.
+    """
+    errores = 0
+    lector = escritor = None
+    while time.perf_counter() < fin:
+        t0 = time.perf_counter()
+        try:
+            if escritor is None:
+                lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+            escritor.write(peticion)
+            cabeceras = (await lector.readuntil(b"\r\n\r\n")).split(b"\r\n")
+            longitud = next(int(c.split(b":")[1]) for c in cabeceras if c.lower().startswith(b"content-length:"))
+            await lector.readexactly(longitud)
+            if not cabeceras[0].startswith(b"HTTP/1.1 200"):
+                errores += 1
+            muestras.append(time.perf_counter() - t0)
+            if b"connection: close" in (c.lower() for c in cabeceras):
+                escritor.close()
+                lector = escritor = None
+        except (OSError, asyncio.IncompleteReadError, StopIteration):
+            errores += 1
+            if escritor is not None:
+                escritor.close()
+            lector = escritor = None
+    if escritor is not None:
+        escritor.close()
+    return errores
+
+
+async def cargar(puerto: int, ruta: str, segundos: float, concurrencia: int) -> dict:
+    peticion = f"GET {ruta} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    muestras: list[float] = []
+    t0 = time.perf_counter()
+    errores = await asyncio.gather(*[
+        cliente_virtual(puerto, peticion, t0 + segundos, muestras) for _ in range(concurrencia)
+    ])
+    duracion = time.perf_counter() - t0
+    return {"rps": len(muestras) / duracion, "errores": sum(errores), **resumen(muestras)}
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    await sembrar(args.usuarios, 20, args.reservas, 7)
+    await engine.dispose()
+    print(f"CPUs disponibles: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+
+    ejecuciones = [(w, None) for w in args.workers] + [(max(args.workers), args.reciclar)]
+    print(f"\n{'workers':>8} {'reciclado':>10}  {'escenario':<28}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for workers, max_peticiones in ejecuciones:
+        proceso = arrancar(workers, args.puerto, max_peticiones)
+        try:
+            for nombre, ruta in ESCENARIOS.items():
+                await cargar(args.puerto, ruta, 1, args.concurrencia)  # calentamiento
+                r = await cargar(args.puerto, ruta, args.segundos, args.concurrencia)
+                print(f"{workers:>8} {max_peticiones or '-':>10}  {nombre:<28}{r['rps']:>10.0f}"
+                      f"{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errores']:>9}")
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--usuarios", type=int, default=2000)
+    parser.add_argument("--reservas", type=int, default=20000)
+    parser.add_argument("--reciclar", type=int, default=2000, help="WEB_MAX_REQUESTS de la última ejecución")
+    parser.add_argument("--puerto", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(main(args))
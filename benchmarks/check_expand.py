@@ -0,0 +1,121 @@
+# benchmarks/check_expand.py
+"""
+Comprueba que GET /reservas/?expand= carga las relaciones sin consultas N+1.
+
+1. Cuenta las sentencias SQL de cada página con distintos tamaños y combinaciones de
+   `expand`: deben ser las mismas para 1 fila que para PAGE_SIZE_MAX (1 + una por relación).
+2. Compara cada reserva expandida con GET /servicios/{id} y GET /usuarios/{id}, y el
+   modo NDJSON con el JSON paginado.
+3. Mide una página con `expand=servicio,usuario` frente a lo que hacía el frontend:
+   la página sin expandir y una petición por fila a cada relación.
+
+Uso:
+    python -m benchmarks.check_expand --reservas 5000 --pagina 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.comun import ContadorSQL, preparar_entorno, sembrar, silenciar_logs
+
+preparar_entorno("check_expand")
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+EXPANSIONES = {"": 0, "servicio": 1, "usuario": 1, "servicio,usuario": 2, "usuario, servicio,usuario": 2}
+
+
+async def comprobar_sentencias(cliente: httpx.AsyncClient, contador: ContadorSQL, total: int) -> None:
+    # Tamaños con al menos dos páginas completas
+    tamanos = sorted(t for t in {1, 10, 50, settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX} if 2 * t <= total)
+    print(f"\n1. Sentencias SQL por página (tamaños {tamanos})")
+    print(f"  {'expand':<28}{'sentencias':>12}  esperadas")
+    for expand, relaciones in EXPANSIONES.items():
+        medidas = set()
+        for limit in tamanos:
+            params = {"limit": limit, **({"expand": expand} if expand else {})}
+            # Primera página y la siguiente, para incluir la consulta con cursor
+            for _ in range(2):
+                contador.reiniciar()
+                r = await cliente.get("/reservas/", params=params)
+                assert r.status_code == 200, r.text
+                assert len(r.json()) == limit
+                medidas.add(contador.total)
+                params["cursor"] = r.headers["x-next-cursor"]
+        assert medidas == {1 + relaciones}, f"expand={expand!r}: {sorted(medidas)} sentencias según el tamaño"
+        print(f"  {expand or '(ninguna)':<28}{medidas.pop():>12}  {1 + relaciones}")
+
+    r = await cliente.get("/reservas/", params={"expand": "servicio,cliente"})
+    assert r.status_code == 400, r.text
+
+
+async def comprobar_contenido(cliente: httpx.AsyncClient, contador: ContadorSQL, total: int) -> None:
+    print("\n2. Contenido")
+    pagina = (await cliente.get("/reservas/", params={"limit": 100, "expand": "servicio,usuario"})).json()
+    simple = (await cliente.get("/reservas/", params={"limit": 100})).json()
+    for expandida, reserva in zip(pagina, simple):
+        servicio, usuario = expandida["servicio"], expandida["usuario"]
+        assert {k: v for k, v in expandida.items() if k not in ("servicio", "usuario")} == reserva
+        assert servicio == (await cliente.get(f"/servicios/{reserva['servicio_id']}")).json()
+        assert usuario == (await cliente.get(f"/usuarios/{reserva['usuario_id']}")).json()
+    solo = (await cliente.get("/reservas/", params={"limit": 5, "expand": "servicio"})).json()
+    assert all("servicio" in r and "usuario" not in r for r in solo)
+    print("  100 reservas expandidas coinciden con GET /servicios/{id} y GET /usuarios/{id} ✓")
+
+    contador.reiniciar()
+    r = await cliente.get("/reservas/", params={"expand": "servicio,usuario"}, headers={"Accept": "application/x-ndjson"})
+    lineas = [json.loads(linea) for linea in r.text.splitlines()]
+    lotes = -(-total // settings.STREAM_BATCH_SIZE)
+    assert len(lineas) == total and lineas[:100] == pagina
+    assert contador.total == 1 + 2 * lotes, contador.total
+    print(f"  NDJSON: {total} reservas expandidas en {contador.total} sentencias "
+          f"({lotes} lotes de {settings.STREAM_BATCH_SIZE}) ✓")
+
+
+async def comparar_tiempos(cliente: httpx.AsyncClient, pagina: int, repeticiones: int) -> None:
+    async def expandida():
+        return (await cliente.get("/reservas/", params={"limit": pagina, "expand": "servicio,usuario"})).json()
+
+    async def por_fila():
+        reservas = (await cliente.get("/reservas/", params={"limit": pagina})).json()
+        for reserva in reservas:
+            reserva["servicio"] = (await cliente.get(f"/servicios/{reserva['servicio_id']}")).json()
+            reserva["usuario"] = (await cliente.get(f"/usuarios/{reserva['usuario_id']}")).json()
+        return reservas
+
+    print(f"\n3. Página de {pagina} reservas con servicio y usuario ({repeticiones} repeticiones, media)")
+    for nombre, fn, peticiones in (("?expand=servicio,usuario", expandida, 1),
+                                   ("una petición por fila", por_fila, 1 + 2 * pagina)):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            await fn()
+        print(f"  {nombre:<28}{peticiones:>6} peticiones{(time.perf_counter() - t0) / repeticiones * 1000:>10.1f} ms")
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    await sembrar(args.usuarios, 20, args.reservas, 7)
+    contador = ContadorSQL()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as cliente:
+            await comprobar_sentencias(cliente, contador, args.reservas)
+            await comprobar_contenido(cliente, contador, args.reservas)
+            await comparar_tiempos(cliente, args.pagina, args.repeticiones)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--reservas", type=int, default=5000)
+    parser.add_argument("--pagina", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args))
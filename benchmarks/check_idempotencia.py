@@ -0,0 +1,243 @@
+# benchmarks/check_idempotencia.py
+"""
+Comprueba la cabecera Idempotency-Key en POST /reservas/ y POST /usuarios/.
+
+1. Reintentos en serie: la misma clave repite la respuesta original (Idempotent-Replayed)
+   sin otra reserva ni otro usuario; la misma clave con otro cuerpo responde 422; las
+   claves de un usuario no valen para otro. Sin clave, el reintento de un cliente cuya
+   primera respuesta se perdió recibe 409 aunque su reserva exista.
+2. Duplicados concurrentes en un worker: `--concurrencia` peticiones con la misma clave
+   a la vez ejecutan el handler una sola vez y las demás esperan y repiten su respuesta.
+3. Respaldo en la BD: con la caché vacía (otro worker, reinicio) se repite la respuesta
+   guardada; dos "workers" (dos instancias de `Idempotencia`) con la misma clave a la
+   vez crean un solo usuario. Las respuestas caducadas se borran y la clave se libera.
+4. Latencia de la petición original frente a la repetición desde memoria y desde la BD.
+
+Uso:
+    python -m benchmarks.check_idempotencia --concurrencia 20 --repeticiones 100
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.comun import ContadorSQL, comprobar, imprimir, medir_async, preparar, preparar_entorno, silenciar_logs
+
+preparar_entorno("check_idempotencia")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select, update  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.api.routes.usuarios import _crear_usuario  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schemas.usuario import UsuarioCreate  # noqa: E402
+from app.services.disponibilidad import ahora_utc  # noqa: E402
+from app.services.idempotencia import (  # noqa: E402
+    CABECERA_REPETIDA, Idempotencia, PeticionIdempotente, huella_peticion, idempotencia,
+)
+
+INICIO = datetime(2032, 5, 3, 9, 0)
+
+
+async def contar(modelo) -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(modelo))).scalar_one()
+
+
+def clave() -> dict:
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+def cita(i: int, usuario_id: int = 1) -> dict:
+    return {"usuario_id": usuario_id, "servicio_id": 1, "fecha_hora": (INICIO + timedelta(minutes=30 * i)).isoformat()}
+
+
+# ==============================
+# 1️⃣ Reintentos en serie
+# ==============================
+async def reintentos(cliente: httpx.AsyncClient, cabeceras: dict, contador: ContadorSQL) -> None:
+    print("\n1. Reintentos en serie")
+    ana = cabeceras["ana"]
+    k = clave()
+    antes = await contar(models.Reserva)
+    primera = await cliente.post("/reservas/", json=cita(0), headers={**ana, **k})
+    comprobar("la primera petición crea la reserva (201)", primera.status_code == 201, primera.text)
+    comprobar("la respuesta original no va marcada como repetida", CABECERA_REPETIDA not in primera.headers)
+    contador.reiniciar()
+    for _ in range(3):
+        r = await cliente.post("/reservas/", json=cita(0), headers={**ana, **k})
+        assert r.status_code == 201 and r.json() == primera.json(), r.text
+        assert r.headers.get(CABECERA_REPETIDA) == "true"
+    comprobar("3 reintentos: 201 con el mismo cuerpo e Idempotent-Replayed: true", True)
+    comprobar("ni un INSERT más ni una reserva más",
+              contador.total == 0 and await contar(models.Reserva) == antes + 1)
+
+    r = await cliente.post("/reservas/", json=cita(1), headers={**ana, **k})
+    comprobar("misma clave con otro cuerpo: 422", r.status_code == 422, r.text)
+    r = await cliente.post("/reservas/", json=cita(2, usuario_id=2), headers={**cabeceras["luis"], **k})
+    comprobar("la clave de un usuario no vale para otro (crea su propia reserva)", r.status_code == 201, r.text)
+    r = await cliente.post("/reservas/", json=cita(3), headers={**ana, "Idempotency-Key": ""})
+    comprobar("clave vacía: 422", r.status_code == 422, r.text)
+
+    # Cliente sin clave cuya primera respuesta se perdió
+    sin_clave = [await cliente.post("/reservas/", json=cita(4), headers=ana) for _ in range(2)]
+    comprobar("sin clave, el reintento recibe 409 aunque la reserva se creó",
+              [r.status_code for r in sin_clave] == [201, 409])
+
+    # Errores no se guardan: tras un 404 la misma clave puede crear la reserva
+    k = clave()
+    r = await cliente.post("/reservas/", json={**cita(5), "servicio_id": 999}, headers={**ana, **k})
+    assert r.status_code == 404, r.text
+    r = await cliente.post("/reservas/", json={**cita(5), "servicio_id": 999}, headers={**ana, **k})
+    comprobar("los errores no se guardan: el reintento tras un 404 se vuelve a ejecutar",
+              r.status_code == 404 and CABECERA_REPETIDA not in r.headers)
+
+    k = clave()
+    cuerpo = {"nombre": "Eva", "email": "eva@example.com", "password": "pw"}
+    usuarios = [await cliente.post("/usuarios/", json=cuerpo, headers=k) for _ in range(3)]
+    comprobar("POST /usuarios/ repetido: el mismo 201 en lugar de 400 por email duplicado",
+              [r.status_code for r in usuarios] == [201] * 3 and len({r.text for r in usuarios}) == 1)
+    r = await cliente.post("/usuarios/", json={**cuerpo, "password": "otra"}, headers=k)
+    comprobar("POST /usuarios/ con la misma clave y otra contraseña: 422", r.status_code == 422, r.text)
+
+
+# ==============================
+# 2️⃣ Duplicados concurrentes
+# ==============================
+async def concurrentes(cliente: httpx.AsyncClient, cabeceras: dict, contador: ContadorSQL, n: int) -> None:
+    print(f"\n2. {n} peticiones a la vez con la misma clave")
+    antes = await contar(models.Reserva)
+    for ronda in range(5):
+        k = clave()
+        contador.reiniciar()
+        respuestas = await asyncio.gather(*(
+            cliente.post("/reservas/", json=cita(10 + ronda), headers={**cabeceras["ana"], **k}) for _ in range(n)
+        ))
+        assert all(r.status_code == 201 for r in respuestas), [r.text for r in respuestas if r.status_code != 201]
+        assert len({r.text for r in respuestas}) == 1
+        repetidas = sum(r.headers.get(CABECERA_REPETIDA) == "true" for r in respuestas)
+        assert contador.total == 1 and repetidas == n - 1, (contador.total, repetidas)
+    comprobar(f"5 rondas: 1 INSERT y {n - 1} respuestas repetidas por ronda, todas con el mismo cuerpo", True)
+    comprobar("5 reservas nuevas en total", await contar(models.Reserva) == antes + 5)
+
+
+# ==============================
+# 3️⃣ Respaldo en la BD
+# ==============================
+async def respaldo(cliente: httpx.AsyncClient, cabeceras: dict, contador: ContadorSQL) -> None:
+    print("\n3. Respaldo en la BD")
+    ana = cabeceras["ana"]
+    k = clave()
+    primera = await cliente.post("/reservas/", json=cita(20), headers={**ana, **k})
+    assert primera.status_code == 201, primera.text
+    idempotencia._cache.limpiar()
+    contador.reiniciar()
+    r = await cliente.post("/reservas/", json=cita(20), headers={**ana, **k})
+    comprobar("con la caché vacía se repite la respuesta guardada en la BD",
+              r.status_code == 201 and r.json() == primera.json() and r.headers.get(CABECERA_REPETIDA) == "true"
+              and contador.total == 0)
+
+    # Dos workers: dos instancias con su propia caché y su propio registro de claves en curso
+    otro_worker = Idempotencia(settings.IDEMPOTENCY_CACHE_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+    for i in range(5):
+        usuario = UsuarioCreate(nombre="Paz", email=f"paz{i}@example.com", password="pw")
+        valor = str(uuid.uuid4())
+        alcance = {"type": "http", "headers": [], "client": ("10.0.0.1", 1)}
+
+        async def en_worker(instancia: Idempotencia):
+            peticion = PeticionIdempotente("usuarios", valor, huella_peticion(usuario))
+            async with AsyncSessionLocal() as db:
+                respuesta = await instancia.ejecutar(
+                    db, peticion, lambda: _crear_usuario(usuario, Request(alcance), db, peticion)
+                )
+                return respuesta.status_code, respuesta.body, respuesta.headers.get(CABECERA_REPETIDA)
+
+        resultados = await asyncio.gather(en_worker(idempotencia), en_worker(otro_worker))
+        assert [s for s, _, _ in resultados] == [201, 201] and resultados[0][1] == resultados[1][1], resultados
+        assert sorted(str(m) for _, _, m in resultados) == ["None", "true"], resultados
+        async with AsyncSessionLocal() as db:
+            creados = (await db.execute(
+                select(func.count()).select_from(models.Usuario).where(models.Usuario.email == usuario.email)
+            )).scalar_one()
+        assert creados == 1
+    comprobar("dos workers con la misma clave a la vez: un usuario, el mismo 201 en ambos", True)
+
+    # Caducidad: una respuesta antigua se ignora y se borra, y la purga limpia las demás
+    async with AsyncSessionLocal() as db:
+        viejo = ahora_utc() - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS + 1)
+        await db.execute(update(models.RespuestaIdempotente).where(
+            models.RespuestaIdempotente.clave == k["Idempotency-Key"]).values(created_at=viejo))
+        await db.execute(insert(models.RespuestaIdempotente).values(
+            ambito="usuarios", clave="antigua", huella="x", status_code=201, cuerpo=b"{}", created_at=viejo))
+        await db.commit()
+    idempotencia._cache.limpiar()
+    idempotencia._purgado_en = None
+    total = await contar(models.RespuestaIdempotente)
+    r = await cliente.post("/reservas/", json=cita(20), headers={**ana, **k})
+    comprobar("respuesta caducada: la clave ya no protege (409 por horario ocupado)", r.status_code == 409, r.text)
+    comprobar("la purga borra las respuestas caducadas", await contar(models.RespuestaIdempotente) == total - 2)
+
+
+# ==============================
+# 4️⃣ Latencia
+# ==============================
+async def latencias(cliente: httpx.AsyncClient, cabeceras: dict, repeticiones: int) -> None:
+    ana = cabeceras["ana"]
+    contador_citas = iter(range(1000, 1000 + 10 * repeticiones))
+
+    async def original():
+        r = await cliente.post("/reservas/", json=cita(next(contador_citas)), headers={**ana, **clave()})
+        assert r.status_code == 201, r.text
+
+    k = clave()
+    await cliente.post("/reservas/", json=cita(next(contador_citas)), headers={**ana, **k})
+    cuerpo = cita(next(contador_citas) - 1)
+
+    async def repetida_cache():
+        r = await cliente.post("/reservas/", json=cuerpo, headers={**ana, **k})
+        assert r.headers.get(CABECERA_REPETIDA) == "true", r.text
+
+    async def repetida_bd():
+        idempotencia._cache.limpiar()
+        await repetida_cache()
+
+    async def sin_clave():
+        r = await cliente.post("/reservas/", json=cita(next(contador_citas)), headers=ana)
+        assert r.status_code == 201, r.text
+
+    imprimir(f"4. POST /reservas/ ({repeticiones} peticiones en serie)", {
+        "sin Idempotency-Key": await medir_async(sin_clave, repeticiones),
+        "con clave nueva (ejecuta y guarda)": await medir_async(original, repeticiones),
+        "reintento: repetición desde memoria": await medir_async(repetida_cache, repeticiones),
+        "reintento: repetición desde la BD": await medir_async(repetida_bd, repeticiones),
+    })
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    await init_db()
+    contador = ContadorSQL("INSERT INTO reservas")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as cliente:
+            cabeceras = await preparar(cliente)
+            await reintentos(cliente, cabeceras, contador)
+            await concurrentes(cliente, cabeceras, contador, args.concurrencia)
+            await respaldo(cliente, cabeceras, contador)
+            await latencias(cliente, cabeceras, args.repeticiones)
+    finally:
+        await engine.dispose()
+    print("\nTodas las comprobaciones de idempotencia pasan.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,306 @@
+# benchmarks/check_indices_reservas.py
+"""
+Comprueba que los listados filtrados de GET /reservas/ usan los índices compuestos.
+
+0. Partiendo de una tabla `reservas` con la forma original (sin `version`, sin
+   `recordatorio_enviado` y sin los índices compuestos), verifica que init_db la
+   migra: añade las columnas conservando las filas, crea los índices y guarda la huella.
+1. Con pocas reservas, recorre por la API todas las páginas de cada combinación de
+   filtros y verifica que el resultado coincide con filtrar la tabla completa.
+2. Con `--filas` reservas (1M por defecto), obtiene el plan de la consulta que ejecuta
+   el listado (primera página y página tras un cursor) para cada patrón de acceso y
+   falla si no usa el índice esperado o si necesita ordenar las filas aparte. Mide
+   también cada consulta sin los índices nuevos, como estaba la tabla antes.
+
+SQLite: EXPLAIN QUERY PLAN. MySQL (DATABASE_URL exportada): EXPLAIN, columnas
+`key` y `Extra`. Las tablas se BORRAN y se vuelven a crear.
+
+Uso:
+    python -m benchmarks.check_indices_reservas --filas 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from benchmarks.comun import preparar_entorno, resumen, sembrar, silenciar_logs
+
+preparar_entorno("check_indices_reservas")
+
+import httpx  # noqa: E402
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Select, String, Table, func, insert, inspect, select  # noqa: E402
+from sqlalchemy.schema import CreateIndex, DropIndex  # noqa: E402
+
+from app.api.listados import aplicar_cursor  # noqa: E402
+from app.api.routes.reservas import filtrar_reservas, proyeccion_reservas  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.init_db import diferencias_esquema, init_db, metadata_esquema  # noqa: E402
+from app.db.session import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+USUARIOS = 20000
+SERVICIOS = 20
+ESTADOS = (("pendiente", "confirmado", "cancelado"), (6, 3, 1))
+INICIO = datetime(2028, 1, 1)
+DIAS = 3 * 365
+# Índices añadidos para los filtros del listado
+NUEVOS = ("ix_reservas_usuario_fecha", "ix_reservas_estado_fecha")
+ORDEN = (models.Reserva.fecha_hora, models.Reserva.id)
+
+# Tabla `reservas` tal como la creaba la primera versión de los modelos
+reservas_original = Table(
+    "reservas",
+    MetaData(),
+    Column("id", Integer, primary_key=True, index=True),
+    Column("usuario_id", Integer, ForeignKey(models.Usuario.id), nullable=False),
+    Column("servicio_id", Integer, ForeignKey(models.Servicio.id), nullable=False),
+    Column("fecha_hora", DateTime(timezone=True), nullable=False),
+    Column("estado", String(50)),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+@dataclass
+class Caso:
+    """
+    Un patrón de acceso del listado y el índice que debe resolverlo.
+
+    Atributos:
+        nombre (str): Nombre en el informe.
+        filtros (dict): Argumentos de `filtrar_reservas` (y de la query string).
+        indice (str): Índice que debe aparecer en el plan.
+    """
+    nombre: str
+    filtros: dict = field(default_factory=dict)
+    indice: str = ""
+
+
+def casos(aleatorio: random.Random) -> list[Caso]:
+    dia = INICIO + timedelta(days=aleatorio.randrange(DIAS))
+    usuario = aleatorio.randint(1, USUARIOS)
+    return [
+        Caso("próximas de un usuario", {"usuario_id": usuario, "desde": dia}, "ix_reservas_usuario_fecha"),
+        Caso("todas las de un usuario", {"usuario_id": usuario}, "ix_reservas_usuario_fecha"),
+        Caso("usuario y estado", {"usuario_id": usuario, "estado": "confirmado"}, "ix_reservas_usuario_fecha"),
+        Caso("agenda de un servicio (1 día)",
+             {"servicio_id": 3, "desde": dia, "hasta": dia + timedelta(days=1)}, "ix_reservas_servicio_fecha"),
+        Caso("canceladas de un mes",
+             {"estado": "cancelado", "desde": dia, "hasta": dia + timedelta(days=30)}, "ix_reservas_estado_fecha"),
+        Caso("pendientes desde una fecha", {"estado": "pendiente", "desde": dia}, "ix_reservas_estado_fecha"),
+        Caso("todas en una semana", {"desde": dia, "hasta": dia + timedelta(days=7)}, "ix_reservas_fecha"),
+    ]
+
+
+def consulta_listado(filtros: dict, cursor: list | None = None) -> Select:
+    """La consulta que ejecuta `paginar` para una página del listado."""
+    consulta = filtrar_reservas(proyeccion_reservas.select(), **filtros)
+    return aplicar_cursor(consulta, ORDEN, cursor).limit(settings.PAGE_SIZE_DEFAULT + 1)
+
+
+async def plan(consulta: Select) -> tuple[str, set[str], bool]:
+    """
+    Plan de ejecución de una consulta.
+
+    Returns:
+        tuple[str, set[str], bool]: Plan en texto, índices usados y si ordena aparte (filesort).
+    """
+    sql = str(consulta.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    async with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            filas = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")).all()
+            texto = " | ".join(f[-1] for f in filas)
+            indices = {i for i in (f"ix_reservas_{s}" for s in ("usuario_fecha", "estado_fecha", "servicio_fecha", "fecha"))
+                       if f"INDEX {i} " in texto + " "}
+            return texto, indices, "TEMP B-TREE" in texto
+        filas = (await conn.exec_driver_sql(f"EXPLAIN {sql}")).mappings().all()
+        texto = " | ".join(f"{f['key']} ({f['type']}, {f['rows']} filas, {f['Extra']})" for f in filas)
+        return texto, {f["key"] for f in filas if f["key"]}, any("filesort" in (f["Extra"] or "") for f in filas)
+
+
+async def medir_consulta(consulta: Select, repeticiones: int) -> dict:
+    muestras = []
+    async with engine.connect() as conn:
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            (await conn.execute(consulta)).all()
+            muestras.append(time.perf_counter() - t0)
+    return resumen(muestras)
+
+
+# ==============================
+# 🌱 Siembra
+# ==============================
+def generar(n: int, aleatorio: random.Random) -> list[dict]:
+    return [
+        {
+            "usuario_id": aleatorio.randint(1, USUARIOS),
+            "servicio_id": aleatorio.randint(1, SERVICIOS),
+            "fecha_hora": INICIO + timedelta(minutes=15 * aleatorio.randrange(DIAS * 96)),
+            "estado": aleatorio.choices(*ESTADOS)[0],
+            "recordatorio_enviado": False,
+            "created_at": INICIO,
+        }
+        for _ in range(n)
+    ]
+
+
+async def insertar(n: int, aleatorio: random.Random) -> None:
+    """Inserta `n` reservas por lotes sin tenerlas todas en memoria."""
+    t0 = time.perf_counter()
+    async with engine.begin() as conn:
+        for i in range(0, n, 10000):
+            await conn.execute(insert(models.Reserva), generar(min(10000, n - i), aleatorio))
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("ANALYZE")
+        else:
+            await conn.exec_driver_sql("ANALYZE TABLE reservas")
+    print(f"  {n} reservas insertadas en {time.perf_counter() - t0:.1f} s")
+
+
+# ==============================
+# 0️⃣ Migración de una tabla existente
+# ==============================
+async def comprobar_migracion(filas: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(metadata_esquema.drop_all)
+        await conn.run_sync(Base.metadata.create_all, tables=[t for t in Base.metadata.sorted_tables if t.name != "reservas"])
+        await conn.run_sync(reservas_original.create)
+        await conn.execute(insert(models.Usuario).values(nombre="Ana", email="ana@example.com", hashed_password="x"))
+        await conn.execute(insert(models.Servicio).values(nombre="Corte", precio=20, duracion_minutos=30))
+        await conn.execute(insert(reservas_original), [
+            {"usuario_id": 1, "servicio_id": 1, "fecha_hora": INICIO + timedelta(hours=i), "estado": "pendiente"}
+            for i in range(filas)
+        ])
+
+    assert await init_db(), "init_db no aplicó el DDL sobre la tabla antigua"
+
+    async with engine.connect() as conn:
+        diferencias = await conn.run_sync(diferencias_esquema)
+        indices = await conn.run_sync(lambda c: {i["name"] for i in inspect(c).get_indexes("reservas")})
+        migradas = (await conn.execute(
+            select(models.Reserva.version, models.Reserva.recordatorio_enviado)
+        )).all()
+    assert not diferencias, diferencias
+    esperados = {i.name for i in models.Reserva.__table__.indexes}
+    assert esperados <= indices, f"faltan índices: {esperados - indices}"
+    assert len(migradas) == filas and all(v == 1 and not enviado for v, enviado in migradas), migradas[:5]
+    assert not await init_db(), "la huella no quedó guardada tras migrar"
+    print(f"  columnas version y recordatorio_enviado añadidas ({filas} filas conservadas) ✓")
+    print(f"  índices creados: {', '.join(sorted(esperados))} ✓")
+    print("  esquema verificado y huella guardada: el siguiente arranque no ejecuta DDL ✓")
+
+
+# ==============================
+# 1️⃣ Resultados de la API
+# ==============================
+async def comprobar_api(aleatorio: random.Random) -> None:
+    async with engine.connect() as conn:
+        todas = [dict(f) for f in (await conn.execute(proyeccion_reservas.select())).mappings()]
+    frecuente = Counter(r["usuario_id"] for r in todas).most_common(1)[0][0]
+
+    def cumple(r: dict, filtros: dict) -> bool:
+        return (
+            all(r[c] == filtros[c] for c in ("usuario_id", "servicio_id", "estado") if c in filtros)
+            and ("desde" not in filtros or r["fecha_hora"] >= filtros["desde"])
+            and ("hasta" not in filtros or r["fecha_hora"] < filtros["hasta"])
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as cliente:
+        for caso in casos(aleatorio):
+            # Con pocas reservas, el usuario con más de ellas
+            filtros = dict(caso.filtros)
+            if "usuario_id" in filtros:
+                filtros["usuario_id"] = frecuente
+            params = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in filtros.items()}
+            params["limit"] = 7
+            ids, url = [], "/reservas/"
+            while url:
+                r = await cliente.get(url, params=params if url == "/reservas/" else None)
+                assert r.status_code == 200, r.text
+                ids += [fila["id"] for fila in r.json()]
+                url = r.links.get("next", {}).get("url")
+            esperados = [r["id"] for r in sorted((r for r in todas if cumple(r, filtros)),
+                                                 key=lambda r: (r["fecha_hora"], r["id"]))]
+            assert ids == esperados, f"{caso.nombre}: {len(ids)} filas por la API, {len(esperados)} esperadas"
+            print(f"  {caso.nombre:<36}{len(ids):>6} filas ✓")
+        r = await cliente.get("/reservas/", params={"desde": "2030-01-02T00:00:00", "hasta": "2030-01-01T00:00:00"})
+        assert r.status_code == 400, r.text
+
+
+# ==============================
+# 2️⃣ Planes con volumen
+# ==============================
+async def indices_nuevos(crear: bool) -> None:
+    async with engine.begin() as conn:
+        for indice in models.Reserva.__table__.indexes:
+            if indice.name in NUEVOS:
+                await conn.execute(CreateIndex(indice) if crear else DropIndex(indice))
+        await conn.exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE TABLE reservas")
+
+
+async def comprobar_planes(aleatorio: random.Random, repeticiones: int) -> None:
+    lista = casos(aleatorio)
+    paginas = []
+    for caso in lista:
+        # Segunda página: el cursor es la última fila de la primera
+        async with engine.connect() as conn:
+            primera = (await conn.execute(consulta_listado(caso.filtros))).all()
+        cursor = None
+        if len(primera) > settings.PAGE_SIZE_DEFAULT:
+            ultima = primera[settings.PAGE_SIZE_DEFAULT - 1]
+            cursor = [ultima.fecha_hora, ultima.id]
+        paginas.append(cursor)
+
+    await indices_nuevos(crear=False)
+    antes = [await medir_consulta(consulta_listado(c.filtros), repeticiones) for c in lista]
+    await indices_nuevos(crear=True)
+
+    fallos = []
+    print(f"\n  {'caso':<36}{'página':>8}{'antes p50':>12}{'ahora p50':>12}  plan")
+    for caso, cursor, previo in zip(lista, paginas, antes):
+        for pagina, valores in (("1", None), ("2", cursor)):
+            if pagina == "2" and valores is None:
+                continue
+            consulta = consulta_listado(caso.filtros, valores)
+            texto, usados, ordena = await plan(consulta)
+            ahora = await medir_consulta(consulta, repeticiones)
+            ok = caso.indice in usados and not ordena
+            if not ok:
+                fallos.append(f"{caso.nombre} (página {pagina}): se esperaba {caso.indice} sin ordenar; plan: {texto}")
+            t_antes = f"{previo['p50_ms']:.2f}" if pagina == "1" else "-"
+            print(f"  {caso.nombre:<36}{pagina:>8}{t_antes:>12}{ahora['p50_ms']:>12.2f}  {'✓' if ok else '✗'} {texto}")
+    assert not fallos, "\n".join(fallos)
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    aleatorio = random.Random(args.semilla)
+    print(f"\n0. Migración de una tabla reservas existente ({engine.dialect.name})")
+    await comprobar_migracion(50)
+    await sembrar(USUARIOS, SERVICIOS, 0, args.semilla)
+
+    print(f"\n1. Filtros por la API ({args.filas_api} reservas)")
+    await insertar(args.filas_api, aleatorio)
+    await comprobar_api(aleatorio)
+
+    print(f"\n2. Planes de consulta ({engine.dialect.name}, {args.filas_api + args.filas} reservas, tiempos en ms)")
+    await insertar(args.filas, aleatorio)
+    await comprobar_planes(aleatorio, args.repeticiones)
+    await engine.dispose()
+    print("\nTodos los patrones de acceso usan su índice y salen ya ordenados.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--filas-api", type=int, default=3000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,147 @@
+# benchmarks/check_limites.py
+"""
+Comprueba los límites de peticiones de /auth/login y POST /usuarios/ y mide su efecto.
+
+1. Ráfaga de logins fallidos contra una cuenta desde una IP: con el limitador solo los
+   primeros llegan a la BD y a bcrypt; el resto recibe 429 con Retry-After.
+2. Ataque distribuido (muchas IPs, una cuenta): lo frena el límite por usuario.
+3. Altas masivas desde una IP: lo frena el límite de registro por IP.
+4. Almacén en memoria: la memoria queda acotada por RATE_LIMIT_MAX_KEYS y se mide su coste.
+
+Uso:
+    python -m benchmarks.check_limites --rafaga 100
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.comun import preparar_entorno, silenciar_logs
+
+preparar_entorno("check_limites")
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+os.environ["LOGIN_RATE_LIMIT_IP"] = "20/minute"
+os.environ["LOGIN_RATE_LIMIT_USERNAME"] = "5/minute"
+os.environ["SIGNUP_RATE_LIMIT_IP"] = "20/hour"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.rate_limit import AlmacenMemoria, Limite, limitador  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class Contadores:
+    """Sentencias SQL y verificaciones bcrypt ejecutadas."""
+
+    def __init__(self):
+        self.sql = 0
+        self.bcrypt = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._sql)
+        original = security.verify_password
+
+        def contar(*args):
+            self.bcrypt += 1
+            return original(*args)
+
+        security.verify_password = contar
+
+    def _sql(self, *args):
+        self.sql += 1
+
+
+def cliente_desde(ip: str) -> httpx.AsyncClient:
+    transporte = httpx.ASGITransport(app=app, client=(ip, 40000))
+    return httpx.AsyncClient(transport=transporte, base_url="http://check")
+
+
+async def rafaga_login(n: int, contadores: Contadores, habilitado: bool) -> dict:
+    limitador.habilitado = habilitado
+    limitador.respaldo._tat.clear()
+    sql0, bcrypt0, cpu0, t0 = contadores.sql, contadores.bcrypt, time.process_time(), time.perf_counter()
+    codigos: dict[int, int] = {}
+    concurrencia = asyncio.Semaphore(8)
+
+    async def intento(cliente: httpx.AsyncClient, i: int) -> httpx.Response:
+        async with concurrencia:
+            return await cliente.post("/auth/login", data={"username": "ana@example.com", "password": f"mala{i}"})
+
+    async with cliente_desde("203.0.113.7") as cliente:
+        respuestas = await asyncio.gather(*[intento(cliente, i) for i in range(n)])
+    for r in respuestas:
+        codigos[r.status_code] = codigos.get(r.status_code, 0) + 1
+    retry_after = next((r.headers.get("retry-after") for r in respuestas if r.status_code == 429), None)
+    return {
+        "codigos": codigos, "sql": contadores.sql - sql0, "bcrypt": contadores.bcrypt - bcrypt0,
+        "cpu_s": round(time.process_time() - cpu0, 2), "segundos": round(time.perf_counter() - t0, 2),
+        "retry_after": retry_after,
+    }
+
+
+async def main(n: int) -> None:
+    silenciar_logs()
+    await init_db()
+    contadores = Contadores()
+    fallos = 0
+
+    def comprobar(descripcion: str, ok: bool, detalle) -> None:
+        nonlocal fallos
+        fallos += not ok
+        print(f"{'OK ' if ok else 'ERR'} {descripcion}: {detalle}")
+
+    async with app.router.lifespan_context(app):
+        silenciar_logs()
+        async with cliente_desde("198.51.100.1") as cliente:
+            await cliente.post("/usuarios/", json={"nombre": "Ana", "email": "ana@example.com", "password": "pw"})
+
+        sin = await rafaga_login(n, contadores, habilitado=False)
+        con = await rafaga_login(n, contadores, habilitado=True)
+        print(f"Ráfaga de {n} logins fallidos desde una IP")
+        print(f"  sin limitador: {sin}")
+        print(f"  con limitador: {con}")
+        comprobar("solo los permitidos llegan a bcrypt", con["bcrypt"] <= 5, f"{con['bcrypt']} verificaciones")
+        comprobar("429 con Retry-After", con["codigos"].get(429, 0) >= n - 5 and con["retry_after"], con["retry_after"])
+
+        # Una cuenta atacada desde 50 IPs distintas: solo cuenta el límite por usuario
+        limitador.respaldo._tat.clear()
+        bcrypt0 = contadores.bcrypt
+        codigos = []
+        for i in range(50):
+            async with cliente_desde(f"192.0.2.{i + 1}") as cliente:
+                r = await cliente.post("/auth/login", data={"username": "ana@example.com", "password": "mala"})
+                codigos.append(r.status_code)
+        comprobar("ataque distribuido frenado por usuario", codigos.count(401) == 5 and contadores.bcrypt - bcrypt0 == 5,
+                  f"{codigos.count(401)} x 401, {codigos.count(429)} x 429")
+
+        limitador.respaldo._tat.clear()
+        async with cliente_desde("198.51.100.2") as cliente:
+            altas = [
+                (await cliente.post("/usuarios/", json={"nombre": "Bot", "email": f"bot{i}@example.com", "password": "pw"})).status_code
+                for i in range(25)
+            ]
+        comprobar("altas desde una IP", altas.count(201) == 20 and altas.count(429) == 5,
+                  f"{altas.count(201)} x 201, {altas.count(429)} x 429")
+
+    await engine.dispose()
+
+    almacen = AlmacenMemoria(100_000)
+    limite = Limite.desde_texto("5/minute")
+    t0 = time.perf_counter()
+    for i in range(1_000_000):
+        await almacen.consumir(f"login:ip:{i}", limite)
+    duracion = time.perf_counter() - t0
+    comprobar("memoria acotada", len(almacen) == 100_000, f"{len(almacen)} claves tras 1M claves distintas")
+    print(f"Almacén en memoria: {duracion:.2f} µs por consumo (1M consumos)")
+
+    print("\nTodo correcto" if not fallos else f"\n{fallos} comprobaciones fallidas")
+    raise SystemExit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rafaga", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.rafaga))
@@ -0,0 +1,98 @@
+# benchmarks/check_replicas.py
+"""
+Comprueba el enrutado de lecturas a réplicas con dos ficheros SQLite locales.
+
+El "primario" y la "réplica" son dos bases distintas: tras sembrar ambas, la
+réplica recibe un servicio que no existe en el primario, así que cada respuesta
+delata de qué base salió. Se verifica que:
+1. Las lecturas (GET /servicios/{id}) van a la réplica.
+2. Tras una escritura, la cookie `leer_primario` manda las lecturas al primario.
+3. Con la réplica caída (fichero inaccesible), las lecturas pasan al primario.
+
+Uso:
+    python -m benchmarks.check_replicas
+"""
+import asyncio
+import os
+import tempfile
+
+from benchmarks.comun import preparar_entorno, silenciar_logs
+
+preparar_entorno("check_replicas_primario")
+RUTA_REPLICA = os.path.join(tempfile.gettempdir(), "check_replicas_replica.db")
+if os.path.exists(RUTA_REPLICA):
+    os.remove(RUTA_REPLICA)
+os.environ["DATABASE_REPLICA_URLS"] = f'["sqlite+aiosqlite:///{RUTA_REPLICA}"]'
+os.environ["REPLICA_RETRY_SECONDS"] = "60"
+os.environ["REMINDERS_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.db.replicas import COOKIE_LEER_PRIMARIO, enrutador_lecturas  # noqa: E402
+from app.db.session import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.catalogo import catalogo_cache  # noqa: E402
+
+
+async def preparar() -> None:
+    replica = enrutador_lecturas.replicas[0]
+    for motor in (engine, replica.engine):
+        async with motor.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(models.Servicio(id=1, nombre="Corte (primario)", precio=10, duracion_minutos=30))
+        await db.commit()
+    async with replica.sesiones() as db:
+        db.add(models.Servicio(id=1, nombre="Corte (réplica)", precio=10, duracion_minutos=30))
+        await db.commit()
+
+
+async def leer(cliente: httpx.AsyncClient) -> str:
+    # El catálogo se sirve desde caché: se invalida para forzar la lectura de la BD
+    catalogo_cache.invalidar()
+    r = await cliente.get("/servicios/1")
+    return r.json()["nombre"]
+
+
+async def main() -> None:
+    silenciar_logs()
+    await preparar()
+    fallos = 0
+
+    def comprobar(descripcion: str, obtenido: str, esperado: str) -> None:
+        nonlocal fallos
+        ok = esperado in obtenido
+        fallos += not ok
+        print(f"{'OK ' if ok else 'ERR'} {descripcion}: {obtenido}")
+
+    async with app.router.lifespan_context(app):
+        silenciar_logs()
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://check") as cliente:
+            comprobar("lectura sin escrituras previas", await leer(cliente), "réplica")
+
+            r = await cliente.post("/servicios/", json={"nombre": "Nuevo", "precio": 5, "duracion_minutos": 15})
+            comprobar("cookie tras escribir", r.headers.get("set-cookie", ""), COOKIE_LEER_PRIMARIO)
+            comprobar("lectura tras escribir (leer las propias escrituras)", await leer(cliente), "primario")
+
+            cliente.cookies.clear()
+            comprobar("lectura de otro cliente", await leer(cliente), "réplica")
+
+            # Simular la caída: la réplica apunta a un fichero en un directorio inexistente
+            replica = enrutador_lecturas.replicas[0]
+            await replica.engine.dispose()
+            replica.engine = create_async_engine("sqlite+aiosqlite:////no/existe/replica.db")
+            replica.sesiones = async_sessionmaker(bind=replica.engine, expire_on_commit=False)
+            comprobar("lectura con la réplica caída", await leer(cliente), "primario")
+            comprobar("réplica fuera de rotación", str(enrutador_lecturas.estado()["replicas"][0]["disponible"]), "False")
+            comprobar("lectura siguiente sin reintentar la réplica", await leer(cliente), "primario")
+
+    await engine.dispose()
+    print("\nTodo correcto" if not fallos else f"\n{fallos} comprobaciones fallidas")
+    raise SystemExit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+# benchmarks/check_resumen.py
+"""
+Comprueba el resumen incremental de reservas y mide su coste frente a agregar `reservas`.
+
+1. Crea reservas por la API (POST /reservas/ y /reservas/bulk) y verifica que el
+   resumen mantenido en cada escritura coincide con una reconstrucción completa.
+2. Llena de reservas el año anterior y compara, para ese año, la consulta de
+   GET /reservas/resumen/servicios con el GROUP BY equivalente sobre `reservas`
+   (lo que tendría que hacer el dashboard sin resumen). Ambas se miden directamente
+   contra la BD, sin la capa HTTP.
+
+Uso:
+    python -m benchmarks.check_resumen --volumen 10000 50000 200000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.comun import preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("check_resumen")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.resumen import reconstruir  # noqa: E402
+
+SERVICIOS = 20
+INICIO = datetime(2030, 1, 1, 8, 0)
+MES = (date(2030, 1, 1), date(2030, 1, 31))
+ANIO = (date(2029, 1, 1), date(2029, 12, 31))
+
+
+async def leer_resumen(db) -> dict:
+    filas = await db.execute(select(models.ResumenReserva).where(models.ResumenReserva.reservas != 0))
+    return {(f.servicio_id, f.fecha, f.estado): (f.reservas, round(f.ingresos, 2)) for f in filas.scalars()}
+
+
+async def crear_por_api(cliente: httpx.AsyncClient) -> None:
+    await cliente.post("/usuarios/", json={"nombre": "Ana", "email": "ana@example.com", "password": "pw"})
+    token = (await cliente.post("/auth/login", data={"username": "ana@example.com", "password": "pw"})).json()["access_token"]
+    cabeceras = {"Authorization": f"Bearer {token}"}
+    for i in range(SERVICIOS):
+        await cliente.post("/servicios/", json={"nombre": f"S{i}", "precio": 10 + i, "duracion_minutos": 30})
+
+    for i in range(200):
+        cuerpo = {
+            "usuario_id": 1,
+            "servicio_id": 1 + i % SERVICIOS,
+            "fecha_hora": (INICIO + timedelta(hours=i)).isoformat(),
+            "estado": random.choice(["pendiente", "confirmado"]),
+        }
+        r = await cliente.post("/reservas/", json=cuerpo, headers=cabeceras)
+        assert r.status_code == 201, r.text
+    lote = [
+        {"usuario_id": 1, "servicio_id": 1 + i % SERVICIOS, "fecha_hora": (INICIO + timedelta(days=30, hours=i)).isoformat()}
+        for i in range(300)
+    ]
+    r = await cliente.post("/reservas/bulk", json=lote, headers=cabeceras)
+    assert r.json()["creadas"] == 300, r.text
+
+
+async def llenar_anio(hasta: int) -> None:
+    """Reparte reservas por 2029 hasta tener `hasta` filas en ese año y reconstruye el resumen."""
+    inicio_anio = datetime(2029, 1, 1)
+    async with AsyncSessionLocal() as db:
+        actuales = (await db.execute(
+            select(func.count(models.Reserva.id)).where(models.Reserva.fecha_hora < INICIO.replace(hour=0))
+        )).scalar_one()
+        filas = [
+            {
+                "usuario_id": 1,
+                "servicio_id": 1 + i % SERVICIOS,
+                "fecha_hora": inicio_anio + timedelta(minutes=random.randrange(365 * 24 * 60)),
+                "estado": random.choice(["pendiente", "confirmado", "cancelado"]),
+            }
+            for i in range(actuales, hasta)
+        ]
+        for i in range(0, len(filas), 5000):
+            await db.execute(insert(models.Reserva), filas[i:i + 5000])
+        await db.commit()
+        await reconstruir(db)
+
+
+async def totales_desde_resumen() -> list:
+    """La consulta de GET /reservas/resumen/servicios para 2029."""
+    resumen_ = models.ResumenReserva
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(resumen_.servicio_id, resumen_.estado, func.sum(resumen_.reservas), func.sum(resumen_.ingresos))
+            .where(resumen_.fecha >= ANIO[0], resumen_.fecha <= ANIO[1])
+            .group_by(resumen_.servicio_id, resumen_.estado)
+        )).all()
+
+
+async def totales_desde_reservas() -> list:
+    """Los mismos totales agregando `reservas` con el precio de cada servicio."""
+    reserva = models.Reserva
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(reserva.servicio_id, reserva.estado, func.count(), func.sum(models.Servicio.precio))
+            .join(models.Servicio, models.Servicio.id == reserva.servicio_id)
+            .where(reserva.fecha_hora >= datetime(2029, 1, 1), reserva.fecha_hora < datetime(2030, 1, 1))
+            .group_by(reserva.servicio_id, reserva.estado)
+        )).all()
+
+
+async def medir(llamada, n: int = 20) -> dict:
+    muestras = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await llamada()
+        muestras.append(time.perf_counter() - t0)
+    return resumen(muestras)
+
+
+async def main(volumenes: list[int]) -> None:
+    silenciar_logs()
+    await init_db()
+    random.seed(7)
+    fallos = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as cliente:
+        await crear_por_api(cliente)
+        async with AsyncSessionLocal() as db:
+            incremental = await leer_resumen(db)
+            await reconstruir(db)
+            reconstruido = await leer_resumen(db)
+        ok = incremental == reconstruido
+        fallos += not ok
+        print(f"{'OK ' if ok else 'ERR'} resumen incremental = reconstrucción ({len(incremental)} filas)")
+
+        r = await cliente.get("/reservas/resumen/servicios", params={"desde": MES[0], "hasta": MES[1]})
+        total = sum(fila["reservas"] for fila in r.json())
+        esperado = sum(n for (_, fecha, _), (n, _) in incremental.items() if MES[0] <= fecha <= MES[1])
+        ok = r.status_code == 200 and total == esperado
+        fallos += not ok
+        print(f"{'OK ' if ok else 'ERR'} totales por servicio del mes: {total} reservas (esperadas {esperado})")
+
+    print(f"\n{'reservas en el año':>18} {'resumen p50 ms':>15} {'GROUP BY reservas p50 ms':>25}")
+    for volumen in volumenes:
+        await llenar_anio(volumen)
+        desde_resumen = await totales_desde_resumen()
+        desde_reservas = await totales_desde_reservas()
+        iguales = sorted((s, e, n, round(i, 2)) for s, e, n, i in desde_resumen) == \
+            sorted((s, e, n, round(i, 2)) for s, e, n, i in desde_reservas)
+        fallos += not iguales
+        rapido = await medir(totales_desde_resumen)
+        lento = await medir(totales_desde_reservas)
+        marca = "" if iguales else "  (ERR: totales distintos)"
+        print(f"{volumen:>18} {rapido['p50_ms']:>15.2f} {lento['p50_ms']:>25.2f}{marca}")
+
+    await engine.dispose()
+    print("\nTodo correcto" if not fallos else f"\n{fallos} comprobaciones fallidas")
+    raise SystemExit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumen", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.volumen))
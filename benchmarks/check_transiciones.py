@@ -0,0 +1,236 @@
+# benchmarks/check_transiciones.py
+"""
+Comprueba las transiciones de estado de las reservas y su control optimista de concurrencia.
+
+1. Recorre la máquina de estados por la API (PATCH confirmar, cancelar y reprogramar):
+   permisos, versiones obsoletas, transiciones no válidas, horarios ocupados,
+   disponibilidad y resumen diario tras cada cambio.
+2. Lanza a la vez varios PATCH con la misma versión sobre cada reserva: exactamente
+   uno debe aplicarse y el resto recibir 409, sin perder ni duplicar cambios.
+3. Ocupa un horario directamente en la BD (como haría otro worker, sin pasar por el
+   índice en memoria) y verifica que el UPDATE condicional rechaza moverse a él.
+4. Sentencias SQL y latencia de cada transición.
+
+Uso:
+    python -m benchmarks.check_transiciones --reservas 200 --concurrencia 8
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.comun import ContadorSQL, comprobar, imprimir, preparar, preparar_entorno, resumen, silenciar_logs
+
+preparar_entorno("check_transiciones")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.resumen import reconstruir  # noqa: E402
+
+INICIO = datetime(2031, 3, 2, 9, 0)
+DURACION = 30
+
+
+async def leer_resumen() -> dict:
+    async with AsyncSessionLocal() as db:
+        filas = await db.execute(select(models.ResumenReserva).where(models.ResumenReserva.reservas != 0))
+        return {(f.servicio_id, f.fecha, f.estado): f.reservas for f in filas.scalars()}
+
+
+async def resumen_coincide() -> bool:
+    incremental = await leer_resumen()
+    async with AsyncSessionLocal() as db:
+        await reconstruir(db)
+    return incremental == await leer_resumen()
+
+
+async def crear(cliente: httpx.AsyncClient, auth: dict, fecha: datetime, servicio_id: int = 1, estado="pendiente"):
+    return await cliente.post("/reservas/", headers=auth, json={
+        "usuario_id": 1, "servicio_id": servicio_id, "fecha_hora": fecha.isoformat(), "estado": estado,
+    })
+
+
+async def libre(cliente: httpx.AsyncClient, fecha: datetime, servicio_id: int = 1) -> bool:
+    r = await cliente.get("/reservas/disponibilidad", params={
+        "servicio_id": servicio_id, "desde": fecha.isoformat(),
+        "hasta": (fecha + timedelta(minutes=DURACION)).isoformat(), "paso_minutos": DURACION,
+    })
+    return bool(r.json()["huecos"])
+
+
+# ==============================
+# 1️⃣ Máquina de estados
+# ==============================
+async def recorrido(cliente: httpx.AsyncClient, auth: dict[str, dict]) -> None:
+    print("\n1. Máquina de estados")
+    ana, luis, admin = auth["ana"], auth["luis"], auth["admin"]
+    comprobar("crear con un estado desconocido -> 422", (await crear(cliente, ana, INICIO, estado="pagado")).status_code == 422)
+    comprobar("crear ya cancelada -> 422", (await crear(cliente, ana, INICIO, estado="cancelado")).status_code == 422)
+
+    r = await crear(cliente, ana, INICIO)
+    reserva = r.json()
+    rid = reserva["id"]
+    comprobar("reserva nueva con version 1", r.status_code == 201 and reserva["version"] == 1, r.text)
+    otra = (await crear(cliente, ana, INICIO + timedelta(hours=1))).json()
+
+    def patch(accion: str, cabeceras: dict, **cuerpo):
+        return cliente.patch(f"/reservas/{rid}/{accion}", headers=cabeceras, json=cuerpo)
+
+    r = await patch("confirmar", ana, version=7)
+    comprobar("confirmar con versión obsoleta -> 409", r.status_code == 409, r.text)
+    r = await patch("confirmar", luis, version=1)
+    comprobar("confirmar la reserva de otro usuario -> 403", r.status_code == 403, r.text)
+    r = await cliente.patch("/reservas/999999/confirmar", headers=ana, json={"version": 1})
+    comprobar("reserva inexistente -> 404", r.status_code == 404, r.text)
+    r = await patch("confirmar", ana, version=1)
+    comprobar("confirmar -> 200, confirmado, version 2",
+              r.status_code == 200 and r.json()["estado"] == "confirmado" and r.json()["version"] == 2, r.text)
+    r = await patch("confirmar", ana, version=2)
+    comprobar("confirmar una reserva confirmada -> 409", r.status_code == 409, r.text)
+
+    destino = INICIO + timedelta(hours=1, minutes=15)
+    r = await patch("reprogramar", ana, version=2, fecha_hora=destino.isoformat())
+    comprobar("reprogramar sobre otra reserva -> 409", r.status_code == 409, r.text)
+    destino = INICIO + timedelta(hours=3)
+    r = await patch("reprogramar", ana, version=2, fecha_hora=destino.isoformat())
+    comprobar("reprogramar a un hueco libre -> 200, version 3, conserva el estado",
+              r.status_code == 200 and r.json()["version"] == 3 and r.json()["estado"] == "confirmado", r.text)
+    comprobar("el horario anterior queda libre y el nuevo ocupado",
+              await libre(cliente, INICIO) and not await libre(cliente, destino))
+    destino += timedelta(minutes=15)
+    r = await patch("reprogramar", ana, version=3, fecha_hora=destino.isoformat())
+    comprobar("reprogramar solapando solo consigo misma -> 200", r.status_code == 200, r.text)
+    destino = INICIO + timedelta(days=1)
+    r = await patch("reprogramar", ana, version=4, fecha_hora=destino.isoformat())
+    comprobar("reprogramar a otro día -> 200, version 5", r.status_code == 200 and r.json()["version"] == 5, r.text)
+    comprobar("resumen diario tras cambios de estado y de día", await resumen_coincide())
+
+    r = await patch("cancelar", admin, version=5)
+    comprobar("un administrador cancela la reserva de otro -> 200",
+              r.status_code == 200 and r.json()["estado"] == "cancelado" and r.json()["version"] == 6, r.text)
+    comprobar("la cancelación libera el horario", await libre(cliente, destino))
+    r = await patch("confirmar", ana, version=6)
+    comprobar("confirmar una cancelada -> 409", r.status_code == 409, r.text)
+    r = await patch("reprogramar", ana, version=6, fecha_hora=INICIO.isoformat())
+    comprobar("reprogramar una cancelada -> 409", r.status_code == 409, r.text)
+    r = await cliente.patch(f"/reservas/{otra['id']}/cancelar", headers=ana, json={"version": 1})
+    comprobar("cancelar una pendiente -> 200", r.status_code == 200, r.text)
+    comprobar("resumen diario tras cancelar", await resumen_coincide())
+
+
+# ==============================
+# 2️⃣ Cambios concurrentes
+# ==============================
+async def concurrentes(cliente: httpx.AsyncClient, auth: dict[str, dict], n: int, concurrencia: int) -> None:
+    print(f"\n2. {concurrencia} PATCH simultáneos con la misma versión sobre cada una de {n} reservas")
+    base = INICIO + timedelta(days=30)
+    ids = []
+    for i in range(n):
+        r = await crear(cliente, auth["ana"], base + timedelta(hours=2 * i), servicio_id=2)
+        ids.append(r.json()["id"])
+    aleatorio = random.Random(3)
+    huecos = iter(range(10 ** 6))
+
+    def intento(rid: int):
+        accion = aleatorio.choice(("confirmar", "cancelar", "reprogramar"))
+        cuerpo = {"version": 1}
+        if accion == "reprogramar":
+            # Huecos distintos para que solo la versión decida
+            cuerpo["fecha_hora"] = (base + timedelta(days=400, hours=next(huecos))).isoformat()
+        quien = aleatorio.choice(("ana", "admin"))
+        return cliente.patch(f"/reservas/{rid}/{accion}", headers=auth[quien], json=cuerpo)
+
+    respuestas = await asyncio.gather(*[intento(rid) for rid in ids for _ in range(concurrencia)])
+    por_reserva: dict[int, list[int]] = {}
+    for rid, r in zip((rid for rid in ids for _ in range(concurrencia)), respuestas):
+        por_reserva.setdefault(rid, []).append(r.status_code)
+    codigos = {c for lista in por_reserva.values() for c in lista}
+    comprobar(f"solo 200 y 409 (obtenidos: {sorted(codigos)})", codigos <= {200, 409})
+    comprobar("exactamente un cambio aplicado por reserva",
+              all(lista.count(200) == 1 for lista in por_reserva.values()),
+              {rid: lista for rid, lista in por_reserva.items() if lista.count(200) != 1})
+    async with AsyncSessionLocal() as db:
+        versiones = set((await db.execute(select(models.Reserva.version).where(models.Reserva.id.in_(ids)))).scalars())
+    comprobar("todas las reservas terminan en la versión 2", versiones == {2}, versiones)
+    comprobar("resumen diario coherente", await resumen_coincide())
+
+
+# ==============================
+# 3️⃣ Horario ocupado por otro worker
+# ==============================
+async def ocupado_en_bd(cliente: httpx.AsyncClient, auth: dict[str, dict]) -> None:
+    print("\n3. Horario ocupado en la BD sin pasar por el índice del worker")
+    fecha = INICIO + timedelta(days=60)
+    reserva = (await crear(cliente, auth["ana"], fecha)).json()
+    await libre(cliente, fecha + timedelta(hours=5))  # carga el índice del servicio en este worker
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.Reserva).values(
+            usuario_id=2, servicio_id=1, fecha_hora=fecha + timedelta(hours=5), estado="pendiente",
+        ))
+        await db.commit()
+    r = await cliente.patch(f"/reservas/{reserva['id']}/reprogramar", headers=auth["ana"],
+                            json={"version": 1, "fecha_hora": (fecha + timedelta(hours=5, minutes=10)).isoformat()})
+    comprobar("el UPDATE condicional rechaza el horario -> 409", r.status_code == 409, r.text)
+    async with AsyncSessionLocal() as db:
+        version = (await db.execute(select(models.Reserva.version).where(models.Reserva.id == reserva["id"]))).scalar()
+    comprobar("la reserva no cambió", version == 1, version)
+
+
+# ==============================
+# 4️⃣ Coste
+# ==============================
+async def coste(cliente: httpx.AsyncClient, auth: dict[str, dict], repeticiones: int) -> None:
+    contador = ContadorSQL()
+    base = INICIO + timedelta(days=90)
+    resultados, sentencias = {}, {}
+    for accion in ("confirmar", "reprogramar", "cancelar"):
+        muestras, total = [], 0
+        for i in range(repeticiones):
+            reserva = (await crear(cliente, auth["ana"], base + timedelta(hours=3 * i))).json()
+            cuerpo = {"version": 1}
+            if accion == "reprogramar":
+                cuerpo["fecha_hora"] = (base + timedelta(hours=3 * i + 1)).isoformat()
+            contador.reiniciar()
+            t0 = time.perf_counter()
+            r = await cliente.patch(f"/reservas/{reserva['id']}/{accion}", headers=auth["ana"], json=cuerpo)
+            muestras.append(time.perf_counter() - t0)
+            total += contador.total
+            assert r.status_code == 200, r.text
+        base += timedelta(days=30)
+        resultados[f"PATCH {accion}"] = resumen(muestras)
+        sentencias[accion] = total / repeticiones
+    imprimir("4. Latencia por transición (secuencial, ms)", resultados)
+    print("  Sentencias SQL por transición (lectura + UPDATE condicional + resumen): " +
+          ", ".join(f"{accion} {media:.0f}" for accion, media in sentencias.items()))
+
+
+async def main(args) -> None:
+    silenciar_logs()
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as cliente:
+            auth = await preparar(cliente, administradores=("admin",), servicios=[
+                {"nombre": f"S{i}", "precio": 20 + i, "duracion_minutos": DURACION} for i in range(2)
+            ])
+            await recorrido(cliente, auth)
+            await concurrentes(cliente, auth, args.reservas, args.concurrencia)
+            await ocupado_en_bd(cliente, auth)
+            await coste(cliente, auth, args.repeticiones)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservas", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args))
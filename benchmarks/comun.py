@@ -0,0 +1,281 @@
+# benchmarks/comun.py
+"""
+Utilidades compartidas por los benchmarks.
+
+Los benchmarks se ejecutan contra una base SQLite local (aiosqlite) para no
+depender de MySQL. `preparar_entorno` debe llamarse antes de importar `app`,
+porque la configuración y el motor se crean al importar.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, Sequence, Union
+
+# Contraseña de los usuarios creados por `sembrar` y `preparar`
+PASSWORD = "benchmark"
+
+
+def preparar_entorno(nombre: str) -> str:
+    """
+    Configura DATABASE_URL y SECRET_KEY para usar una base SQLite temporal.
+
+    La base espera hasta 30 s a que se libere un bloqueo de escritura antes de
+    fallar con "database is locked", como el innodb_lock_wait_timeout de MySQL.
+    También desactiva los límites de peticiones (salvo que el entorno diga otra cosa):
+    los benchmarks lanzan cientos de logins desde la misma IP.
+
+    Args:
+        nombre (str): Nombre del fichero de base de datos (dentro del directorio temporal).
+
+    Returns:
+        str: Ruta del fichero SQLite (se borra si ya existía).
+    """
+    ruta = os.path.join(tempfile.gettempdir(), f"{nombre}.db")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    # timeout: segundos que una conexión espera a que otra suelte el bloqueo de escritura
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{ruta}?timeout=30")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    return ruta
+
+
+def silenciar_logs() -> None:
+    """Elimina los sinks de loguru para que el logging no distorsione las mediciones."""
+    from loguru import logger
+    logger.remove()
+
+
+def resumen(muestras: list[float]) -> dict:
+    """
+    Resume una lista de duraciones (segundos) en milisegundos.
+
+    Args:
+        muestras (list[float]): Duraciones medidas.
+
+    Returns:
+        dict: n, media, p50, p95 y p99 en ms.
+    """
+    ordenadas = sorted(muestras)
+
+    def pct(p: float) -> float:
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000
+
+    return {
+        "n": len(ordenadas),
+        "media_ms": statistics.fmean(ordenadas) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def medir(fn: Callable[[], object], repeticiones: int) -> dict:
+    """Ejecuta una función síncrona `repeticiones` veces y resume sus tiempos."""
+    muestras = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        muestras.append(time.perf_counter() - t0)
+    return resumen(muestras)
+
+
+async def medir_async(fn: Callable[[], Awaitable[object]], repeticiones: int) -> dict:
+    """Ejecuta una corrutina `repeticiones` veces (en serie) y resume sus tiempos."""
+    muestras = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        await fn()
+        muestras.append(time.perf_counter() - t0)
+    return resumen(muestras)
+
+
+def imprimir(titulo: str, resultados: dict[str, dict]) -> None:
+    """Imprime una tabla con los resultados de varios casos."""
+    print(f"\n{titulo}")
+    print(f"{'caso':<40}{'n':>8}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for caso, r in resultados.items():
+        print(
+            f"{caso:<40}{r['n']:>8}{r['media_ms']:>10.3f}{r['p50_ms']:>10.3f}"
+            f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+        )
+
+
+# ==============================
+# 🌱 Siembra de datos
+# ==============================
+async def sembrar(usuarios: int, servicios: Union[int, list[dict]], reservas: int = 0, semilla: int = 7) -> dict:
+    """
+    Recrea las tablas e inserta los datos por lotes (executemany).
+
+    Los usuarios son usuario{i}@example.com con la contraseña PASSWORD (el 1 es
+    administrador). Las reservas se reparten entre los servicios en huecos
+    consecutivos sin solape, desde hoy hasta unos 60 días vista, con estados
+    mezclados; el resumen diario se reconstruye al final.
+
+    Args:
+        usuarios (int): Número de usuarios.
+        servicios (Union[int, list[dict]]): Número de servicios a generar, o las filas
+            de los servicios si el benchmark necesita otros nombres o descripciones.
+        reservas (int): Número de reservas.
+        semilla (int): Semilla del generador aleatorio.
+
+    Returns:
+        dict: Volúmenes sembrados y tiempo empleado.
+    """
+    from sqlalchemy import insert
+
+    from app.core.security import hash_password
+    from app.db import models
+    from app.db.session import AsyncSessionLocal, Base, engine
+    from app.services.resumen import reconstruir
+
+    aleatorio = random.Random(semilla)
+    t0 = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    hashed = hash_password(PASSWORD)
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    if isinstance(servicios, int):
+        filas_servicios = [
+            {"nombre": f"Servicio {i}", "descripcion": "Servicio de benchmark", "precio": 10.0 + i % 40,
+             "duracion_minutos": aleatorio.choice((30, 45, 60, 90)), "is_active": True}
+            for i in range(1, servicios + 1)
+        ]
+    else:
+        filas_servicios = servicios
+    duraciones = [fila["duracion_minutos"] for fila in filas_servicios]
+
+    filas_usuarios = [
+        {"nombre": f"Usuario {i}", "email": f"usuario{i}@example.com", "hashed_password": hashed,
+         "is_active": True, "is_admin": i == 1, "created_at": ahora}
+        for i in range(1, usuarios + 1)
+    ]
+    filas_reservas = []
+    siguiente = [ahora + timedelta(hours=1)] * len(filas_servicios)
+    for _ in range(reservas):
+        s = aleatorio.randrange(len(filas_servicios))
+        inicio = siguiente[s] + timedelta(minutes=aleatorio.choice((0, 0, 15, 30, 60)))
+        siguiente[s] = inicio + timedelta(minutes=duraciones[s])
+        filas_reservas.append({
+            "usuario_id": aleatorio.randint(1, usuarios), "servicio_id": s + 1, "fecha_hora": inicio,
+            "estado": aleatorio.choices(("pendiente", "confirmado", "cancelado"), (6, 3, 1))[0],
+            "recordatorio_enviado": False, "created_at": ahora,
+        })
+
+    async with engine.begin() as conn:
+        for tabla, filas in ((models.Usuario, filas_usuarios), (models.Servicio, filas_servicios),
+                             (models.Reserva, filas_reservas)):
+            for i in range(0, len(filas), 5000):
+                await conn.execute(insert(tabla), filas[i:i + 5000])
+    async with AsyncSessionLocal() as db:
+        await reconstruir(db)
+    return {"usuarios": usuarios, "servicios": len(filas_servicios), "reservas": reservas,
+            "segundos": round(time.perf_counter() - t0, 2), "ultima_fecha": max(siguiente, default=ahora).isoformat()}
+
+
+# ==============================
+# 🔢 Contador de sentencias
+# ==============================
+class ContadorSQL:
+    """
+    Cuenta las sentencias que el motor de la app envía a la BD.
+
+    Atributos:
+        prefijo (Optional[str]): Si se indica, solo cuenta las sentencias que empiezan
+            por él (sin distinguir mayúsculas), p. ej. "INSERT INTO reservas".
+        rtt (float): Segundos de espera por ida a la BD, para simular la latencia de red.
+        total (int): Idas contadas desde el último `reiniciar`.
+    """
+
+    def __init__(self, prefijo: Optional[str] = None, transacciones: bool = False, rtt: float = 0.0):
+        """
+        Args:
+            prefijo (Optional[str]): Ver el atributo.
+            transacciones (bool): Contar también cada COMMIT y ROLLBACK como una ida.
+            rtt (float): Ver el atributo.
+        """
+        from sqlalchemy import event
+
+        from app.db.session import engine
+
+        self.prefijo = prefijo.upper() if prefijo else None
+        self.rtt = rtt
+        self.total = 0
+        motor = engine.sync_engine
+        event.listen(motor, "before_cursor_execute", self._sentencia)
+        if transacciones:
+            event.listen(motor, "commit", self._ida)
+            event.listen(motor, "rollback", self._ida)
+
+    def _sentencia(self, conn, cursor, sentencia: str, *args) -> None:
+        if self.prefijo is None or sentencia.lstrip().upper().startswith(self.prefijo):
+            self._ida()
+
+    def _ida(self, *args) -> None:
+        self.total += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def reiniciar(self) -> None:
+        self.total = 0
+
+
+# ==============================
+# ✅ Comprobaciones contra la API
+# ==============================
+def comprobar(descripcion: str, ok: bool, detalle="") -> None:
+    """Imprime la comprobación con ✓ o ✗ y falla (AssertionError con `detalle`) si no se cumple."""
+    print(f"  {'✓' if ok else '✗'} {descripcion}")
+    assert ok, f"{descripcion}: {detalle}"
+
+
+async def preparar(
+    cliente,
+    usuarios: Sequence[str] = ("ana", "luis"),
+    administradores: Sequence[str] = (),
+    servicios: Sequence[dict] = ({"nombre": "Corte", "precio": 20, "duracion_minutos": 30},),
+) -> dict[str, dict]:
+    """
+    Registra usuarios y crea servicios a través de la API.
+
+    Los usuarios son {nombre}@example.com con la contraseña PASSWORD y se registran en
+    orden (primero `usuarios`, luego `administradores`), así que el primero tiene id 1.
+
+    Args:
+        cliente (httpx.AsyncClient): Cliente contra la app.
+        usuarios (Sequence[str]): Nombres de los usuarios normales.
+        administradores (Sequence[str]): Nombres de los usuarios administradores.
+        servicios (Sequence[dict]): Cuerpos de POST /servicios/.
+
+    Returns:
+        dict[str, dict]: Cabeceras de autenticación de cada usuario, por nombre.
+    """
+    from sqlalchemy import update
+
+    from app.db import models
+    from app.db.session import AsyncSessionLocal
+
+    nombres = [*usuarios, *administradores]
+    for nombre in nombres:
+        r = await cliente.post("/usuarios/", json={"nombre": nombre, "email": f"{nombre}@example.com", "password": PASSWORD})
+        assert r.status_code == 201, r.text
+    if administradores:
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.Usuario)
+                             .where(models.Usuario.email.in_([f"{nombre}@example.com" for nombre in administradores]))
+                             .values(is_admin=True))
+            await db.commit()
+    cabeceras = {}
+    for nombre in nombres:
+        r = await cliente.post("/auth/login", data={"username": f"{nombre}@example.com", "password": PASSWORD})
+        cabeceras[nombre] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    for servicio in servicios:
+        r = await cliente.post("/servicios/", json=servicio)
+        assert r.status_code == 201, r.text
+    return cabeceras